@@ -3,88 +3,144 @@ Flask 應用程式工廠
 """
 import os
 import logging
+from typing import Optional
 from logging.handlers import TimedRotatingFileHandler
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_mail import Mail
-from flask_admin import Admin
 from flask_wtf.csrf import CSRFProtect
+from jinja2 import FileSystemBytecodeCache
 from config import config
+from app.startup import StartupTimer, startup_cli
+from app.db_routing import RoutingSession, init_db_routing, replica_cli
 
 # 初始化擴展
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # 設定讀取副本時，唯讀路由改用副本
 migrate = Migrate()
 login_manager = LoginManager()
 mail = Mail()
-flask_admin = Admin()
 csrf = CSRFProtect()
 
 
-def create_app(config_name: str = None) -> Flask:
+def create_app(config_name: str = None, config_overrides: Optional[dict] = None) -> Flask:
     """
     Flask 應用程式工廠函數
     
+    管理後台只在 ADMIN_ENABLED=True 時載入；資料庫結構由 flask schema init 建立
+    （AUTO_CREATE_SCHEMA=True 時於啟動時建立）。
+    
     Args:
         config_name: 設定名稱 ('development', 'production', 'testing')
+        config_overrides: 覆寫的設定值（例如腳本關閉排程器與寄件程序）
         
     Returns:
         Flask 應用程式實例
     """
+    timer = StartupTimer()
+    config_name = config_name or os.environ.get('FLASK_ENV', 'development')
     app = Flask(__name__)
     
     # 載入設定
-    config_name = config_name or os.environ.get('FLASK_ENV', 'development')
     app.config.from_object(config[config_name])
+    if config_overrides:
+        app.config.update(config_overrides)
     
     # 初始化擴展
-    db.init_app(app)
-    migrate.init_app(app, db)
-    login_manager.init_app(app)
-    mail.init_app(app)
-    flask_admin.init_app(app)
-    csrf.init_app(app)
+    with timer.phase('extensions'):
+        db.init_app(app)
+        # migrations/ 位於專案根目錄（與 run.py 同層），不受目前工作目錄影響
+        migrate.init_app(app, db, directory=os.path.join(os.path.dirname(app.root_path), 'migrations'))
+        login_manager.init_app(app)
+        mail.init_app(app)
+        csrf.init_app(app)
+        
+        from app.sqlite_profile import apply_sqlite_profile
+        from app.movie_ingest import validate_database_dialect
+        from app.search_index import register_search_functions
+        validate_database_dialect(app)
+        apply_sqlite_profile(app)
+        register_search_functions(app)
+        init_db_routing(app)
     
     # 設定 Flask-Login
     login_manager.login_view = 'auth.login'
     login_manager.login_message = '請先登入以訪問此頁面。'
     login_manager.login_message_category = 'info'
     
-    # 設定 Flask-Admin
-    flask_admin.name = '蒙太奇之愛 管理後台'
-    flask_admin.template_mode = 'bootstrap4'
-    
-    # 設定日誌
-    setup_logging(app)
+    # 模板編譯結果寫入檔案快取，新 worker 不必重新編譯
+    if app.config.get('JINJA_BYTECODE_CACHE'):
+        cache_dir = app.config.get('JINJA_BYTECODE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
     
     # 註冊 Blueprint
-    from app.routes import main
-    from app.auth import bp as auth_bp
+    with timer.phase('blueprints'):
+        from app.routes import main
+        from app.auth import bp as auth_bp
+        
+        app.register_blueprint(main)
+        app.register_blueprint(auth_bp, url_prefix='/auth')
     
-    app.register_blueprint(main)
-    app.register_blueprint(auth_bp, url_prefix='/auth')
+    # 註冊用戶載入器（精簡身分，行程內快取，使用者異動時失效）
+    from app.user_cache import UserIdentity, load_identity
     
-    # 註冊 Flask-Admin 視圖
-    from app.admin import register_admin_views
-    register_admin_views(flask_admin, db)
+    @login_manager.user_loader
+    def load_user(user_id: str) -> UserIdentity:
+        return load_identity(int(user_id))
     
-    # 註冊用戶載入器
-    from app.models import User
+    # 模板輔助函數
+    from app.poster_mirror import poster_src
+    app.add_template_global(poster_src)
     
-    @login_manager.user_loader
-    def load_user(user_id: str) -> User:
-        return User.query.get(int(user_id))
+    # 設定日誌
+    setup_logging(app)
+    
+    # 管理後台（Flask-Admin 只在啟用時匯入）
+    if app.config.get('ADMIN_ENABLED'):
+        with timer.phase('admin'):
+            from app.admin import register_admin_views
+            register_admin_views(app, db)
+    
+    # 註冊 CLI 指令
+    with timer.phase('cli'):
+        from app.schema import schema_cli
+        app.cli.add_command(schema_cli)
+        from app.search_index import search_index_cli
+        app.cli.add_command(search_index_cli)
+        from app.genres import genres_cli
+        app.cli.add_command(genres_cli)
+        from app.tmdb_sync import tmdb_cli
+        app.cli.add_command(tmdb_cli)
+        from app.poster_mirror import posters_cli
+        app.cli.add_command(posters_cli)
+        from app.email_outbox import outbox_cli
+        app.cli.add_command(outbox_cli)
+        from app.scheduler import scheduler_cli
+        app.cli.add_command(scheduler_cli)
+        app.cli.add_command(startup_cli)
+        app.cli.add_command(replica_cli)
+    
+    # 建立資料庫結構（一般部署改以 flask schema init 執行）
+    if app.config.get('AUTO_CREATE_SCHEMA'):
+        with timer.phase('schema'), app.app_context():
+            from app.schema import init_schema
+            init_schema(app)
     
-    # 建立資料庫表格
-    with app.app_context():
-        db.create_all()
+    # 啟動排程器（網站 worker 可設定 SCHEDULER_ENABLED=False，改以 flask scheduler run 獨立執行）
+    if not app.config.get('TESTING') and app.config.get('SCHEDULER_ENABLED'):
+        with timer.phase('scheduler'):
+            from app.scheduler import start_scheduler
+            start_scheduler(app)
     
-    # 啟動排程器
-    if not app.config.get('TESTING'):
-        from app.scheduler import start_scheduler
-        start_scheduler(app)
+    # 啟動背景寄件程序
+    if not app.config.get('TESTING') and app.config.get('EMAIL_OUTBOX_WORKER'):
+        with timer.phase('outbox_worker'):
+            from app.email_outbox import start_outbox_worker
+            start_outbox_worker(app)
     
+    app.extensions['startup'] = timer
     return app
 
 
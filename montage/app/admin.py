@@ -1,7 +1,7 @@
 """
 Flask-Admin 管理後台
 """
-from flask import redirect, url_for, request, flash
+from flask import Flask, redirect, url_for, request, flash
 from flask_login import current_user
 from flask_admin import Admin, AdminIndexView, expose
 from flask_admin.contrib.sqla import ModelView
@@ -35,7 +35,7 @@ class AdminIndexView(AdminIndexView):
         recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
         
         # 最新評論
-        recent_reviews = Review.query.join(Movie).join(User)\
+        recent_reviews = Review.query.options(*Review.listing_options())\
             .order_by(Review.created_at.desc()).limit(10).all()
         
         # 熱門電影
@@ -75,7 +75,7 @@ class UserModelView(ModelView):
     column_default_sort = ('created_at', True)
     
     # 編輯頁面設定
-    form_excluded_columns = ['password_hash', 'confirmation_token', 'reviews']
+    form_excluded_columns = ['password_hash', 'auth_tokens', 'reviews']
     form_widget_args = {
         'email': {'readonly': True},
         'created_at': {'readonly': True}
@@ -109,7 +109,11 @@ class MovieModelView(ModelView):
     column_default_sort = ('created_at', True)
     
     # 編輯頁面設定
-    form_excluded_columns = ['reviews', 'avg_rating', 'created_at']
+    form_excluded_columns = [
+        'reviews', 'avg_rating', 'created_at',
+        'review_count', 'rating_sum',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count'
+    ]
     form_widget_args = {
         'tmdb_id': {'readonly': True},
         'avg_rating': {'readonly': True}
@@ -205,35 +209,28 @@ class ReviewModelView(ModelView):
     
     def inaccessible_callback(self, name, **kwargs):
         return redirect(url_for('auth.login', next=request.url))
-    
-    def after_model_change(self, form, model, is_created):
-        """評論變更後重新計算電影評分"""
-        if model.movie:
-            model.movie.calculate_avg_rating()
-        super().after_model_change(form, model, is_created)
-    
-    def after_model_delete(self, model):
-        """評論刪除後重新計算電影評分"""
-        if model.movie:
-            model.movie.calculate_avg_rating()
-        super().after_model_delete(model)
 
 
-def register_admin_views(admin: Admin, db) -> None:
+def register_admin_views(app: Flask, db) -> Admin:
     """
-    註冊管理後台視圖
+    建立管理後台並註冊視圖
     
     Args:
-        admin: Flask-Admin 實例
+        app: Flask 應用程式實例
         db: SQLAlchemy 實例
+    
+    Returns:
+        Flask-Admin 實例
     """
-    # 設定首頁視圖
-    admin.index_view = AdminIndexView(name='儀表板', url='/admin')
+    admin = Admin(
+        app,
+        name='蒙太奇之愛 管理後台',
+        template_mode='bootstrap4',
+        index_view=AdminIndexView(name='儀表板', url='/admin')
+    )
     
     # 註冊模型視圖
     admin.add_view(UserModelView(User, db.session, name='使用者管理', category='使用者'))
     admin.add_view(MovieModelView(Movie, db.session, name='電影管理', category='內容'))
     admin.add_view(ReviewModelView(Review, db.session, name='評論管理', category='內容'))
-    
-    # 設定管理後台模板
-    admin.template_mode = 'bootstrap4'
+    return admin
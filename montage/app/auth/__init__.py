@@ -4,15 +4,22 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
-from app.models import User
+from app.models import AuthToken, User
 from app.auth.forms import LoginForm, RegisterForm, ResetPasswordRequestForm
 from app.email_utils import send_confirmation_email, send_password_reset_email
-import secrets
-from datetime import datetime, timedelta
+from app.passwords import PasswordHasherBusy
+from app.auth.tokens import issue_token, find_token_user, revoke_tokens
 
 bp = Blueprint('auth', __name__)
 
 
+@bp.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error):
+    """登入尖峰時密碼雜湊佇列已滿"""
+    flash('目前登入人數眾多，請稍後再試。', 'warning')
+    return redirect(request.path)
+
+
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     """登入頁面"""
@@ -28,6 +35,11 @@ def login():
                 flash('請先確認您的電子郵件信箱。', 'warning')
                 return redirect(url_for('auth.login'))
             
+            # 成本參數調整後，於登入成功時以新設定重新雜湊
+            if user.password_needs_rehash():
+                user.set_password(form.password.data)
+                db.session.commit()
+            
             login_user(user, remember=form.remember_me.data)
             next_page = request.args.get('next')
             if next_page:
@@ -60,14 +72,14 @@ def register():
         )
         
         # 產生確認令牌
-        user.confirmation_token = secrets.token_urlsafe(32)
+        token = issue_token(user, AuthToken.PURPOSE_CONFIRM_EMAIL)
         
         db.session.add(user)
         db.session.commit()
         
         # 發送確認信件
         try:
-            send_confirmation_email(user)
+            send_confirmation_email(user, token)
             flash('註冊成功！請檢查您的電子郵件信箱並點選確認連結。', 'success')
         except Exception as e:
             current_app.logger.error(f'無法發送確認信件: {str(e)}')
@@ -90,10 +102,10 @@ def logout():
 @bp.route('/confirm/<token>')
 def confirm_email(token):
     """確認電子郵件"""
-    user = User.query.filter_by(confirmation_token=token).first()
+    user = find_token_user(token, AuthToken.PURPOSE_CONFIRM_EMAIL)
     
     if not user:
-        flash('無效的確認連結。', 'danger')
+        flash('無效或過期的確認連結。', 'danger')
         return redirect(url_for('auth.login'))
     
     if user.email_confirmed:
@@ -101,7 +113,7 @@ def confirm_email(token):
         return redirect(url_for('auth.login'))
     
     user.email_confirmed = True
-    user.confirmation_token = None
+    revoke_tokens(user, AuthToken.PURPOSE_CONFIRM_EMAIL)
     db.session.commit()
     
     flash('電子郵件確認成功！您現在可以登入了。', 'success')
@@ -120,8 +132,7 @@ def reset_password_request():
         
         if user and user.email_confirmed:
             # 產生重設令牌
-            reset_token = secrets.token_urlsafe(32)
-            user.confirmation_token = reset_token  # 重用此欄位
+            reset_token = issue_token(user, AuthToken.PURPOSE_RESET_PASSWORD)
             db.session.commit()
             
             try:
@@ -145,7 +156,7 @@ def reset_password(token):
     if current_user.is_authenticated:
         return redirect(url_for('main.index'))
     
-    user = User.query.filter_by(confirmation_token=token).first()
+    user = find_token_user(token, AuthToken.PURPOSE_RESET_PASSWORD)
     
     if not user:
         flash('無效或過期的重設連結。', 'danger')
@@ -156,7 +167,7 @@ def reset_password(token):
     
     if form.validate_on_submit():
         user.set_password(form.password.data)
-        user.confirmation_token = None
+        revoke_tokens(user, AuthToken.PURPOSE_RESET_PASSWORD)
         db.session.commit()
         
         flash('密碼重設成功！請使用新密碼登入。', 'success')
@@ -0,0 +1,110 @@
+"""
+認證令牌 - 電子郵件確認與密碼重設令牌的發行、查詢與清除
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+from flask import current_app
+from sqlalchemy import delete
+from app import db
+from app.models import AuthToken, User
+
+# 各用途令牌的有效期限設定名稱與預設值（分鐘）
+TOKEN_LIFETIME_SETTINGS = {
+    AuthToken.PURPOSE_CONFIRM_EMAIL: ('EMAIL_CONFIRM_TOKEN_MINUTES', 48 * 60),
+    AuthToken.PURPOSE_RESET_PASSWORD: ('PASSWORD_RESET_TOKEN_MINUTES', 30)
+}
+
+
+def hash_token(token: str) -> str:
+    """
+    計算令牌的雜湊值（令牌本身為 256 位元隨機值，不需加鹽）
+    
+    Args:
+        token: 信件連結中的令牌
+    
+    Returns:
+        SHA-256 十六進位字串
+    """
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _expires_at(purpose: str, now: datetime) -> datetime:
+    """依用途計算令牌到期時間"""
+    setting, default_minutes = TOKEN_LIFETIME_SETTINGS[purpose]
+    return now + timedelta(minutes=current_app.config.get(setting, default_minutes))
+
+
+def issue_token(user: User, purpose: str) -> str:
+    """
+    發行令牌（撤銷同一使用者同用途的舊令牌，由呼叫端提交交易）
+    
+    資料庫只保存雜湊值；令牌明文只出現在寄件匣的信件內容中，
+    信件寄出或轉為 dead 時即被清除（見 app.email_outbox）。
+    
+    Args:
+        user: 使用者（可為尚未寫入資料庫的新使用者）
+        purpose: 令牌用途（AuthToken.PURPOSE_*）
+    
+    Returns:
+        放入信件連結的令牌明文
+    """
+    if user.user_id is not None:
+        revoke_tokens(user, purpose)
+    
+    token = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    user.auth_tokens.append(AuthToken(
+        token_hash=hash_token(token),
+        purpose=purpose,
+        created_at=now,
+        expires_at=_expires_at(purpose, now)
+    ))
+    return token
+
+
+def find_token_user(token: str, purpose: str) -> Optional[User]:
+    """
+    以令牌查詢使用者（token_hash 唯一索引）
+    
+    Args:
+        token: 信件連結中的令牌
+        purpose: 令牌用途
+    
+    Returns:
+        令牌有效時回傳使用者，否則回傳 None
+    """
+    return User.query.join(AuthToken, AuthToken.user_id == User.user_id)\
+        .filter(AuthToken.token_hash == hash_token(token))\
+        .filter(AuthToken.purpose == purpose)\
+        .filter(AuthToken.expires_at > datetime.utcnow())\
+        .first()
+
+
+def revoke_tokens(user: User, purpose: str) -> None:
+    """
+    刪除使用者指定用途的所有令牌（由呼叫端提交交易）
+    
+    Args:
+        user: 使用者
+        purpose: 令牌用途
+    """
+    db.session.execute(
+        delete(AuthToken)
+        .where(AuthToken.user_id == user.user_id)
+        .where(AuthToken.purpose == purpose)
+    )
+
+
+def purge_expired_tokens() -> int:
+    """
+    以單一範圍 DELETE 清除過期令牌（expires_at 索引）
+    
+    Returns:
+        清除的令牌數
+    """
+    result = db.session.execute(delete(AuthToken).where(AuthToken.expires_at <= datetime.utcnow()))
+    db.session.commit()
+    return result.rowcount
+
@@ -0,0 +1,140 @@
+"""
+讀寫分流 - 唯讀路由使用讀取副本，寫入與使用者自己寫入後的讀取使用主資料庫
+"""
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+import click
+from flask import Flask, current_app, g, has_request_context, request, session
+from flask.cli import AppGroup
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import URL
+from sqlalchemy.sql.dml import UpdateBase
+
+# 讀取副本的 bind 名稱前綴（replica_0、replica_1…，對應 DATABASE_REPLICA_URLS）
+REPLICA_BIND_PREFIX = 'replica'
+
+replica_cli = AppGroup('replica', help='讀取副本')
+
+
+def replica_bind_keys(app: Flask) -> List[str]:
+    """設定中的讀取副本 bind 名稱"""
+    return [key for key in app.config.get('SQLALCHEMY_BINDS') or {} if key.startswith(REPLICA_BIND_PREFIX)]
+
+
+class RoutingSession(Session):
+    """
+    依請求選擇資料庫的 Session
+    
+    請求開始時若選定讀取副本（g.db_replica_bind），查詢改由副本執行；
+    flush 與 INSERT/UPDATE/DELETE 一律使用主資料庫，之後本次請求的讀取也留在主資料庫。
+    primary_reads_since() 區塊內的讀取（快取失效後的重新載入）同樣使用主資料庫。
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info['db_wrote'] = True
+            elif not self.info.get('db_wrote') and not self.info.get('db_primary') and has_request_context():
+                replica_bind = g.get('db_replica_bind')
+                if replica_bind:
+                    return self._db.engines[replica_bind]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def primary_reads_since(invalidated_at: Optional[float]) -> Iterator[None]:
+    """
+    行程內快取失效後，重新載入快取的讀取改用主資料庫
+    
+    使快取失效的寫入在 READ_REPLICA_STICKY_SECONDS（副本延遲上限）內可能尚未複寫到副本，
+    此時由副本重新載入會把舊資料放回快取直到 TTL 到期。超過此時間後照常使用副本；
+    其他行程的快取不會因本行程的寫入失效，其內容最多落後 TTL 加上副本延遲。
+    
+    Args:
+        invalidated_at: 快取最近一次失效的時間（time.monotonic()；從未失效時為 None）
+    """
+    session_ = current_app.extensions['sqlalchemy'].session()
+    window = current_app.config.get('READ_REPLICA_STICKY_SECONDS', 10)
+    if invalidated_at is None or time.monotonic() - invalidated_at >= window or session_.info.get('db_primary'):
+        yield
+        return
+    
+    session_.info['db_primary'] = True
+    try:
+        yield
+    finally:
+        session_.info.pop('db_primary', None)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session_: RoutingSession) -> None:
+    """使用者寫入後，在 READ_REPLICA_STICKY_SECONDS 內的讀取改用主資料庫（讀到自己的寫入）"""
+    if session_.info.pop('db_wrote', False) and has_request_context():
+        g.db_replica_bind = None
+        session['db_primary_until'] = time.time() + current_app.config.get('READ_REPLICA_STICKY_SECONDS', 10)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_write_flag(session_: RoutingSession) -> None:
+    """交易回滾時捨棄寫入標記"""
+    session_.info.pop('db_wrote', None)
+
+
+def init_db_routing(app: Flask) -> None:
+    """
+    設定讀取副本時，為 READ_REPLICA_ENDPOINTS 的請求選用副本
+    
+    Args:
+        app: Flask 應用程式實例
+    """
+    bind_keys = replica_bind_keys(app)
+    if not bind_keys:
+        return
+    
+    @app.before_request
+    def choose_database() -> None:
+        if request.endpoint not in current_app.config.get('READ_REPLICA_ENDPOINTS', ()):
+            return
+        if session.get('db_primary_until', 0) > time.time():
+            return
+        g.db_replica_bind = random.choice(bind_keys)
+
+
+def _sqlite_path(url: URL) -> str:
+    """SQLite 連線字串對應的檔案路徑（支援 file: URI 形式）"""
+    return url.database[5:] if url.query.get('uri') else url.database
+
+
+@replica_cli.command('sync')
+def sync_command() -> None:
+    """將主資料庫複製到各 SQLite 讀取副本（本機測試讀寫分流用）"""
+    db = current_app.extensions['sqlalchemy']
+    primary = db.engines[None]
+    bind_keys = replica_bind_keys(current_app)
+    if not bind_keys:
+        raise click.ClickException('未設定讀取副本（DATABASE_REPLICA_URLS）')
+    
+    for key in bind_keys:
+        replica = db.engines[key]
+        if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+            click.echo(f'{key}: 非 SQLite，請使用資料庫本身的複寫機制')
+            continue
+        
+        path = _sqlite_path(replica.url)
+        source = primary.raw_connection()
+        try:
+            target = sqlite3.connect(path)
+            try:
+                source.driver_connection.backup(target)
+                # 副本以唯讀方式開啟，改回 rollback journal 以免需要寫入 -shm 檔案
+                target.execute('PRAGMA journal_mode = DELETE')
+            finally:
+                target.close()
+        finally:
+            source.close()
+        replica.dispose()
+        click.echo(f'{key}: 已複製到 {path}')
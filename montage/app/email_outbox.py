@@ -0,0 +1,406 @@
+"""
+郵件寄件匣 - 請求只寫入 email_outbox，由背景寄件程序以共用 SMTP 連線批次寄出
+"""
+import logging
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+from flask_mail import Message
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+from app import db, mail
+from app.models import EmailOutbox
+
+outbox_cli = AppGroup('outbox', help='郵件寄件匣')
+
+_wakeup = threading.Event()
+
+
+def enqueue_email(subject: str, recipient: str, text_body: str,
+                  html_body: Optional[str] = None) -> EmailOutbox:
+    """
+    將信件加入寄件匣（由呼叫端提交；提交後喚醒背景寄件程序）
+    
+    Args:
+        subject: 信件主旨
+        recipient: 收件人
+        text_body: 純文字內容
+        html_body: HTML 內容（選填）
+    
+    Returns:
+        寄件匣紀錄
+    """
+    email = EmailOutbox(
+        recipient=recipient,
+        subject=subject,
+        text_body=text_body,
+        html_body=html_body
+    )
+    db.session.add(email)
+    db.session.info['outbox_enqueued'] = True
+    return email
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_after_commit(session_: Session) -> None:
+    """交易提交後喚醒背景寄件程序"""
+    if session_.info.pop('outbox_enqueued', False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session_: Session) -> None:
+    """交易回滾時捨棄喚醒標記"""
+    session_.info.pop('outbox_enqueued', None)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """第 attempts 次失敗後的重試間隔（指數退避，有上限）"""
+    config = current_app.config
+    base = config.get('EMAIL_OUTBOX_BACKOFF_SECONDS', 30)
+    return timedelta(seconds=min(base * (2 ** (attempts - 1)), config.get('EMAIL_OUTBOX_MAX_BACKOFF_SECONDS', 3600)))
+
+
+def _claim_batch(now: datetime) -> List[EmailOutbox]:
+    """
+    認領一批到期的待寄信件
+    
+    以單一 UPDATE 寫入認領識別碼與期限，多個寄件程序同時執行也不會重複寄送；
+    寄件程序中斷時，認領逾期的信件會再被認領。
+    
+    Args:
+        now: 目前時間（UTC）
+    
+    Returns:
+        本批信件
+    """
+    config = current_app.config
+    claim_token = uuid.uuid4().hex
+    due_ids = db.session.query(EmailOutbox.email_id)\
+        .filter(
+            EmailOutbox.status == EmailOutbox.STATUS_PENDING,
+            EmailOutbox.next_attempt_at <= now,
+            (EmailOutbox.locked_until.is_(None)) | (EmailOutbox.locked_until < now)
+        )\
+        .order_by(EmailOutbox.next_attempt_at)\
+        .limit(config.get('EMAIL_OUTBOX_BATCH_SIZE', 50))\
+        .scalar_subquery()
+    
+    result = db.session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.email_id.in_(due_ids))
+        .where((EmailOutbox.locked_until.is_(None)) | (EmailOutbox.locked_until < now))
+        .values(
+            claim_token=claim_token,
+            locked_until=now + timedelta(seconds=config.get('EMAIL_OUTBOX_LEASE_SECONDS', 300))
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    if not result.rowcount:
+        return []
+    
+    return EmailOutbox.query\
+        .filter_by(claim_token=claim_token)\
+        .order_by(EmailOutbox.email_id)\
+        .all()
+
+
+def _build_message(email: EmailOutbox) -> Message:
+    """由寄件匣紀錄建立郵件"""
+    return Message(
+        subject=email.subject,
+        recipients=[email.recipient],
+        body=email.text_body,
+        html=email.html_body
+    )
+
+
+def _clear_body(email: EmailOutbox) -> None:
+    """寄出或轉為 dead 後清除信件內容（確認與重設連結含有令牌明文，不留在資料庫）"""
+    email.text_body = ''
+    email.html_body = None
+
+
+def _record_failure(email: EmailOutbox, error: Exception, permanent: bool = False) -> None:
+    """
+    記錄寄送失敗：排定重試，或於重試用盡／永久性錯誤時轉為 dead
+    
+    Args:
+        email: 寄件匣紀錄
+        error: 錯誤
+        permanent: 是否為永久性錯誤（如收件人被拒）
+    """
+    email.attempts += 1
+    email.last_error = f'{type(error).__name__}: {error}'
+    email.claim_token = None
+    email.locked_until = None
+    if permanent or email.attempts >= current_app.config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 6):
+        email.status = EmailOutbox.STATUS_DEAD
+        _clear_body(email)
+        logging.error(f'郵件寄送失敗且不再重試 #{email.email_id}: {email.last_error}')
+    else:
+        email.next_attempt_at = datetime.utcnow() + _retry_delay(email.attempts)
+        logging.warning(f'郵件寄送失敗 #{email.email_id}（第 {email.attempts} 次）: {email.last_error}')
+
+
+def _is_permanent(error: Exception) -> bool:
+    """SMTP 5xx 回應（收件人或內容被拒）重試也不會成功"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """連線層級的錯誤（smtplib 的例外也繼承 OSError，需排除伺服器回應的錯誤）"""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPConnection:
+    """
+    可跨批次重用的 SMTP 連線
+    
+    第一次寄信時才連線；重用的連線若已被伺服器關閉，會重新連線再試一次。
+    閒置超過 idle_seconds 後由 close_if_idle 關閉。
+    """
+    
+    def __init__(self, idle_seconds: float = 30.0) -> None:
+        """
+        初始化連線
+        
+        Args:
+            idle_seconds: 閒置多久後關閉連線
+        """
+        self.idle_seconds = idle_seconds
+        self._connection = None
+        self._used_at = 0.0
+    
+    def __enter__(self) -> 'SMTPConnection':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def _open(self) -> None:
+        connection = mail.connect()
+        connection.__enter__()
+        self._connection = connection
+    
+    def send(self, message: Message) -> None:
+        """
+        寄出一封信件
+        
+        Args:
+            message: 郵件
+        """
+        reused = self._connection is not None
+        if not reused:
+            self._open()
+        try:
+            self._connection.send(message)
+        except Exception as e:
+            if not _is_connection_error(e):
+                raise
+            self.close()
+            if not reused:
+                raise
+            self._open()
+            self._connection.send(message)
+        self._used_at = time.monotonic()
+    
+    def close_if_idle(self) -> None:
+        """閒置逾時時關閉連線"""
+        if self._connection is not None and time.monotonic() - self._used_at > self.idle_seconds:
+            self.close()
+    
+    def close(self) -> None:
+        """關閉連線"""
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+
+
+def _send_batch(emails: List[EmailOutbox], counts: Dict[str, int], connection: SMTPConnection) -> None:
+    """
+    以同一 SMTP 連線寄出一批信件
+    
+    Args:
+        emails: 已認領的信件
+        counts: 統計（累加）
+        connection: SMTP 連線
+    """
+    try:
+        for index, email in enumerate(emails):
+            try:
+                connection.send(_build_message(email))
+            except Exception as e:
+                _record_failure(email, e, permanent=_is_permanent(e))
+                counts['dead' if email.status == EmailOutbox.STATUS_DEAD else 'retried'] += 1
+                if _is_connection_error(e):
+                    # 無法連線：其餘未嘗試的信件釋放認領，下一輪再寄
+                    for pending in emails[index + 1:]:
+                        pending.claim_token = None
+                        pending.locked_until = None
+                    break
+            else:
+                email.status = EmailOutbox.STATUS_SENT
+                email.sent_at = datetime.utcnow()
+                email.claim_token = None
+                email.locked_until = None
+                _clear_body(email)
+                counts['sent'] += 1
+    finally:
+        db.session.commit()
+
+
+def process_outbox(max_batches: Optional[int] = None,
+                   connection: Optional[SMTPConnection] = None) -> Dict[str, int]:
+    """
+    寄出寄件匣中到期的信件
+    
+    Args:
+        max_batches: 最多處理的批次數（預設處理至沒有到期信件）
+        connection: 可重用的 SMTP 連線（未提供時本次處理結束即關閉）
+    
+    Returns:
+        {'sent': 寄出數, 'retried': 排定重試數, 'dead': 轉為 dead 數}
+    """
+    own_connection = connection is None
+    connection = connection or SMTPConnection()
+    counts = {'sent': 0, 'retried': 0, 'dead': 0}
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            emails = _claim_batch(datetime.utcnow())
+            if not emails:
+                break
+            _send_batch(emails, counts, connection)
+            batches += 1
+            if counts['retried']:
+                break  # 有暫時性失敗時留待下一輪，避免對故障的 SMTP 伺服器連續重試
+    finally:
+        if own_connection:
+            connection.close()
+    return counts
+
+
+def purge_outbox(keep_days: Optional[int] = None) -> int:
+    """
+    刪除已寄出與 dead 的舊信件，並清除其餘已結束信件殘留的內容
+    
+    Args:
+        keep_days: 保留天數（預設取 EMAIL_OUTBOX_KEEP_DAYS）
+    
+    Returns:
+        刪除的信件數
+    """
+    keep_days = keep_days or current_app.config.get('EMAIL_OUTBOX_KEEP_DAYS', 7)
+    outbox = EmailOutbox.__table__
+    finished = outbox.c.status.in_([EmailOutbox.STATUS_SENT, EmailOutbox.STATUS_DEAD])
+    # dead 信件沒有寄出時間，以建立時間計算保留期間
+    result = db.session.execute(
+        outbox.delete()
+        .where(finished)
+        .where(func.coalesce(outbox.c.sent_at, outbox.c.created_at) < datetime.utcnow() - timedelta(days=keep_days))
+    )
+    db.session.execute(
+        outbox.update()
+        .where(finished)
+        .where((outbox.c.text_body != '') | outbox.c.html_body.isnot(None))
+        .values(text_body='', html_body=None)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+class OutboxWorker(threading.Thread):
+    """
+    背景寄件執行緒
+    
+    有新信件提交時立即喚醒，否則每隔 EMAIL_OUTBOX_POLL_SECONDS 檢查一次到期的重試；
+    SMTP 連線在各輪之間保留，閒置超過 EMAIL_OUTBOX_IDLE_SECONDS 才關閉。
+    """
+    
+    def __init__(self, app: Flask) -> None:
+        super().__init__(name='email-outbox', daemon=True)
+        self.app = app
+        self.poll_seconds = app.config.get('EMAIL_OUTBOX_POLL_SECONDS', 5)
+        self.connection = SMTPConnection(app.config.get('EMAIL_OUTBOX_IDLE_SECONDS', 30))
+        self._stopped = threading.Event()
+    
+    def stop(self) -> None:
+        """停止執行緒"""
+        self._stopped.set()
+        _wakeup.set()
+    
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            _wakeup.wait(self.poll_seconds)
+            _wakeup.clear()
+            if self._stopped.is_set():
+                break
+            with self.app.app_context():
+                try:
+                    process_outbox(connection=self.connection)
+                    self.connection.close_if_idle()
+                except Exception as e:
+                    logging.error(f'寄件匣處理時發生錯誤: {str(e)}')
+                    db.session.rollback()
+                    self.connection.close()
+                finally:
+                    db.session.remove()
+        
+        with self.app.app_context():
+            self.connection.close()
+
+
+def start_outbox_worker(app: Flask) -> OutboxWorker:
+    """
+    啟動背景寄件執行緒
+    
+    Args:
+        app: Flask 應用程式實例
+    
+    Returns:
+        寄件執行緒
+    """
+    worker = OutboxWorker(app)
+    worker.start()
+    app.logger.info('寄件匣背景寄件程序已啟動')
+    
+    import atexit
+    atexit.register(worker.stop)
+    return worker
+
+
+@outbox_cli.command('send')
+@click.option('--max-batches', type=int, default=None, help='最多處理的批次數')
+def send_command(max_batches: Optional[int]) -> None:
+    """立即寄出寄件匣中到期的信件"""
+    counts = process_outbox(max_batches)
+    click.echo(f'寄出 {counts["sent"]}、排定重試 {counts["retried"]}、dead {counts["dead"]}')
+
+
+@outbox_cli.command('stats')
+def stats_command() -> None:
+    """顯示寄件匣各狀態的信件數"""
+    for status, count in db.session.query(EmailOutbox.status, func.count()).group_by(EmailOutbox.status):
+        click.echo(f'{status:<8} {count}')
+
+
+@outbox_cli.command('purge')
+@click.option('--keep-days', type=int, default=None, help='已寄出與 dead 信件的保留天數')
+def purge_command(keep_days: Optional[int]) -> None:
+    """刪除已寄出與 dead 的舊信件"""
+    click.echo(f'已刪除 {purge_outbox(keep_days)} 封已寄出或 dead 的信件')
@@ -1,20 +1,22 @@
 """
 郵件發送工具 (Gmail SMTP)
+
+信件先寫入寄件匣（email_outbox），由背景寄件程序寄出，請求不需等待 SMTP。
 """
 from flask import current_app, url_for
-from flask_mail import Message
-from app import mail
+from app import db
+from app.email_outbox import enqueue_email
 from typing import Optional
 
 
-def send_confirmation_email(user) -> None:
+def send_confirmation_email(user, token: str) -> None:
     """
     發送電子郵件確認信件
     
     Args:
         user: 使用者物件
+        token: 確認令牌
     """
-    token = user.confirmation_token
     confirm_url = url_for('auth.confirm_email', token=token, _external=True)
     
     subject = '蒙太奇之愛 - 確認您的電子郵件'
@@ -158,7 +160,7 @@ def send_password_reset_email(user, token: str) -> None:
 
 def send_email(subject: str, recipient: str, text_body: str, html_body: Optional[str] = None) -> None:
     """
-    發送電子郵件
+    將電子郵件加入寄件匣（寫入後即返回，由背景寄件程序寄出）
     
     Args:
         subject: 信件主旨
@@ -166,16 +168,11 @@ def send_email(subject: str, recipient: str, text_body: str, html_body: Optional
         text_body: 純文字內容
         html_body: HTML 內容（選填）
     """
-    msg = Message(
-        subject=subject,
-        recipients=[recipient],
-        body=text_body,
-        html=html_body
-    )
-    
     try:
-        mail.send(msg)
-        current_app.logger.info(f'郵件已發送至 {recipient}: {subject}')
+        enqueue_email(subject, recipient, text_body, html_body)
+        db.session.commit()
+        current_app.logger.info(f'郵件已排入寄件匣 {recipient}: {subject}')
     except Exception as e:
-        current_app.logger.error(f'郵件發送失敗 {recipient}: {str(e)}')
+        db.session.rollback()
+        current_app.logger.error(f'郵件排入寄件匣失敗 {recipient}: {str(e)}')
         raise e
@@ -0,0 +1,173 @@
+"""
+電影列表篩選面板 - 年份、類型與評分區間的計數（行程內快取）
+"""
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.db_routing import primary_reads_since
+from app.models import Movie, movie_genres
+
+# 評分篩選的門檻（對應「X 星以上」選項）
+RATING_THRESHOLDS = (4.0, 3.5, 3.0, 2.5)
+
+# 變更後需要使面板失效的電影欄位（genre_ids 決定 movie_genres 關聯）
+# 評論寫入只改變 avg_rating，評分面板在快取到期（FACET_CACHE_SECONDS）後更新，不整批重新載入
+FACET_FIELDS = ('release_year', 'genre_ids')
+
+_lock = threading.Lock()
+_generation = 0
+_invalidated_at: Optional[float] = None  # 最近一次失效的時間（time.monotonic()）
+_catalog: Optional[Tuple[int, float, list]] = None  # (世代, 到期時間, 電影投影)
+_facet_cache: 'OrderedDict[tuple, Tuple[int, Dict[str, Any]]]' = OrderedDict()  # 依最近使用排序，超過上限時淘汰最舊者
+
+
+def invalidate_facets() -> None:
+    """使面板資料失效（下次請求時重新載入）"""
+    global _generation, _invalidated_at
+    with _lock:
+        _generation += 1
+        _invalidated_at = time.monotonic()
+        _facet_cache.clear()
+
+
+def _load_catalog() -> list:
+    """
+    載入電影的精簡投影：(上映年份, 平均評分, 類型 ID 組)
+    
+    Returns:
+        電影投影列表
+    """
+    movie_genre_ids = defaultdict(list)
+    for movie_id, genre_id in db.session.query(movie_genres.c.movie_id, movie_genres.c.genre_id):
+        movie_genre_ids[movie_id].append(genre_id)
+    
+    return [
+        (release_year, avg_rating or 0.0, tuple(movie_genre_ids.get(movie_id, ())))
+        for movie_id, release_year, avg_rating in db.session.query(
+            Movie.movie_id, Movie.release_year, Movie.avg_rating
+        )
+    ]
+
+
+def _get_catalog(ttl: int) -> Tuple[int, list]:
+    """取得目前世代的電影投影（過期或失效時重新載入）"""
+    global _catalog
+    with _lock:
+        catalog = _catalog
+        generation = _generation
+        invalidated_at = _invalidated_at
+    if catalog and catalog[0] == generation and catalog[1] > time.monotonic():
+        return generation, catalog[2]
+    
+    with primary_reads_since(invalidated_at):
+        rows = _load_catalog()
+    with _lock:
+        if generation == _generation:
+            _catalog = (generation, time.monotonic() + ttl, rows)
+            # 舊投影計算的面板資料一併捨棄（TTL 到期重新載入時世代不變）
+            _facet_cache.clear()
+    return generation, rows
+
+
+def get_movie_facets(genre_id: Optional[int] = None, year: Optional[int] = None,
+                     rating_min: Optional[float] = None, ttl: int = 300,
+                     max_entries: int = 256) -> Dict[str, Any]:
+    """
+    取得電影列表的篩選面板資料
+    
+    每個面板的計數套用「其他」已啟用的篩選條件（不含自身），
+    讓使用者看到切換該選項後的結果數；所有計數在一次掃描中完成並快取。
+    
+    Args:
+        genre_id: 目前的類型篩選
+        year: 目前的年份篩選
+        rating_min: 目前的最低評分篩選（RATING_THRESHOLDS 之一）
+        ttl: 電影投影的快取秒數
+        max_entries: 面板資料快取的組合數上限
+    
+    Returns:
+        {'years': [(年份, 數量)], 'genres': [(類型 ID, 數量)],
+         'ratings': [(門檻, 數量)], 'total': 符合全部條件的數量}
+    """
+    key = (genre_id, year, rating_min)
+    with _lock:
+        cached = _facet_cache.get(key)
+        if cached and cached[0] == _generation and _catalog and _catalog[1] > time.monotonic():
+            _facet_cache.move_to_end(key)
+            return cached[1]
+    
+    generation, catalog = _get_catalog(ttl)
+    
+    year_counts = defaultdict(int)
+    genre_counts = defaultdict(int)
+    rating_counts = {threshold: 0 for threshold in RATING_THRESHOLDS}
+    total = 0
+    for release_year, avg_rating, genre_ids in catalog:
+        in_genre = genre_id is None or genre_id in genre_ids
+        in_year = year is None or release_year == year
+        in_rating = rating_min is None or avg_rating >= rating_min
+        
+        if release_year is not None:
+            year_counts[release_year] += 1 if in_genre and in_rating else 0
+        for movie_genre_id in genre_ids:
+            genre_counts[movie_genre_id] += 1 if in_year and in_rating else 0
+        if in_genre and in_year:
+            for threshold in RATING_THRESHOLDS:
+                if avg_rating >= threshold:
+                    rating_counts[threshold] += 1
+        if in_genre and in_year and in_rating:
+            total += 1
+    
+    facets = {
+        'years': sorted(year_counts.items(), reverse=True),
+        'genres': sorted(genre_counts.items(), key=lambda item: (-item[1], item[0])),
+        'ratings': list(rating_counts.items()),
+        'total': total
+    }
+    with _lock:
+        if generation == _generation:
+            _facet_cache[key] = (generation, facets)
+            while len(_facet_cache) > max_entries:
+                _facet_cache.popitem(last=False)
+    return facets
+
+
+def mark_facets_dirty(session_: Session) -> None:
+    """標記交易中有影響面板的異動（供繞過 ORM 的批次寫入使用），待提交後失效"""
+    session_.info['facets_dirty'] = True
+
+
+def _mark_dirty(mapper, connection, target: Movie) -> None:
+    """標記目前交易有新增或刪除電影，待提交後失效"""
+    session_ = Session.object_session(target)
+    if session_ is not None:
+        mark_facets_dirty(session_)
+
+
+def _mark_dirty_if_facet_changed(mapper, connection, target: Movie) -> None:
+    """電影的年份或類型變更時才標記失效（評分變更依快取到期更新）"""
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in FACET_FIELDS):
+        _mark_dirty(mapper, connection, target)
+
+
+event.listen(Movie, 'after_insert', _mark_dirty)
+event.listen(Movie, 'after_update', _mark_dirty_if_facet_changed)
+event.listen(Movie, 'after_delete', _mark_dirty)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session_: Session) -> None:
+    """交易提交後使面板資料失效"""
+    if session_.info.pop('facets_dirty', False):
+        invalidate_facets()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session_: Session) -> None:
+    """交易回滾時捨棄失效標記"""
+    session_.info.pop('facets_dirty', False)
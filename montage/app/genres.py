@@ -0,0 +1,168 @@
+"""
+電影類型 - 類型對照表快取與 movie_genres 回填
+"""
+import threading
+import time
+from typing import Dict, Optional
+import click
+from flask import Flask
+from flask.cli import AppGroup
+from sqlalchemy import event, func
+from app import db
+from app.db_routing import primary_reads_since
+from app.models import Genre, Movie, movie_genres, parse_genre_ids
+
+# TMDb 電影類型（zh-TW），資料庫尚無類型資料時作為預設值
+TMDB_GENRES = {
+    28: '動作',
+    12: '冒險',
+    16: '動畫',
+    35: '喜劇',
+    80: '犯罪',
+    99: '紀錄',
+    18: '劇情',
+    10751: '家庭',
+    14: '奇幻',
+    36: '歷史',
+    27: '恐怖',
+    10402: '音樂',
+    9648: '懸疑',
+    10749: '愛情',
+    878: '科幻',
+    10770: '電視電影',
+    53: '驚悚',
+    10752: '戰爭',
+    37: '西部'
+}
+
+# 回填時每批處理的電影數
+BACKFILL_BATCH_SIZE = 1000
+
+genres_cli = AppGroup('genres', help='電影類型管理')
+
+_genre_map: Optional[Dict[int, str]] = None
+_genre_map_invalidated_at: Optional[float] = None  # 最近一次失效的時間（time.monotonic()）
+_genre_map_lock = threading.Lock()
+
+
+def get_genre_map() -> Dict[int, str]:
+    """
+    取得類型 ID → 名稱對照表（行程內快取，只在首次使用時查詢）
+    
+    Returns:
+        類型對照表
+    """
+    global _genre_map
+    if _genre_map is None:
+        with _genre_map_lock:
+            if _genre_map is None:
+                # 對照表沒有 TTL，失效後不可由尚未複寫的讀取副本重新載入
+                with primary_reads_since(_genre_map_invalidated_at):
+                    _genre_map = dict(db.session.query(Genre.genre_id, Genre.name).all()) or dict(TMDB_GENRES)
+    return _genre_map
+
+
+def invalidate_genre_map() -> None:
+    """清除類型對照表快取"""
+    global _genre_map, _genre_map_invalidated_at
+    _genre_map_invalidated_at = time.monotonic()
+    _genre_map = None
+
+
+@event.listens_for(Genre, 'after_insert')
+@event.listens_for(Genre, 'after_update')
+@event.listens_for(Genre, 'after_delete')
+def _genre_changed(mapper, connection, target: Genre) -> None:
+    """類型資料變更後清除快取"""
+    invalidate_genre_map()
+
+
+def seed_genres() -> int:
+    """
+    寫入預設 TMDb 類型（僅補上不存在的類型）
+    
+    Returns:
+        新增的類型數
+    """
+    existing_ids = {genre_id for genre_id, in db.session.query(Genre.genre_id).all()}
+    new_genres = [
+        Genre(genre_id=genre_id, name=name)
+        for genre_id, name in TMDB_GENRES.items()
+        if genre_id not in existing_ids
+    ]
+    db.session.add_all(new_genres)
+    db.session.commit()
+    return len(new_genres)
+
+
+def backfill_movie_genres() -> int:
+    """
+    依 Movie.genre_ids 字串重建 movie_genres 關聯表
+    
+    以分批方式讀取 (movie_id, genre_ids) 並批次寫入，不載入完整的電影物件。
+    
+    Returns:
+        寫入的關聯數
+    """
+    db.session.execute(movie_genres.delete())
+    
+    total_links = 0
+    last_movie_id = 0
+    while True:
+        rows = db.session.query(Movie.movie_id, Movie.genre_ids)\
+            .filter(Movie.movie_id > last_movie_id)\
+            .order_by(Movie.movie_id)\
+            .limit(BACKFILL_BATCH_SIZE)\
+            .all()
+        if not rows:
+            break
+        
+        links = [
+            {'movie_id': movie_id, 'genre_id': genre_id}
+            for movie_id, genre_ids in rows
+            for genre_id in parse_genre_ids(genre_ids)
+        ]
+        if links:
+            db.session.execute(movie_genres.insert(), links)
+            total_links += len(links)
+        last_movie_id = rows[-1].movie_id
+    
+    db.session.commit()
+    return total_links
+
+
+def ensure_genres(app: Flask) -> None:
+    """
+    啟動時補齊類型資料：類型表為空時寫入預設值，關聯表為空時自動回填
+    
+    Args:
+        app: Flask 應用程式實例
+    """
+    try:
+        if not db.session.query(Genre.genre_id).first():
+            seed_genres()
+        
+        has_links = db.session.query(movie_genres.c.movie_id).first() is not None
+        if not has_links and db.session.query(Movie.movie_id).filter(Movie.genre_ids != '').first():
+            backfill_movie_genres()
+    except Exception as e:
+        app.logger.error(f'初始化電影類型資料時發生錯誤: {str(e)}')
+        db.session.rollback()
+
+
+@genres_cli.command('backfill')
+def backfill_command() -> None:
+    """寫入預設類型並依 genre_ids 回填 movie_genres"""
+    added_genres = seed_genres()
+    total_links = backfill_movie_genres()
+    invalidate_genre_map()
+    
+    click.echo(f'新增 {added_genres} 個類型，寫入 {total_links} 筆電影類型關聯')
+    click.echo('各類型電影數：')
+    counts = db.session.query(movie_genres.c.genre_id, func.count())\
+        .group_by(movie_genres.c.genre_id)\
+        .order_by(func.count().desc())\
+        .all()
+    genre_map = get_genre_map()
+    for genre_id, count in counts:
+        click.echo(f'  {genre_map.get(genre_id, genre_id)}: {count}')
@@ -0,0 +1,91 @@
+"""
+HTTP 條件式請求 - ETag / Last-Modified 驗證與 304 回應
+"""
+import hashlib
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from flask import Response, request, session
+
+
+def make_etag(version: str, *variants: Iterable[str]) -> str:
+    """
+    由資料版本與表示方式變因產生 ETag
+    
+    Args:
+        version: 資料版本字串
+        *variants: 影響回應內容的其他因素（例如網址、使用者）
+    
+    Returns:
+        ETag 值（不含引號）
+    """
+    raw = '|'.join([version, *[str(variant) for variant in variants]])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _as_http_date(value: Optional[datetime]) -> Optional[datetime]:
+    """將資料庫中的 UTC 時間轉為秒精度、帶時區的時間"""
+    if value is None:
+        return None
+    return value.replace(microsecond=0, tzinfo=timezone.utc)
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None,
+                   weak: bool = False, private: bool = False, vary_cookie: bool = True) -> Response:
+    """
+    設定驗證標頭與快取策略（每次使用前都需向伺服器驗證）
+    
+    Args:
+        response: 回應物件
+        etag: ETag 值
+        last_modified: 最後異動時間（UTC）
+        weak: 是否為弱 ETag（內容含 CSRF 權杖等非決定性片段時使用）
+        private: 是否僅允許瀏覽器快取（登入使用者的頁面）
+        vary_cookie: 回應是否依 Cookie 而不同
+    
+    Returns:
+        同一回應物件
+    """
+    response.set_etag(etag, weak=weak)
+    if last_modified is not None:
+        response.last_modified = _as_http_date(last_modified)
+    response.cache_control.no_cache = True
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    if vary_cookie:
+        response.vary.add('Cookie')
+    return response
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None, weak: bool = False,
+                 private: bool = False, vary_cookie: bool = True) -> Optional[Response]:
+    """
+    在執行查詢與渲染前檢查用戶端快取是否仍有效
+    
+    If-None-Match 優先於 If-Modified-Since；有待顯示的訊息時一律重新渲染。
+    
+    Args:
+        etag: 目前的 ETag 值
+        last_modified: 目前的最後異動時間（UTC）
+        weak: 是否為弱 ETag
+        private: 是否僅允許瀏覽器快取
+        vary_cookie: 回應是否依 Cookie 而不同
+    
+    Returns:
+        304 回應；內容已變更時回傳 None
+    """
+    if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+        return None
+    
+    if request.if_none_match:
+        # If-None-Match 依規範一律採弱比較
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = _as_http_date(last_modified) <= request.if_modified_since
+    else:
+        matched = False
+    
+    if not matched:
+        return None
+    return set_validators(Response(status=304), etag, last_modified, weak, private, vary_cookie)
@@ -1,12 +1,18 @@
 """
 SQLAlchemy 資料模型
 """
+import re
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-import bcrypt
+from sqlalchemy import event, func, inspect, literal_column
+from sqlalchemy.orm import configure_mappers, joinedload
 from app import db
+from app.passwords import hash_password, needs_rehash, verify_password
+
+# 有效評分（1-5 星）
+RATING_VALUES = range(1, 6)
 
 
 class User(UserMixin, db.Model):
@@ -21,10 +27,10 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     email_confirmed = db.Column(db.Boolean, default=False, nullable=False)
-    confirmation_token = db.Column(db.String(255), nullable=True)
     
     # 關聯
     reviews = db.relationship('Review', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    auth_tokens = db.relationship('AuthToken', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     
     def __init__(self, email: str, password: str, display_name: str) -> None:
         """
@@ -41,13 +47,12 @@ class User(UserMixin, db.Model):
     
     def set_password(self, password: str) -> None:
         """
-        設定密碼（bcrypt 雜湊）
+        設定密碼（bcrypt 雜湊，成本參數取 BCRYPT_ROUNDS）
         
         Args:
             password: 明文密碼
         """
-        salt = bcrypt.gensalt()
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        self.password_hash = hash_password(password)
     
     def check_password(self, password: str) -> bool:
         """
@@ -59,16 +64,45 @@ class User(UserMixin, db.Model):
         Returns:
             密碼是否正確
         """
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return verify_password(password, self.password_hash)
+    
+    def password_needs_rehash(self) -> bool:
+        """密碼雜湊的成本參數是否與目前設定不同（登入成功時據以重新雜湊）"""
+        return needs_rehash(self.password_hash)
     
     def get_id(self) -> str:
         """Flask-Login 需要的方法"""
         return str(self.user_id)
     
+    # 由 preload_review_counts 批次預載的評論數（非資料表欄位）
+    _review_count = None
+    
     def get_review_count(self) -> int:
-        """取得使用者評論數量"""
+        """取得使用者評論數量（優先使用批次預載的值）"""
+        if self._review_count is not None:
+            return self._review_count
         return self.reviews.count()
     
+    @classmethod
+    def preload_review_counts(cls, users: List['User']) -> None:
+        """
+        以單一分組查詢批次載入多位使用者的評論數
+        
+        Args:
+            users: 使用者列表
+        """
+        if not users:
+            return
+        
+        counts = dict(
+            db.session.query(Review.user_id, db.func.count(Review.review_id))
+            .filter(Review.user_id.in_([user.user_id for user in users]))
+            .group_by(Review.user_id)
+            .all()
+        )
+        for user in users:
+            user._review_count = counts.get(user.user_id, 0)
+    
     def has_reviewed_movie(self, movie_id: int) -> bool:
         """
         檢查使用者是否已評論該電影
@@ -85,6 +119,38 @@ class User(UserMixin, db.Model):
         return f'<User {self.email}>'
 
 
+# 電影與類型的關聯表（genre_id 索引供類型篩選使用）
+movie_genres = db.Table(
+    'movie_genres',
+    db.Column('movie_id', db.Integer, db.ForeignKey('movies.movie_id'), primary_key=True),
+    db.Column('genre_id', db.Integer, primary_key=True),
+    db.Index('ix_movie_genres_genre_id', 'genre_id', 'movie_id')
+)
+
+
+class Genre(db.Model):
+    """電影類型模型（TMDb genre）"""
+    
+    __tablename__ = 'genres'
+    
+    genre_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(50), nullable=False)
+    
+    def __init__(self, genre_id: int, name: str) -> None:
+        """
+        初始化類型
+        
+        Args:
+            genre_id: TMDb 類型 ID
+            name: 類型名稱
+        """
+        self.genre_id = genre_id
+        self.name = name
+    
+    def __repr__(self) -> str:
+        return f'<Genre {self.genre_id} {self.name}>'
+
+
 class Movie(db.Model):
     """電影模型"""
     
@@ -94,6 +160,14 @@ class Movie(db.Model):
     title = db.Column(db.String(255), nullable=False, index=True)
     release_year = db.Column(db.Integer, nullable=True, index=True)
     avg_rating = db.Column(db.Float, default=0.0, nullable=False)
+    # 評分統計（由 Review 寫入事件以增量方式維護）
+    review_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_1_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_2_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_3_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_4_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_5_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     poster_url = db.Column(db.String(500), nullable=True)
     genre_ids = db.Column(db.Text, nullable=True)  # JSON 字串格式
     runtime = db.Column(db.Integer, nullable=True)
@@ -102,6 +176,8 @@ class Movie(db.Model):
     vote_average = db.Column(db.Float, nullable=True)  # TMDb 評分
     tmdb_id = db.Column(db.Integer, unique=True, nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # 電影資料或其評論最後異動時間（HTTP 條件式請求的版本依據）
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
     
     # 關聯
     reviews = db.relationship('Review', backref='movie', lazy='dynamic', cascade='all, delete-orphan')
@@ -122,19 +198,59 @@ class Movie(db.Model):
                 setattr(self, key, value)
     
     def get_review_count(self) -> int:
-        """取得電影評論數量"""
-        return self.reviews.count()
+        """取得電影評論數量（讀取增量維護的 review_count，不另行查詢）"""
+        return self.review_count or 0
     
     def calculate_avg_rating(self) -> None:
-        """重新計算平均評分"""
-        reviews = self.reviews.all()
-        if reviews:
-            total_rating = sum(review.rating for review in reviews)
-            self.avg_rating = round(total_rating / len(reviews), 2)
-        else:
-            self.avg_rating = 0.0
+        """
+        重新計算評分統計（修復用途）
+        
+        一般的評論寫入會透過 Review 事件增量更新統計欄位，
+        此方法僅在統計資料不一致時以單一聚合查詢重建。
+        """
+        rating_stats = db.session.query(
+            Review.rating,
+            db.func.count(Review.review_id)
+        ).filter(Review.movie_id == self.movie_id)\
+         .group_by(Review.rating)\
+         .all()
+        
+        distribution = {rating: 0 for rating in RATING_VALUES}
+        for rating, count in rating_stats:
+            if rating in distribution:
+                distribution[rating] = count
+        
+        for rating, count in distribution.items():
+            setattr(self, f'rating_{rating}_count', count)
+        self.review_count = sum(distribution.values())
+        self.rating_sum = sum(rating * count for rating, count in distribution.items())
+        self.avg_rating = round(self.rating_sum / self.review_count, 2) if self.review_count else 0.0
         db.session.commit()
     
+    def get_rating_distribution(self) -> Dict[int, int]:
+        """
+        取得評分分佈
+        
+        Returns:
+            {星數: 評論數} 字典（1-5 星）
+        """
+        return {rating: getattr(self, f'rating_{rating}_count') or 0 for rating in RATING_VALUES}
+    
+    def get_last_modified(self) -> datetime:
+        """取得電影頁面內容的最後異動時間（UTC）"""
+        return self.updated_at or self.created_at
+    
+    def get_version(self) -> str:
+        """
+        取得電影資料版本（評論數、評分總和與最後異動時間）
+        
+        Returns:
+            版本字串，評論新增、修改或刪除後即改變
+        """
+        last_modified = self.get_last_modified()
+        return f'{self.movie_id}-{self.review_count or 0}-{self.rating_sum or 0}-' \
+               f'{last_modified.isoformat() if last_modified else ""}'
+    
     def get_recent_reviews(self, limit: int = 5) -> List['Review']:
         """
         取得最近的評論
@@ -157,9 +273,9 @@ class Movie(db.Model):
         if not self.genre_ids:
             return []
         
-        # 這裡應該根據 TMDb 的 genre mapping 來轉換
-        # 暫時返回空列表，後續實作時補上
-        return []
+        from app.genres import get_genre_map
+        genre_map = get_genre_map()
+        return [genre_map[genre_id] for genre_id in parse_genre_ids(self.genre_ids) if genre_id in genre_map]
     
     def __repr__(self) -> str:
         return f'<Movie {self.title} ({self.release_year})>'
@@ -179,8 +295,11 @@ class Review(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # 建立複合唯一索引，確保一個使用者對一部電影只能評論一次
+    # 並以 (電影/使用者, 建立時間) 索引支援評論列表的 keyset 分頁
     __table_args__ = (
         db.UniqueConstraint('user_id', 'movie_id', name='unique_user_movie_review'),
+        db.Index('ix_reviews_movie_created', 'movie_id', 'created_at'),
+        db.Index('ix_reviews_user_created', 'user_id', 'created_at'),
     )
     
     def __init__(self, user_id: int, movie_id: int, rating: int, comment_text: Optional[str] = None) -> None:
@@ -198,6 +317,36 @@ class Review(db.Model):
         self.rating = rating
         self.comment_text = comment_text
     
+    @staticmethod
+    def listing_options(with_user: bool = True, with_movie: bool = True) -> list:
+        """
+        評論列表共用的預先載入選項
+        
+        以 JOIN 在同一次查詢中取得作者與電影，且只載入模板需要的欄位。
+        
+        Args:
+            with_user: 是否載入作者
+            with_movie: 是否載入電影
+            
+        Returns:
+            可傳入 Query.options() 的載入選項列表
+        """
+        # Review.user / Review.movie 為 backref，需確保映射已完成設定
+        configure_mappers()
+        
+        options = []
+        if with_user:
+            options.append(
+                joinedload(Review.user, innerjoin=True)
+                .load_only(User.user_id, User.display_name)
+            )
+        if with_movie:
+            options.append(
+                joinedload(Review.movie, innerjoin=True)
+                .load_only(Movie.movie_id, Movie.title, Movie.poster_url, Movie.release_year)
+            )
+        return options
+    
     def validate_rating(self) -> bool:
         """
         驗證評分範圍
@@ -236,3 +385,333 @@ class Review(db.Model):
     
     def __repr__(self) -> str:
         return f'<Review User:{self.user_id} Movie:{self.movie_id} Rating:{self.rating}>'
+
+
+
+# 評論列表的排序鍵（建立時間降序，review_id 為決勝鍵）
+REVIEW_SORT_KEYS = [Review.created_at, Review.review_id]
+
+# /movies 各排序方式的排序鍵（皆同向排序，最後一鍵 movie_id 為決勝鍵）
+# 常數以 literal_column 內嵌，讓查詢與下方的運算式索引一致
+MOVIE_SORT_KEYS = {
+    'popular': [
+        Movie.review_count,
+        func.coalesce(Movie.vote_average, literal_column('-1')),
+        func.coalesce(Movie.release_year, literal_column('0')),
+        Movie.created_at,
+        Movie.movie_id
+    ],
+    'rating': [
+        func.coalesce(func.nullif(Movie.avg_rating, literal_column('0.0')), Movie.vote_average, literal_column('0.0')),
+        Movie.review_count,
+        func.coalesce(Movie.release_year, literal_column('0')),
+        Movie.movie_id
+    ],
+    'recent': [
+        func.coalesce(Movie.release_year, literal_column('0')),
+        Movie.created_at,
+        Movie.movie_id
+    ],
+    'title': [
+        Movie.title,
+        Movie.movie_id
+    ]
+}
+MOVIE_SORT_DESCENDING = {'popular': True, 'rating': True, 'recent': True, 'title': False}
+
+# 排序索引（title 已有單欄索引；movie_id 為 rowid，隱含於索引尾端）
+for _sort_by in ('popular', 'rating', 'recent'):
+    db.Index(f'ix_movies_sort_{_sort_by}', *MOVIE_SORT_KEYS[_sort_by][:-1])
+
+class RankingSnapshot(db.Model):
+    """排行榜快照模型（由排程器定期重建）"""
+    
+    __tablename__ = 'ranking_snapshot'
+    
+    kind = db.Column(db.String(32), primary_key=True)  # popular, top_rated_<n>, hero
+    position = db.Column(db.Integer, primary_key=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.movie_id'), nullable=False)
+    score = db.Column(db.Float, default=0.0, nullable=False)
+    review_count = db.Column(db.Integer, default=0, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self) -> str:
+        return f'<RankingSnapshot {self.kind}#{self.position} Movie:{self.movie_id}>'
+
+
+class TMDbSyncRun(db.Model):
+    """TMDb 增量同步執行紀錄（亦作為同步檢查點）"""
+    
+    __tablename__ = 'tmdb_sync_runs'
+    
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    
+    run_id = db.Column(db.Integer, primary_key=True)
+    window_start = db.Column(db.DateTime, nullable=False)  # 變更區間（TMDb changes feed）
+    window_end = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(16), default=STATUS_RUNNING, nullable=False, index=True)
+    last_page = db.Column(db.Integer, default=0, nullable=False)  # 最後一個已提交的分頁
+    total_pages = db.Column(db.Integer, nullable=True)
+    changed_count = db.Column(db.Integer, default=0, nullable=False)  # 變更清單中的電影數
+    updated_count = db.Column(db.Integer, default=0, nullable=False)
+    unchanged_count = db.Column(db.Integer, default=0, nullable=False)
+    skipped_count = db.Column(db.Integer, default=0, nullable=False)  # 不在本站目錄中的電影
+    failed_count = db.Column(db.Integer, default=0, nullable=False)
+    duration_seconds = db.Column(db.Float, default=0.0, nullable=False)  # 累計執行秒數（含續跑）
+    error = db.Column(db.Text, nullable=True)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self) -> str:
+        return f'<TMDbSyncRun {self.run_id} {self.status} page:{self.last_page}/{self.total_pages}>'
+
+
+class PosterCheck(db.Model):
+    """海報網址的最近檢查結果（重新檢查時略過近期已驗證者）"""
+    
+    __tablename__ = 'poster_checks'
+    
+    url = db.Column(db.String(500), primary_key=True)
+    status_code = db.Column(db.Integer, nullable=False)  # 只保存確定的結果（連線失敗、逾時與 5xx 不保存）
+    checked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    @property
+    def is_valid(self) -> bool:
+        return self.status_code == 200
+    
+    def __repr__(self) -> str:
+        return f'<PosterCheck {self.status_code} {self.url}>'
+
+
+class PosterFile(db.Model):
+    """本機海報鏡像：來源網址與尺寸對應到內容定址的檔案"""
+    
+    __tablename__ = 'poster_files'
+    
+    source_url = db.Column(db.String(500), primary_key=True)
+    variant = db.Column(db.String(16), primary_key=True)  # small, medium, large
+    filename = db.Column(db.String(80), nullable=False)  # <sha256>.<副檔名>
+    content_type = db.Column(db.String(64), nullable=False)
+    byte_size = db.Column(db.Integer, nullable=False)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self) -> str:
+        return f'<PosterFile {self.variant} {self.filename}>'
+
+
+class PosterMirrorFailure(db.Model):
+    """海報鏡像下載失敗紀錄（與海報檢查結果分開，重試等待期間內略過）"""
+    
+    __tablename__ = 'poster_mirror_failures'
+    
+    source_url = db.Column(db.String(500), primary_key=True)
+    status_code = db.Column(db.Integer, nullable=False)  # 0 表示連線失敗；200 表示內容不是圖片或超過大小上限
+    attempts = db.Column(db.Integer, default=1, nullable=False)
+    failed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self) -> str:
+        return f'<PosterMirrorFailure {self.status_code} {self.source_url}>'
+
+
+class EmailOutbox(db.Model):
+    """待寄信件（請求只寫入此表，由背景寄件程序批次寄出）"""
+    
+    __tablename__ = 'email_outbox'
+    
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'  # 重試用盡或永久性錯誤，不再自動重寄
+    
+    email_id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    text_body = db.Column(db.Text, nullable=False)
+    html_body = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(16), default=STATUS_PENDING, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(32), nullable=True)  # 寄件程序認領批次的識別碼
+    locked_until = db.Column(db.DateTime, nullable=True)  # 認領期限，逾期未完成可被重新認領
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_email_outbox_due', 'status', 'next_attempt_at'),
+    )
+    
+    def __repr__(self) -> str:
+        return f'<EmailOutbox {self.email_id} {self.status} {self.recipient}>'
+
+
+class SchedulerLock(db.Model):
+    """排程器的跨行程租約鎖（排程領導者與各工作的執行中標記）"""
+    
+    __tablename__ = 'scheduler_locks'
+    
+    name = db.Column(db.String(64), primary_key=True)  # scheduler 或 job:<工作 ID>
+    owner = db.Column(db.String(128), nullable=False)  # 主機:行程:識別碼
+    acquired_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)  # 租約到期，逾期可被其他行程取得
+    
+    def __repr__(self) -> str:
+        return f'<SchedulerLock {self.name} {self.owner}>'
+
+
+class AuthToken(db.Model):
+    """電子郵件確認與密碼重設令牌（只儲存雜湊值，逾期後由排程清除）"""
+    
+    __tablename__ = 'auth_tokens'
+    
+    PURPOSE_CONFIRM_EMAIL = 'confirm_email'
+    PURPOSE_RESET_PASSWORD = 'reset_password'
+    
+    token_id = db.Column(db.Integer, primary_key=True)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)  # 令牌的 SHA-256（十六進位）
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    purpose = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    # (使用者, 用途) 索引支援重新發送時撤銷舊令牌
+    __table_args__ = (
+        db.Index('ix_auth_tokens_user_purpose', 'user_id', 'purpose'),
+    )
+    
+    def __repr__(self) -> str:
+        return f'<AuthToken {self.purpose} user={self.user_id}>'
+
+
+def parse_genre_ids(value: Optional[str]) -> List[int]:
+    """
+    解析 genre_ids 欄位（逗號分隔或 JSON 陣列字串）
+    
+    Args:
+        value: genre_ids 欄位值
+        
+    Returns:
+        不重複的類型 ID 列表（保留原順序）
+    """
+    if not value:
+        return []
+    return list(dict.fromkeys(int(genre_id) for genre_id in re.findall(r'\d+', value)))
+
+
+def _sync_movie_genres(connection, movie_id: int, genre_ids: Optional[str]) -> None:
+    """
+    依 genre_ids 字串重寫電影的類型關聯（與電影寫入同一交易）
+    
+    Args:
+        connection: 目前 flush 使用的資料庫連線
+        movie_id: 電影 ID
+        genre_ids: genre_ids 欄位值
+    """
+    connection.execute(movie_genres.delete().where(movie_genres.c.movie_id == movie_id))
+    rows = [{'movie_id': movie_id, 'genre_id': genre_id} for genre_id in parse_genre_ids(genre_ids)]
+    if rows:
+        connection.execute(movie_genres.insert(), rows)
+
+
+@event.listens_for(Movie, 'after_insert')
+def _movie_after_insert(mapper, connection, target: Movie) -> None:
+    """新增電影後建立類型關聯"""
+    if target.genre_ids:
+        _sync_movie_genres(connection, target.movie_id, target.genre_ids)
+
+
+@event.listens_for(Movie, 'after_update')
+def _movie_after_update(mapper, connection, target: Movie) -> None:
+    """genre_ids 變更後重建類型關聯"""
+    if inspect(target).attrs.genre_ids.history.has_changes():
+        _sync_movie_genres(connection, target.movie_id, target.genre_ids)
+
+
+@event.listens_for(Movie, 'after_delete')
+def _movie_after_delete(mapper, connection, target: Movie) -> None:
+    """刪除電影後移除類型關聯"""
+    connection.execute(movie_genres.delete().where(movie_genres.c.movie_id == target.movie_id))
+
+
+def _apply_rating_delta(connection, movie_id: int, rating, sign: int) -> None:
+    """
+    以增量方式更新電影評分統計（與評論寫入同一交易）
+    
+    Args:
+        connection: 目前 flush 使用的資料庫連線
+        movie_id: 電影 ID
+        rating: 評分 (1-5)
+        sign: +1 表示新增評論，-1 表示移除評論
+    """
+    if movie_id is None or rating is None:
+        return
+    
+    rating = int(rating)
+    movies = Movie.__table__
+    new_count = movies.c.review_count + sign
+    new_sum = movies.c.rating_sum + sign * rating
+    values = {
+        movies.c.review_count: new_count,
+        movies.c.rating_sum: new_sum,
+        movies.c.avg_rating: db.case(
+            (new_count > 0, db.func.round(new_sum * 1.0 / new_count, 2)),
+            else_=0.0
+        )
+    }
+    if rating in RATING_VALUES:
+        histogram_column = movies.c[f'rating_{rating}_count']
+        values[histogram_column] = histogram_column + sign
+    
+    connection.execute(
+        movies.update()
+        .where(movies.c.movie_id == movie_id)
+        .values(values)
+    )
+
+
+def _committed_value(target, key: str):
+    """取得屬性在本次 flush 前的值"""
+    history = inspect(target).attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(target, key)
+
+
+@event.listens_for(Review, 'after_insert')
+def _review_after_insert(mapper, connection, target: Review) -> None:
+    """新增評論後累加電影評分統計"""
+    _apply_rating_delta(connection, target.movie_id, target.rating, 1)
+
+
+@event.listens_for(Review, 'after_update')
+def _review_after_update(mapper, connection, target: Review) -> None:
+    """評論評分或所屬電影變更後調整電影評分統計"""
+    old_movie_id = _committed_value(target, 'movie_id')
+    old_rating = _committed_value(target, 'rating')
+    # 舊評分為 None（例如先前寫入不完整的資料）時視為沒有計入統計，只累加新評分
+    if old_rating is not None and old_movie_id == target.movie_id and int(old_rating) == int(target.rating):
+        # 僅修改評論內容時，仍需更新電影的異動時間
+        movies = Movie.__table__
+        connection.execute(
+            movies.update()
+            .where(movies.c.movie_id == target.movie_id)
+            .values(updated_at=datetime.utcnow())
+        )
+        return
+    
+    _apply_rating_delta(connection, old_movie_id, old_rating, -1)
+    _apply_rating_delta(connection, target.movie_id, target.rating, 1)
+
+
+@event.listens_for(Review, 'after_delete')
+def _review_after_delete(mapper, connection, target: Review) -> None:
+    """刪除評論後扣除電影評分統計"""
+    _apply_rating_delta(
+        connection,
+        _committed_value(target, 'movie_id'),
+        _committed_value(target, 'rating'),
+        -1
+    )
@@ -0,0 +1,193 @@
+"""
+電影批次匯入 - 以 tmdb_id 為鍵的 INSERT ... ON CONFLICT DO UPDATE
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+from flask import Flask, current_app
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.facets import FACET_FIELDS, mark_facets_dirty
+from app.models import Movie, movie_genres, parse_genre_ids
+from app.page_cache import mark_movies_changed
+
+# 由 TMDb 提供、匯入時會覆寫的欄位（評分統計等本站欄位不受影響）
+TMDB_FIELDS = (
+    'title', 'release_year', 'poster_url', 'genre_ids', 'runtime',
+    'tagline', 'overview', 'vote_average'
+)
+
+# 支援 INSERT ... ON CONFLICT DO UPDATE 的資料庫（兩者使用相同的語句建構方式）
+_UPSERT_DIALECTS = {'sqlite': sqlite, 'postgresql': postgresql}
+
+
+def validate_database_dialect(app: Flask) -> None:
+    """
+    啟動時確認主資料庫支援批次 upsert，避免匯入或同步時才失敗
+    
+    Args:
+        app: 已初始化 Flask-SQLAlchemy 的應用程式實例
+    
+    Raises:
+        RuntimeError: SQLALCHEMY_DATABASE_URI 不是 SQLite 或 PostgreSQL
+    """
+    with app.app_context():
+        dialect_name = db.engine.dialect.name
+    if dialect_name not in _UPSERT_DIALECTS:
+        raise RuntimeError(
+            f'不支援的資料庫 {dialect_name}：電影匯入需要 INSERT ... ON CONFLICT（SQLite 或 PostgreSQL）'
+        )
+
+
+def load_tmdb_ids() -> Set[int]:
+    """
+    一次載入資料庫中所有的 tmdb_id
+    
+    Returns:
+        tmdb_id 集合
+    """
+    return {
+        tmdb_id for (tmdb_id,) in db.session.query(Movie.tmdb_id).filter(Movie.tmdb_id.isnot(None))
+    }
+
+
+def _load_current_values(tmdb_ids: List[int]) -> Dict[int, tuple]:
+    """取得既有電影的 TMDb 欄位值（用於判斷是否需要更新）"""
+    if not tmdb_ids:
+        return {}
+    columns = [getattr(Movie, field) for field in TMDB_FIELDS]
+    return {
+        row[0]: tuple(row[1:])
+        for row in db.session.query(Movie.tmdb_id, *columns).filter(Movie.tmdb_id.in_(tmdb_ids))
+    }
+
+
+def _upsert_statement():
+    """建立以 tmdb_id 為衝突鍵的 upsert 語句"""
+    statement = _UPSERT_DIALECTS[db.engine.dialect.name].insert(Movie.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=[Movie.tmdb_id],
+        set_={
+            **{field: statement.excluded[field] for field in TMDB_FIELDS},
+            'updated_at': statement.excluded.updated_at
+        }
+    )
+
+
+def _sync_genre_links(tmdb_ids: List[int], genre_ids_by_tmdb_id: Dict[int, Optional[str]]) -> List[int]:
+    """
+    重建一批電影的 movie_genres 關聯（批次寫入不會觸發 Movie 的 ORM 事件）
+    
+    Args:
+        tmdb_ids: 已寫入的 TMDb ID
+        genre_ids_by_tmdb_id: {TMDb ID: genre_ids 欄位值}
+    
+    Returns:
+        對應的本站電影 ID
+    """
+    movie_ids = dict(
+        db.session.query(Movie.tmdb_id, Movie.movie_id).filter(Movie.tmdb_id.in_(tmdb_ids)).all()
+    )
+    db.session.execute(movie_genres.delete().where(movie_genres.c.movie_id.in_(list(movie_ids.values()))))
+    
+    links = [
+        {'movie_id': movie_ids[tmdb_id], 'genre_id': genre_id}
+        for tmdb_id in tmdb_ids if tmdb_id in movie_ids
+        for genre_id in parse_genre_ids(genre_ids_by_tmdb_id.get(tmdb_id))
+    ]
+    if links:
+        db.session.execute(movie_genres.insert(), links)
+    return list(movie_ids.values())
+
+
+def _write_batch(statement, batch: Dict[int, Dict[str, Any]], known_tmdb_ids: Set[int],
+                 counts: Dict[str, int]) -> None:
+    """
+    比對並寫入一批電影
+    
+    Args:
+        statement: upsert 語句
+        batch: {TMDb ID: 電影欄位}
+        known_tmdb_ids: 已存在的 tmdb_id 集合（寫入後更新）
+        counts: 統計（累加）
+    """
+    existing = _load_current_values([tmdb_id for tmdb_id in batch if tmdb_id in known_tmdb_ids])
+    now = datetime.utcnow()
+    params = []
+    facets_changed = False
+    for tmdb_id, row in batch.items():
+        values = tuple(row.get(field) for field in TMDB_FIELDS)
+        if tmdb_id in existing:
+            if existing[tmdb_id] == values:
+                counts['skipped'] += 1
+                continue
+            counts['updated'] += 1
+            current = dict(zip(TMDB_FIELDS, existing[tmdb_id]))
+            facets_changed = facets_changed or any(current[field] != row.get(field) for field in FACET_FIELDS)
+        else:
+            counts['inserted'] += 1
+            facets_changed = True
+        params.append({
+            **dict(zip(TMDB_FIELDS, values)),
+            'tmdb_id': tmdb_id,
+            'created_at': now,
+            'updated_at': now
+        })
+    
+    if not params:
+        return
+    
+    db.session.execute(statement, params)
+    written_ids = [param['tmdb_id'] for param in params]
+    movie_ids = _sync_genre_links(written_ids, {param['tmdb_id']: param['genre_ids'] for param in params})
+    known_tmdb_ids.update(written_ids)
+    
+    # 批次寫入不會觸發 ORM 事件，提交後的快取失效需自行標記（面板只在年份或類型變更時失效）
+    if facets_changed:
+        mark_facets_dirty(db.session)
+    mark_movies_changed(db.session, movie_ids)
+
+
+def upsert_movies(rows: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                  known_tmdb_ids: Optional[Set[int]] = None, commit: bool = True) -> Dict[str, int]:
+    """
+    以 tmdb_id 批次新增或更新電影
+    
+    既有的 tmdb_id 只在開始時載入一次；每批只比對其中既有電影的欄位值，
+    新電影與有變動的電影以單一 executemany 的 upsert 寫入，未變動者略過。
+    全文檢索由資料庫觸發器同步，movie_genres、面板與頁面快取在此一併處理。
+    
+    Args:
+        rows: 電影欄位字典（須含 tmdb_id，其餘欄位見 TMDB_FIELDS）
+        batch_size: 每批筆數（預設取 MOVIE_UPSERT_BATCH_SIZE）
+        known_tmdb_ids: 已載入的 tmdb_id 集合（未提供時自動載入）
+        commit: 是否每批提交（False 時由呼叫端提交）
+    
+    Returns:
+        {'inserted': 新增數, 'updated': 更新數, 'skipped': 略過數}
+    """
+    batch_size = batch_size or current_app.config.get('MOVIE_UPSERT_BATCH_SIZE', 1000)
+    known_tmdb_ids = load_tmdb_ids() if known_tmdb_ids is None else known_tmdb_ids
+    statement = _upsert_statement()
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+    
+    batch: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        tmdb_id = row.get('tmdb_id')
+        if tmdb_id is None:
+            counts['skipped'] += 1
+            continue
+        if tmdb_id in batch:
+            counts['skipped'] += 1  # 同一批內重複的電影以最後一筆為準
+        batch[tmdb_id] = row
+        if len(batch) >= batch_size:
+            _write_batch(statement, batch, known_tmdb_ids, counts)
+            if commit:
+                db.session.commit()
+            batch = {}
+    
+    if batch:
+        _write_batch(statement, batch, known_tmdb_ids, counts)
+        if commit:
+            db.session.commit()
+    
+    return counts
@@ -0,0 +1,229 @@
+"""
+匿名訪客的整頁回應快取
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.db_routing import primary_reads_since
+from app.models import Review
+
+# 每頁快取的標籤：評論寫入後依標籤失效
+TAG_LATEST_REVIEWS = 'latest_reviews'
+
+# 隨快取內容保存的驗證與快取策略標頭
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+# 渲染鎖分段數（同一快取鍵同時只有一個請求負責渲染）
+RENDER_LOCK_STRIPES = 64
+
+
+def movie_tag(movie_id: int) -> str:
+    """電影詳情頁的快取標籤"""
+    return f'movie:{movie_id}'
+
+
+class PageCache:
+    """
+    行程內的整頁快取（LRU + TTL）
+    
+    僅在單一行程內共用；多個 worker 之間不同步，
+    其他 worker 的項目依短 TTL 自然過期。
+    """
+    
+    def __init__(self) -> None:
+        self._entries: OrderedDict = OrderedDict()
+        self.invalidated_at: Optional[float] = None  # 最近一次失效的時間（time.monotonic()）
+        self._guard = threading.Lock()
+        self._render_locks = [threading.Lock() for _ in range(RENDER_LOCK_STRIPES)]
+    
+    def get(self, key: str) -> Optional[Tuple[bytes, int, str, Dict[str, str]]]:
+        """
+        取得未過期的快取項目
+        
+        Args:
+            key: 快取鍵
+        
+        Returns:
+            (內容, 狀態碼, Content-Type, 標頭)；不存在或已過期時回傳 None
+        """
+        with self._guard:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _tags, response_data = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response_data
+    
+    def set(self, key: str, response_data: Tuple[bytes, int, str, Dict[str, str]], timeout: int,
+            tags: Iterable[str], max_entries: int) -> None:
+        """
+        寫入快取項目
+        
+        Args:
+            key: 快取鍵
+            response_data: (內容, 狀態碼, Content-Type, 標頭)
+            timeout: 快取秒數
+            tags: 失效標籤
+            max_entries: 最大項目數（超過時淘汰最久未使用者）
+        """
+        with self._guard:
+            self._entries[key] = (time.monotonic() + timeout, frozenset(tags), response_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """
+        使帶有指定標籤的項目失效
+        
+        Args:
+            tags: 標籤
+        
+        Returns:
+            移除的項目數
+        """
+        tags = set(tags)
+        with self._guard:
+            self.invalidated_at = time.monotonic()
+            stale_keys = [key for key, (_, entry_tags, _) in self._entries.items() if entry_tags & tags]
+            for key in stale_keys:
+                del self._entries[key]
+        return len(stale_keys)
+    
+    def clear(self) -> None:
+        """清除所有快取"""
+        with self._guard:
+            self.invalidated_at = time.monotonic()
+            self._entries.clear()
+    
+    def render_lock(self, key: str) -> threading.Lock:
+        """取得負責渲染此快取鍵的鎖（請求合併）"""
+        return self._render_locks[hash(key) % RENDER_LOCK_STRIPES]
+
+
+page_cache = PageCache()
+
+
+def _request_is_cacheable() -> bool:
+    """僅快取匿名、無待顯示訊息的 GET 請求"""
+    return (
+        current_app.config.get('PAGE_CACHE_ENABLED', False)
+        and request.method == 'GET'
+        and not current_user.is_authenticated
+        and '_flashes' not in session
+    )
+
+
+def _cache_key() -> str:
+    """以路徑與排序後的查詢參數作為快取鍵"""
+    args = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+    return f'{request.path}?{args}'
+
+
+def _cached_response(response_data: Tuple[bytes, int, str, Dict[str, str]]):
+    """由快取內容建立回應（用戶端快取仍有效時轉為 304）"""
+    body, status, content_type, headers = response_data
+    response = make_response(body, status)
+    response.content_type = content_type
+    response.headers.update(headers)
+    response.headers['X-Page-Cache'] = 'HIT'
+    return response.make_conditional(request)
+
+
+def cached_page(tags: Optional[Callable[..., Iterable[str]]] = None):
+    """
+    匿名訪客整頁快取裝飾器
+    
+    快取秒數取自 PAGE_CACHE_TIMEOUTS[endpoint]；同一快取鍵未命中時，
+    只有一個請求負責渲染，其餘請求等待後直接使用其結果。
+    
+    Args:
+        tags: 依視圖參數產生失效標籤的函數
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _request_is_cacheable():
+                return view(*args, **kwargs)
+            
+            key = _cache_key()
+            response_data = page_cache.get(key)
+            if response_data:
+                return _cached_response(response_data)
+            
+            with page_cache.render_lock(key):
+                # 等待期間可能已由其他請求完成渲染
+                response_data = page_cache.get(key)
+                if response_data:
+                    return _cached_response(response_data)
+                
+                with primary_reads_since(page_cache.invalidated_at):
+                    response = make_response(view(*args, **kwargs))
+                timeout = current_app.config.get('PAGE_CACHE_TIMEOUTS', {}).get(request.endpoint, 0)
+                if response.status_code == 200 and timeout > 0 and not session.modified:
+                    page_cache.set(
+                        key,
+                        (
+                            response.get_data(),
+                            response.status_code,
+                            response.content_type,
+                            {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+                        ),
+                        timeout,
+                        tags(**kwargs) if tags else (),
+                        current_app.config.get('PAGE_CACHE_MAX_ENTRIES', 1000)
+                    )
+                    response.headers['X-Page-Cache'] = 'MISS'
+                return response
+        
+        return wrapper
+    return decorator
+
+
+def _pending_movie_ids(session_: Session) -> Set[int]:
+    """目前交易中有異動的電影 ID"""
+    return session_.info.setdefault('page_cache_movie_ids', set())
+
+
+def mark_movies_changed(session_: Session, movie_ids: Iterable[int]) -> None:
+    """
+    記錄交易中有異動的電影（供繞過 ORM 的批次寫入使用），待提交後使快取失效
+    
+    Args:
+        session_: 資料庫 session
+        movie_ids: 電影 ID
+    """
+    _pending_movie_ids(session_).update(movie_ids)
+
+
+@event.listens_for(Review, 'after_insert')
+@event.listens_for(Review, 'after_update')
+@event.listens_for(Review, 'after_delete')
+def _review_changed(mapper, connection, target: Review) -> None:
+    """記錄評論異動的電影，待交易提交後使快取失效"""
+    session_ = Session.object_session(target)
+    if session_ is not None:
+        _pending_movie_ids(session_).add(target.movie_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session_: Session) -> None:
+    """交易提交後使受影響電影頁與首頁最新評論失效"""
+    movie_ids = session_.info.pop('page_cache_movie_ids', None)
+    if movie_ids:
+        page_cache.invalidate_tags([movie_tag(movie_id) for movie_id in movie_ids] + [TAG_LATEST_REVIEWS])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session_: Session) -> None:
+    """交易回滾時捨棄待失效紀錄"""
+    session_.info.pop('page_cache_movie_ids', None)
@@ -0,0 +1,222 @@
+"""
+Keyset（seek）分頁 - 以排序鍵值游標取代深分頁的 OFFSET
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from math import ceil
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import literal, tuple_
+from sqlalchemy.orm import Query
+
+
+class KeysetPagination:
+    """
+    Keyset 分頁結果
+    
+    前幾頁以頁碼（OFFSET）存取，之後的頁面以不透明游標定位；
+    屬性介面與 Flask-SQLAlchemy 的 Pagination 相近，模板可沿用。
+    """
+    
+    def __init__(self, items: List[Any], page: int, per_page: int, total: Optional[int],
+                 has_next: bool, first_key: Optional[list], last_key: Optional[list],
+                 offset_pages: int) -> None:
+        """
+        初始化分頁結果
+        
+        Args:
+            items: 本頁項目
+            page: 目前頁碼
+            per_page: 每頁數量
+            total: 總筆數（可為快取或近似值，未知時為 None）
+            has_next: 是否有下一頁
+            first_key: 本頁第一筆的排序鍵值
+            last_key: 本頁最後一筆的排序鍵值
+            offset_pages: 以頁碼存取的前幾頁數量
+        """
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.has_next = has_next
+        self.first_key = first_key
+        self.last_key = last_key
+        self.offset_pages = offset_pages
+    
+    @property
+    def pages(self) -> int:
+        """總頁數（總筆數未知時至少涵蓋目前已知的頁面）"""
+        known_pages = self.page + (1 if self.has_next else 0)
+        if self.total is None:
+            return known_pages
+        return max(int(ceil(self.total / float(self.per_page))), known_pages) if self.per_page else 0
+    
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 1
+    
+    @property
+    def prev_num(self) -> Optional[int]:
+        return self.page - 1 if self.has_prev else None
+    
+    @property
+    def next_num(self) -> Optional[int]:
+        return self.page + 1 if self.has_next else None
+    
+    @property
+    def prev_args(self) -> Dict[str, Any]:
+        """上一頁連結參數：前幾頁用頁碼，其餘用往回的游標"""
+        if not self.has_prev:
+            return {}
+        if self.page - 1 <= self.offset_pages or self.first_key is None:
+            return {'page': self.page - 1}
+        return {'cursor': encode_cursor(self.first_key, self.page - 1, backward=True)}
+    
+    @property
+    def next_args(self) -> Dict[str, Any]:
+        """下一頁連結參數：前幾頁用頁碼，其餘用往後的游標"""
+        if not self.has_next:
+            return {}
+        if self.page + 1 <= self.offset_pages or self.last_key is None:
+            return {'page': self.page + 1}
+        return {'cursor': encode_cursor(self.last_key, self.page + 1)}
+    
+    def iter_pages(self) -> Iterator[Optional[int]]:
+        """
+        產生頁碼連結：只列出可用 OFFSET 存取的前幾頁與目前頁，其餘以 None（…）表示
+        
+        Yields:
+            頁碼或 None
+        """
+        shown = min(self.offset_pages, self.pages)
+        for page_num in range(1, shown + 1):
+            yield page_num
+        if self.page > shown:
+            if self.page > shown + 1:
+                yield None
+            yield self.page
+        if self.pages > max(shown, self.page):
+            yield None
+
+
+def _encode_value(value: Any) -> Any:
+    """將排序鍵值轉為 JSON 可序列化格式"""
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    """還原排序鍵值"""
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(key: Sequence[Any], page: int, backward: bool = False) -> str:
+    """
+    將排序鍵值編碼為不透明游標
+    
+    Args:
+        key: 排序鍵值
+        page: 游標指向的頁碼
+        backward: 是否為往前翻頁的游標
+    
+    Returns:
+        URL 安全的游標字串
+    """
+    payload = {'k': [_encode_value(value) for value in key], 'p': page}
+    if backward:
+        payload['b'] = 1
+    raw = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], key_count: int) -> Optional[Tuple[list, int, bool]]:
+    """
+    解碼游標
+    
+    Args:
+        cursor: 游標字串
+        key_count: 排序鍵數量（用於驗證）
+    
+    Returns:
+        (排序鍵值, 頁碼, 是否往前)；游標無效時回傳 None
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+        key = [_decode_value(value) for value in payload['k']]
+        page = int(payload['p'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+    
+    if len(key) != key_count or page < 1:
+        return None
+    return key, page, bool(payload.get('b'))
+
+
+def keyset_paginate(query: Query, sort_keys: Sequence[Any], descending: bool, per_page: int,
+                    page: int = 1, cursor: Optional[str] = None, total: Optional[int] = None,
+                    offset_pages: int = 5) -> KeysetPagination:
+    """
+    以 keyset 方式分頁查詢
+    
+    Args:
+        query: 尚未排序的查詢
+        sort_keys: 排序鍵（最後一個必須唯一，例如主鍵）
+        descending: 是否全部降序排列
+        per_page: 每頁數量
+        page: 頁碼（無游標時使用 OFFSET）
+        cursor: 游標字串
+        total: 總筆數（可為快取或近似值）
+        offset_pages: 以頁碼存取的前幾頁數量
+    
+    Returns:
+        分頁結果
+    """
+    keyed = query.add_columns(
+        *[key.label(f'_sort_key_{index}') for index, key in enumerate(sort_keys)]
+    )
+    state = decode_cursor(cursor, len(sort_keys))
+    
+    if state:
+        key_values, page, backward = state
+        bound_values = tuple_(*[literal(value, key.type) for value, key in zip(key_values, sort_keys)])
+        seek_descending = descending != backward
+        if seek_descending:
+            keyed = keyed.filter(tuple_(*sort_keys) < bound_values)
+        else:
+            keyed = keyed.filter(tuple_(*sort_keys) > bound_values)
+        rows = keyed.order_by(
+            *[key.desc() if seek_descending else key.asc() for key in sort_keys]
+        ).limit(per_page + 1).all()
+        
+        if backward:
+            rows = rows[:per_page][::-1]
+            has_next = True
+        else:
+            has_next = len(rows) > per_page
+            rows = rows[:per_page]
+    else:
+        page = max(page or 1, 1)
+        rows = keyed.order_by(
+            *[key.desc() if descending else key.asc() for key in sort_keys]
+        ).offset((page - 1) * per_page).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+    
+    return KeysetPagination(
+        items=[row[0] for row in rows],
+        page=page,
+        per_page=per_page,
+        total=total,
+        has_next=has_next,
+        first_key=list(rows[0][1:]) if rows else None,
+        last_key=list(rows[-1][1:]) if rows else None,
+        offset_pages=offset_pages
+    )
+
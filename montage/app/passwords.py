@@ -0,0 +1,102 @@
+"""
+密碼雜湊 - 在專用的有界執行緒池執行 bcrypt，避免登入尖峰佔滿請求執行緒
+"""
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+import bcrypt
+from flask import current_app, has_app_context
+
+# bcrypt 雜湊字串中的成本參數，例如 $2b$12$...
+COST_PATTERN = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+T = TypeVar('T')
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+
+
+class PasswordHasherBusy(RuntimeError):
+    """等待雜湊的請求已達上限"""
+
+
+def _setting(name: str, default):
+    """讀取設定（不在應用程式情境中時使用預設值，例如離線腳本）"""
+    return current_app.config.get(name, default) if has_app_context() else default
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """取得雜湊用執行緒池（第一次使用時依設定建立）"""
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = _setting('PASSWORD_HASH_WORKERS', 2)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+            # 執行中與排隊中的雜湊總數上限
+            _slots = threading.BoundedSemaphore(workers + _setting('PASSWORD_HASH_MAX_PENDING', 32))
+        return _executor
+
+
+def _run(func: Callable[..., T], *args) -> T:
+    """
+    在雜湊執行緒池執行並等待結果
+    
+    bcrypt 計算期間會釋放 GIL，請求執行緒等待時不影響其他請求的頁面渲染；
+    同時計算的雜湊數由執行緒數限制，排隊超過上限時拒絕而非無限堆積。
+    
+    Raises:
+        PasswordHasherBusy: 等待逾時
+    """
+    executor = _get_executor()
+    timeout = _setting('PASSWORD_HASH_QUEUE_TIMEOUT', 10)
+    if not _slots.acquire(timeout=timeout):
+        raise PasswordHasherBusy('密碼雜湊佇列已滿')
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    """
+    以 bcrypt 雜湊密碼（含隨機鹽值）
+    
+    Args:
+        password: 明文密碼
+        rounds: 成本參數（預設取 BCRYPT_ROUNDS）
+    
+    Returns:
+        雜湊字串
+    """
+    salt = bcrypt.gensalt(rounds or _setting('BCRYPT_ROUNDS', 12))
+    return _run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """
+    驗證密碼
+    
+    Args:
+        password: 明文密碼
+        password_hash: bcrypt 雜湊字串
+    
+    Returns:
+        密碼是否正確
+    """
+    return _run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """
+    雜湊的成本參數是否與目前設定不同
+    
+    Args:
+        password_hash: bcrypt 雜湊字串
+    
+    Returns:
+        是否需要以目前設定重新雜湊
+    """
+    match = COST_PATTERN.match(password_hash)
+    return match is None or int(match.group(1)) != _setting('BCRYPT_ROUNDS', 12)
@@ -0,0 +1,242 @@
+"""
+海報檢查 - 併發驗證海報網址並保存檢查結果
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+from sqlalchemy import update
+from app import db
+from app.models import Movie, PosterCheck
+from app.page_cache import mark_movies_changed
+
+# 備用海報URL (高品質通用海報)
+FALLBACK_POSTERS = [
+    "https://image.tmdb.org/t/p/w500/wwemzKWzjKYJFfCeiB57q3r4Bcm.png",  # 通用電影海報 1
+    "https://via.placeholder.com/500x750/1a1a1a/ffffff?text=🎬+電影海報",      # 簡潔海報
+    "https://via.placeholder.com/500x750/2d3748/ffffff?text=📽️+Movie+Poster", # 英文海報
+]
+
+# 檢查結果寫入的每批筆數
+RESULT_BATCH_SIZE = 500
+
+# 確定失效的狀態碼，只有這些海報會被備用海報取代
+BROKEN_STATUS_CODES = (404, 410)
+
+
+def is_transient(status_code: int) -> bool:
+    """
+    判斷檢查結果是否為暫時性失敗（連線失敗、逾時、限流或 5xx），此類結果不保存也不據以修復
+    
+    Args:
+        status_code: HTTP 狀態碼（0 表示連線失敗或逾時）
+    
+    Returns:
+        是否為暫時性失敗
+    """
+    return status_code == 0 or status_code == 429 or status_code >= 500
+
+
+class PosterChecker:
+    """
+    海報網址檢查器
+    
+    所有請求共用 keep-alive 連線池；整體併發數由工作執行緒數限制，
+    同一主機另以號誌限制併發，避免對單一圖床送出過多請求。
+    """
+    
+    def __init__(self, workers: int = 16, per_host: int = 4, timeout: float = 10.0) -> None:
+        """
+        初始化檢查器
+        
+        Args:
+            workers: 工作執行緒數
+            per_host: 同一主機的併發上限
+            timeout: 單次請求逾時秒數
+        """
+        self.workers = max(workers, 1)
+        self.per_host = max(per_host, 1)
+        self.timeout = timeout
+        self._host_limits: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.per_host)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    @classmethod
+    def from_config(cls, config) -> 'PosterChecker':
+        """依應用程式設定建立檢查器"""
+        return cls(
+            workers=config.get('POSTER_CHECK_WORKERS', 16),
+            per_host=config.get('POSTER_CHECK_PER_HOST', 4),
+            timeout=config.get('POSTER_CHECK_TIMEOUT', 10)
+        )
+    
+    def close(self) -> None:
+        """關閉連線池"""
+        self.session.close()
+    
+    def _host_limit(self, url: str) -> threading.Semaphore:
+        """取得網址所屬主機的併發號誌"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.Semaphore(self.per_host)
+            return self._host_limits[host]
+    
+    def check(self, url: str) -> int:
+        """
+        檢查單一網址
+        
+        Args:
+            url: 海報網址
+        
+        Returns:
+            HTTP 狀態碼；連線失敗或逾時時回傳 0
+        """
+        with self._host_limit(url):
+            try:
+                response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+                # 部分圖床不支援 HEAD，改以 GET 取得狀態（不下載內容）
+                if response.status_code in (403, 405, 501):
+                    with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                        return response.status_code
+                return response.status_code
+            except requests.RequestException:
+                return 0
+    
+    def check_many(self, urls: Iterable[str],
+                   progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+        """
+        併發檢查多個網址
+        
+        Args:
+            urls: 海報網址
+            progress: 進度回呼 (已完成數, 總數)
+        
+        Returns:
+            {網址: 狀態碼}
+        """
+        urls = list(dict.fromkeys(urls))
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.check, url): url for url in urls}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if progress:
+                    progress(done, len(urls))
+        return results
+
+
+def load_recent_results(max_age: timedelta) -> Dict[str, int]:
+    """
+    取得仍在有效期間內的檢查結果
+    
+    Args:
+        max_age: 檢查結果的有效期間
+    
+    Returns:
+        {網址: 狀態碼}
+    """
+    cutoff = datetime.utcnow() - max_age
+    return dict(
+        db.session.query(PosterCheck.url, PosterCheck.status_code)
+        .filter(PosterCheck.checked_at >= cutoff)
+        .all()
+    )
+
+
+def save_results(results: Dict[str, int]) -> None:
+    """
+    保存檢查結果（覆寫同一網址的舊結果；暫時性失敗不保存，下次執行時重新檢查）
+    
+    Args:
+        results: {網址: 狀態碼}
+    """
+    checked_at = datetime.utcnow()
+    urls = [url for url, status_code in results.items() if not is_transient(status_code)]
+    for start in range(0, len(urls), RESULT_BATCH_SIZE):
+        batch = urls[start:start + RESULT_BATCH_SIZE]
+        db.session.execute(PosterCheck.__table__.delete().where(PosterCheck.url.in_(batch)))
+        db.session.execute(
+            PosterCheck.__table__.insert(),
+            [{'url': url, 'status_code': results[url], 'checked_at': checked_at} for url in batch]
+        )
+    db.session.commit()
+
+
+def verify_posters(fix: bool = True, max_age: Optional[timedelta] = None, checker: Optional[PosterChecker] = None,
+                   progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, object]:
+    """
+    檢查所有電影海報，並以備用海報取代確定失效（404、410）或缺少的海報
+    
+    只讀取 movie_id 與 poster_url；有效期間內已檢查過的網址直接沿用結果，
+    其餘網址併發檢查後保存，修復則以單一批次 UPDATE 寫入。
+    連線失敗、逾時或 5xx 等暫時性失敗只列入 unreachable，不取代原本的海報。
+    
+    Args:
+        fix: 是否寫入修復
+        max_age: 檢查結果的有效期間（預設取 POSTER_CHECK_MAX_AGE_HOURS）
+        checker: 檢查器（預設依應用程式設定建立）
+        progress: 進度回呼
+    
+    Returns:
+        {'total', 'checked', 'cached', 'missing', 'broken', 'unreachable', 'fixed', 'broken_movies'}
+    """
+    if max_age is None:
+        max_age = timedelta(hours=current_app.config.get('POSTER_CHECK_MAX_AGE_HOURS', 72))
+    own_checker = checker is None
+    checker = checker or PosterChecker.from_config(current_app.config)
+    
+    movies = db.session.query(Movie.movie_id, Movie.poster_url).all()
+    poster_urls = {poster_url for _, poster_url in movies if poster_url}
+    
+    statuses = {url: status for url, status in load_recent_results(max_age).items() if url in poster_urls}
+    pending_urls = [url for url in poster_urls if url not in statuses]
+    try:
+        fresh_results = checker.check_many(pending_urls, progress)
+    finally:
+        if own_checker:
+            checker.close()
+    if fresh_results:
+        save_results(fresh_results)
+    statuses.update(fresh_results)
+    
+    fixes: List[Dict[str, object]] = []
+    broken_movies = []
+    missing_count = unreachable_count = 0
+    for movie_id, poster_url in movies:
+        if not poster_url:
+            missing_count += 1
+            fixes.append({'movie_id': movie_id, 'poster_url': FALLBACK_POSTERS[0]})
+        elif statuses.get(poster_url) in BROKEN_STATUS_CODES:
+            broken_movies.append((movie_id, poster_url, statuses[poster_url]))
+            fixes.append({
+                'movie_id': movie_id,
+                'poster_url': FALLBACK_POSTERS[(len(broken_movies) - 1) % len(FALLBACK_POSTERS)]
+            })
+        elif statuses.get(poster_url) != 200:
+            unreachable_count += 1
+    
+    if fix and fixes:
+        # ORM 依主鍵批次 UPDATE（executemany）
+        db.session.execute(update(Movie), fixes)
+        mark_movies_changed(db.session, [item['movie_id'] for item in fixes])
+        db.session.commit()
+    
+    return {
+        'total': len(movies),
+        'checked': len(fresh_results),
+        'cached': len(poster_urls) - len(fresh_results),
+        'missing': missing_count,
+        'broken': len(broken_movies),
+        'unreachable': unreachable_count,
+        'fixed': len(fixes) if fix else 0,
+        'broken_movies': broken_movies
+    }
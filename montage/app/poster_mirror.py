@@ -0,0 +1,327 @@
+"""
+本機海報鏡像 - 內容定址的磁碟快取、多尺寸海報與長效快取標頭
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import click
+import requests
+from requests.adapters import HTTPAdapter
+from flask import abort, current_app, send_from_directory, url_for
+from flask.cli import AppGroup
+from app import db
+from app.db_routing import primary_reads_since
+from app.models import Movie, PosterFile, PosterMirrorFailure
+from app.poster_check import BROKEN_STATUS_CODES, load_recent_results
+
+# 海報尺寸對應的 TMDb 圖片寬度（非 TMDb 網址各尺寸皆使用原圖）
+POSTER_VARIANTS = {
+    'small': 'w185',
+    'medium': 'w342',
+    'large': 'w500'
+}
+
+TMDB_IMAGE_PATTERN = re.compile(r'^(https?://image\.tmdb\.org/t/p/)[^/]+(/.+)$')
+
+IMAGE_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif'
+}
+
+FILENAME_PATTERN = re.compile(r'^[0-9a-f]{64}\.(jpg|png|webp|gif)$')
+
+# 內容定址的檔案永不變更，可長期快取
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+posters_cli = AppGroup('posters', help='本機海報鏡像')
+
+_lock = threading.Lock()
+_invalidated_at: Optional[float] = None  # 最近一次失效的時間（time.monotonic()）
+_poster_files: 'OrderedDict[str, Tuple[float, Dict[str, str]]]' = OrderedDict()  # 來源網址 -> (到期時間, {尺寸: 檔名})，依最近使用排序
+
+
+def variant_url(url: str, variant: str) -> str:
+    """
+    取得指定尺寸的來源網址
+    
+    Args:
+        url: 原始海報網址
+        variant: 尺寸 (small, medium, large)
+    
+    Returns:
+        TMDb 對應寬度的網址；非 TMDb 網址原樣回傳
+    """
+    match = TMDB_IMAGE_PATTERN.match(url)
+    if not match:
+        return url
+    return f'{match.group(1)}{POSTER_VARIANTS[variant]}{match.group(2)}'
+
+
+def mirror_dir() -> str:
+    """海報檔案的存放目錄"""
+    return current_app.config.get('POSTER_MIRROR_DIR') or os.path.join(current_app.instance_path, 'posters')
+
+
+def _file_path(filename: str) -> str:
+    """檔案路徑（依雜湊前兩碼分目錄）"""
+    return os.path.join(mirror_dir(), filename[:2], filename)
+
+
+def invalidate_poster_map() -> None:
+    """使海報對照表快取失效"""
+    global _invalidated_at
+    with _lock:
+        _invalidated_at = time.monotonic()
+        _poster_files.clear()
+
+
+def _mirrored_files(url: str) -> Dict[str, str]:
+    """
+    取得單一海報已鏡像的檔案（行程內快取，未命中時以主鍵前綴查詢該網址的各尺寸）
+    
+    Args:
+        url: 電影的 poster_url
+    
+    Returns:
+        {尺寸: 檔名}；尚未鏡像時為空字典
+    """
+    now = time.monotonic()
+    with _lock:
+        cached = _poster_files.get(url)
+        if cached and cached[0] > now:
+            _poster_files.move_to_end(url)
+            return cached[1]
+        invalidated_at = _invalidated_at
+    
+    with primary_reads_since(invalidated_at):
+        files = dict(db.session.query(PosterFile.variant, PosterFile.filename)\
+            .filter(PosterFile.source_url == url)\
+            .all())
+    config = current_app.config
+    with _lock:
+        _poster_files[url] = (now + config.get('POSTER_MAP_CACHE_SECONDS', 300), files)
+        _poster_files.move_to_end(url)
+        while len(_poster_files) > config.get('POSTER_MAP_CACHE_MAX_ENTRIES', 4096):
+            _poster_files.popitem(last=False)
+    return files
+
+
+def poster_src(url: Optional[str], variant: str = 'medium') -> Optional[str]:
+    """
+    模板用：取得海報的顯示網址
+    
+    只查詢頁面上實際顯示的海報；未啟用鏡像時直接回傳原始網址，不查詢資料庫。
+    
+    Args:
+        url: 電影的 poster_url
+        variant: 尺寸 (small, medium, large)
+    
+    Returns:
+        已鏡像時為本機網址，否則為原始網址
+    """
+    if not url or not current_app.config.get('POSTER_MIRROR_ENABLED'):
+        return url
+    filename = _mirrored_files(url).get(variant)
+    if filename is None:
+        return url
+    return url_for('main.poster_file', filename=filename)
+
+
+def send_poster(filename: str):
+    """
+    回應鏡像的海報檔案（immutable 快取，ETag 即內容雜湊）
+    
+    Args:
+        filename: <sha256>.<副檔名>
+    
+    Returns:
+        檔案回應
+    """
+    if not FILENAME_PATTERN.match(filename):
+        abort(404)
+    
+    response = send_from_directory(
+        os.path.join(mirror_dir(), filename[:2]),
+        filename,
+        etag=filename.split('.')[0],
+        max_age=IMMUTABLE_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def _download(session: requests.Session, url: str, timeout: float,
+              max_bytes: int) -> Tuple[int, Optional[bytes], Optional[str]]:
+    """
+    下載圖片
+    
+    Returns:
+        (狀態碼, 內容, Content-Type)；非圖片或超過大小上限時內容為 None
+    """
+    try:
+        with session.get(url, timeout=timeout, stream=True) as response:
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if response.status_code != 200 or content_type not in IMAGE_EXTENSIONS:
+                return response.status_code, None, None
+            
+            content = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                content.extend(chunk)
+                if len(content) > max_bytes:
+                    return response.status_code, None, None
+            return response.status_code, bytes(content), content_type
+    except requests.RequestException:
+        return 0, None, None
+
+
+def _store(content: bytes, content_type: str) -> Tuple[str, bool]:
+    """
+    以內容雜湊存檔（相同內容只存一份）
+    
+    Returns:
+        (檔名, 是否為新檔案)
+    """
+    filename = f'{hashlib.sha256(content).hexdigest()}.{IMAGE_EXTENSIONS[content_type]}'
+    path = _file_path(filename)
+    if os.path.exists(path):
+        return filename, False
+    
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+    return filename, True
+
+
+def mirror_posters(limit: Optional[int] = None) -> Dict[str, int]:
+    """
+    下載尚未鏡像的電影海報（各尺寸）
+    
+    海報檢查確定失效（404、410）的海報會略過；下載失敗記錄於 poster_mirror_failures，
+    在 POSTER_MIRROR_RETRY_HOURS 內不再重試（不影響海報檢查結果與備用海報的取代）。
+    
+    Args:
+        limit: 本次處理的海報數上限（預設取 POSTER_MIRROR_BATCH_SIZE）
+    
+    Returns:
+        {'posters': 處理海報數, 'stored': 新存檔數, 'reused': 重複內容數, 'failed': 失敗數}
+    """
+    config = current_app.config
+    limit = limit or config.get('POSTER_MIRROR_BATCH_SIZE', 200)
+    
+    mirrored = {
+        (source_url, variant)
+        for source_url, variant in db.session.query(PosterFile.source_url, PosterFile.variant)
+    }
+    recent_checks = load_recent_results(timedelta(hours=config.get('POSTER_CHECK_MAX_AGE_HOURS', 72)))
+    retry_after = datetime.utcnow() - timedelta(hours=config.get('POSTER_MIRROR_RETRY_HOURS', 24))
+    failure_rows = db.session.query(
+        PosterMirrorFailure.source_url, PosterMirrorFailure.attempts, PosterMirrorFailure.failed_at
+    ).all()
+    previous_attempts = {source_url: attempts for source_url, attempts, _ in failure_rows}
+    recent_failures = {source_url for source_url, _, failed_at in failure_rows if failed_at >= retry_after}
+    
+    pending: List[Tuple[str, str]] = []
+    poster_count = 0
+    poster_urls = db.session.query(Movie.poster_url)\
+        .filter(Movie.poster_url.isnot(None), Movie.poster_url != '')\
+        .distinct()
+    for (url,) in poster_urls:
+        if recent_checks.get(url) in BROKEN_STATUS_CODES or url in recent_failures:
+            continue
+        missing = [(url, variant) for variant in POSTER_VARIANTS if (url, variant) not in mirrored]
+        if missing:
+            pending.extend(missing)
+            poster_count += 1
+            if poster_count >= limit:
+                break
+    
+    counts = {'posters': poster_count, 'stored': 0, 'reused': 0, 'failed': 0}
+    if not pending:
+        return counts
+    
+    workers = config.get('POSTER_MIRROR_WORKERS', 8)
+    timeout = config.get('POSTER_CHECK_TIMEOUT', 10)
+    max_bytes = config.get('POSTER_MIRROR_MAX_BYTES', 5 * 1024 * 1024)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    
+    # 同一來源的各尺寸若對應相同網址（非 TMDb 圖片），只下載一次
+    download_urls = list(dict.fromkeys(variant_url(url, variant) for url, variant in pending))
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            downloads = dict(zip(
+                download_urls,
+                executor.map(lambda url: _download(session, url, timeout, max_bytes), download_urls)
+            ))
+    finally:
+        session.close()
+    
+    rows = []
+    failed_sources = {}
+    fetched_at = datetime.utcnow()
+    for url, variant in pending:
+        status_code, content, content_type = downloads[variant_url(url, variant)]
+        if content is None:
+            counts['failed'] += 1
+            failed_sources[url] = status_code
+            continue
+        
+        filename, stored = _store(content, content_type)
+        counts['stored' if stored else 'reused'] += 1
+        rows.append({
+            'source_url': url,
+            'variant': variant,
+            'filename': filename,
+            'content_type': content_type,
+            'byte_size': len(content),
+            'fetched_at': fetched_at
+        })
+    
+    # 失敗紀錄以來源網址為單位：任一尺寸失敗即記錄，全部成功後清除
+    failures = PosterMirrorFailure.__table__
+    recovered = ({row['source_url'] for row in rows} - set(failed_sources)) & set(previous_attempts)
+    if recovered or failed_sources:
+        db.session.execute(failures.delete().where(
+            failures.c.source_url.in_(list(recovered | set(failed_sources)))
+        ))
+    if failed_sources:
+        db.session.execute(failures.insert(), [
+            {
+                'source_url': url,
+                'status_code': status_code,
+                'attempts': previous_attempts.get(url, 0) + 1,
+                'failed_at': fetched_at
+            }
+            for url, status_code in failed_sources.items()
+        ])
+    if rows:
+        db.session.execute(PosterFile.__table__.insert(), rows)
+    if rows or failed_sources:
+        db.session.commit()
+    if rows:
+        invalidate_poster_map()
+    return counts
+
+
+@posters_cli.command('mirror')
+@click.option('--limit', type=int, default=None, help='本次處理的海報數上限')
+def mirror_command(limit: Optional[int]) -> None:
+    """下載尚未鏡像的電影海報"""
+    counts = mirror_posters(limit)
+    click.echo(
+        f'處理 {counts["posters"]} 張海報：新存檔 {counts["stored"]}、'
+        f'重複內容 {counts["reused"]}、失敗 {counts["failed"]}'
+    )
@@ -1,12 +1,25 @@
 """
 主要路由
 """
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app
+from typing import List, Optional
+from flask import (
+    Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app, make_response
+)
 from flask_login import login_required, current_user
-from sqlalchemy import or_, desc, func
-from app import db
-from app.models import Movie, Review, User
+from sqlalchemy import func
+from app import db, csrf
+from app.models import (
+    Movie, Review, User, movie_genres, RATING_VALUES,
+    MOVIE_SORT_KEYS, MOVIE_SORT_DESCENDING, REVIEW_SORT_KEYS
+)
+from app.http_cache import make_etag, not_modified, set_validators
+from app.page_cache import cached_page, movie_tag, TAG_LATEST_REVIEWS
+from app.pagination import keyset_paginate
+from app.poster_mirror import send_poster
+from app.facets import RATING_THRESHOLDS, get_movie_facets
+from app.genres import get_genre_map
 from app.auth.forms import ReviewForm, SearchForm
+from app.search_index import search_movies, search_reviews
 from app.scheduler import (
     get_top_movies_by_reviews, 
     get_top_movies_by_rating, 
@@ -18,6 +31,7 @@ main = Blueprint('main', __name__)
 
 
 @main.route('/')
+@cached_page(tags=lambda: [TAG_LATEST_REVIEWS])
 def index():
     """首頁"""
     # 取得輪播電影
@@ -34,8 +48,7 @@ def index():
     
     # 最新評論
     latest_reviews = Review.query\
-        .join(Movie)\
-        .join(User)\
+        .options(*Review.listing_options())\
         .order_by(Review.created_at.desc())\
         .limit(6)\
         .all()
@@ -61,10 +74,16 @@ def movies():
     
     # 基礎查詢
     query = Movie.query
+    genre_id = year_int = rating_min = None
     
-    # 類型篩選
+    # 類型篩選（movie_genres.genre_id 索引）
     if genre:
-        query = query.filter(Movie.genre_ids.contains(genre))
+        try:
+            genre_id = int(genre)
+            query = query.join(movie_genres, movie_genres.c.movie_id == Movie.movie_id)\
+                .filter(movie_genres.c.genre_id == genre_id)
+        except ValueError:
+            pass
     
     # 年份篩選
     if year:
@@ -74,56 +93,42 @@ def movies():
         except ValueError:
             pass
     
-    # 評分篩選（站內平均分）
+    # 評分篩選（站內平均分；只接受面板提供的門檻，其他值忽略）
     if rating_filter:
         try:
             rating_min = float(rating_filter)
-            query = query.filter(Movie.avg_rating >= rating_min)
         except ValueError:
-            pass
+            rating_min = None
+        if rating_min in RATING_THRESHOLDS:
+            query = query.filter(Movie.avg_rating >= rating_min)
+        else:
+            rating_min = None
+            rating_filter = ''
+    
+    # 排序（評論數使用 Movie.review_count，無需 JOIN reviews）
+    if sort_by not in MOVIE_SORT_KEYS:
+        sort_by = 'popular'
+    
+    # 篩選面板（年份、類型、評分區間計數；含符合條件的總數，行程內快取）
+    facets = get_movie_facets(
+        genre_id, year_int, rating_min,
+        ttl=current_app.config.get('FACET_CACHE_SECONDS', 300),
+        max_entries=current_app.config.get('FACET_CACHE_MAX_ENTRIES', 256)
+    )
     
-    # 排序
-    # 為了支援依評論數排序，需要 left join Review 並 group_by
-    if sort_by in ('popular', 'rating'):
-        query = query.outerjoin(Review).group_by(Movie.movie_id)
-    
-    if sort_by == 'rating':
-        # 先用站內 avg_rating（若為0或NULL）回退到 TMDb vote_average
-        # 再以評論數、年份做次序
-        sort_score = func.coalesce(func.nullif(Movie.avg_rating, 0.0), Movie.vote_average)
-        query = query.order_by(
-            desc(sort_score),
-            desc(func.count(Review.review_id)),
-            desc(Movie.release_year)
-        )
-    elif sort_by == 'recent':
-        query = query.order_by(desc(Movie.release_year), desc(Movie.created_at))
-    elif sort_by == 'title':
-        query = query.order_by(Movie.title)
-    else:  # popular（熱門度）：以評論數優先，回退 TMDb vote_average，再回退年份
-        query = query.order_by(
-            desc(func.count(Review.review_id)),
-            desc(Movie.vote_average),
-            desc(Movie.release_year),
-            desc(Movie.created_at)
-        )
-    
-    # 分頁
+    # 分頁（前幾頁使用頁碼，之後以游標定位）
     per_page = current_app.config.get('MOVIES_PER_PAGE', 20)
-    movies_pagination = query.paginate(
+    movies_pagination = keyset_paginate(
+        query,
+        MOVIE_SORT_KEYS[sort_by],
+        MOVIE_SORT_DESCENDING[sort_by],
+        per_page,
         page=page,
-        per_page=per_page,
-        error_out=False
+        cursor=request.args.get('cursor'),
+        total=facets['total'],
+        offset_pages=current_app.config.get('PAGINATION_OFFSET_PAGES', 5)
     )
     
-    # 年份選單（近年優先）
-    years = db.session.query(Movie.release_year)\
-        .filter(Movie.release_year.isnot(None))\
-        .distinct()\
-        .order_by(desc(Movie.release_year))\
-        .all()
-    years = [year[0] for year in years]
-    
     return render_template(
         'movies/list.html',
         movies=movies_pagination.items,
@@ -132,21 +137,42 @@ def movies():
         genre=genre,
         year=year,
         rating_filter=rating_filter,
-        years=years
+        facets=facets,
+        genre_names=get_genre_map()
     )
 
 
 @main.route('/movie/<int:movie_id>')
+@cached_page(tags=lambda movie_id: [movie_tag(movie_id)])
 def movie_detail(movie_id):
     """電影詳情頁面"""
     movie = Movie.query.get_or_404(movie_id)
     
-    # 取得電影評論（分頁）
+    # 條件式請求：內容未變更時在查詢評論前直接回應 304
+    # 登入使用者的頁面含評論表單的 CSRF 權杖（有效期 WTF_CSRF_TIME_LIMIT），不回應 304，每次重新渲染
+    authenticated = current_user.is_authenticated
+    if not authenticated:
+        etag = make_etag(movie.get_version(), request.full_path)
+        last_modified = movie.get_last_modified()
+        response = not_modified(etag, last_modified)
+        if response:
+            return response
+    
+    # 取得電影評論（keyset 分頁，總數取自 review_count）
     page = request.args.get('page', 1, type=int)
-    reviews_pagination = Review.query\
-        .filter_by(movie_id=movie_id)\
-        .order_by(Review.created_at.desc())\
-        .paginate(page=page, per_page=current_app.config.get('REVIEWS_PER_PAGE', 10), error_out=False)
+    reviews_query = Review.query\
+        .options(*Review.listing_options(with_movie=False))\
+        .filter_by(movie_id=movie_id)
+    reviews_pagination = keyset_paginate(
+        reviews_query,
+        REVIEW_SORT_KEYS,
+        True,
+        current_app.config.get('REVIEWS_PER_PAGE', 10),
+        page=page,
+        cursor=request.args.get('cursor'),
+        total=movie.review_count,
+        offset_pages=current_app.config.get('PAGINATION_OFFSET_PAGES', 5)
+    )
     
     # 檢查當前使用者是否已評論
     user_review = None
@@ -159,21 +185,11 @@ def movie_detail(movie_id):
     # 評論表單
     review_form = ReviewForm()
     
-    # 評分統計
-    rating_stats = db.session.query(
-        Review.rating,
-        func.count(Review.rating).label('count')
-    ).filter_by(movie_id=movie_id)\
-     .group_by(Review.rating)\
-     .all()
-    
-    rating_distribution = {i: 0 for i in range(1, 6)}
-    total_reviews = 0
-    for rating, count in rating_stats:
-        rating_distribution[rating] = count
-        total_reviews += count
+    # 評分統計（讀取增量維護的分佈欄位）
+    rating_distribution = movie.get_rating_distribution()
+    total_reviews = sum(rating_distribution.values())
     
-    return render_template(
+    response = make_response(render_template(
         'movies/detail.html',
         movie=movie,
         reviews=reviews_pagination.items,
@@ -182,7 +198,12 @@ def movie_detail(movie_id):
         review_form=review_form,
         rating_distribution=rating_distribution,
         total_reviews=total_reviews
-    )
+    ))
+    if authenticated:
+        response.cache_control.private = True
+        response.cache_control.no_store = True
+        return response
+    return set_validators(response, etag, last_modified)
 
 
 @main.route('/movie/<int:movie_id>/review', methods=['POST'])
@@ -217,11 +238,9 @@ def add_review(movie_id):
             )
             db.session.add(new_review)
         
+        # 評分統計由 Review 事件在同一交易中增量更新
         db.session.commit()
         
-        # 重新計算平均評分
-        movie.calculate_avg_rating()
-        
         flash('您的評論已提交！', 'success')
         return redirect(url_for('main.movie_detail', movie_id=movie_id))
     
@@ -244,11 +263,6 @@ def delete_review(review_id: int):
     db.session.delete(review)
     db.session.commit()
     
-    # 重新計算該電影平均評分
-    movie = Movie.query.get(movie_id)
-    if movie:
-        movie.calculate_avg_rating()
-    
     flash('評論已刪除。', 'success')
     return redirect(url_for('main.movie_detail', movie_id=movie_id))
 
@@ -264,24 +278,17 @@ def search():
     query = request.args.get('q', '').strip()
     
     if query:
-        # 電影搜尋
-        movies = Movie.query.filter(
-            or_(
-                Movie.title.contains(query),
-                Movie.overview.contains(query),
-                Movie.tagline.contains(query)
-            )
-        ).order_by(desc(Movie.avg_rating)).limit(20).all()
+        # 電影搜尋（FTS5 全文檢索，依相關度排序）
+        movies = search_movies(query, 20)
         
         # 使用者搜尋
         users = User.query.filter(
             User.display_name.contains(query)
         ).filter(User.email_confirmed == True).limit(10).all()
+        User.preload_review_counts(users)
         
-        # 評論搜尋
-        reviews = Review.query.join(Movie).join(User).filter(
-            Review.comment_text.contains(query)
-        ).order_by(desc(Review.created_at)).limit(15).all()
+        # 評論搜尋（FTS5 全文檢索，依相關度排序）
+        reviews = search_reviews(query, 15)
     
     return render_template(
         'search_results.html',
@@ -294,6 +301,7 @@ def search():
 
 
 @main.route('/ranking')
+@cached_page()
 def ranking():
     """排行榜頁面"""
     tab = request.args.get('tab', 'popular')  # popular, top_rated, recent
@@ -316,27 +324,97 @@ def ranking():
     )
 
 
+@main.route('/posters/<filename>')
+def poster_file(filename):
+    """本機鏡像的海報檔案"""
+    return send_poster(filename)
+
+
 @main.route('/api/movie/<int:movie_id>/rating', methods=['GET'])
 def get_movie_rating(movie_id):
     """API: 取得電影評分資訊"""
     movie = Movie.query.get_or_404(movie_id)
     
-    # 評分統計
-    rating_stats = db.session.query(
-        Review.rating,
-        func.count(Review.rating).label('count')
-    ).filter_by(movie_id=movie_id)\
-     .group_by(Review.rating)\
-     .all()
+    # 條件式請求：評分資料未變更時直接回應 304
+    etag = make_etag(movie.get_version(), 'rating')
+    last_modified = movie.get_last_modified()
+    response = not_modified(etag, last_modified, vary_cookie=False)
+    if response:
+        return response
     
-    # 平均評分
-    avg_rating = movie.avg_rating
-    total_reviews = sum(count for _, count in rating_stats)
+    # 評分統計（讀取增量維護的分佈欄位）
+    rating_distribution = movie.get_rating_distribution()
+    
+    response = jsonify({
+        'avg_rating': movie.avg_rating,
+        'total_reviews': sum(rating_distribution.values()),
+        'distribution': {str(rating): count for rating, count in rating_distribution.items() if count}
+    })
+    return set_validators(response, etag, last_modified, vary_cookie=False)
+
+
+def _parse_movie_ids(raw_ids) -> Optional[List[int]]:
+    """
+    解析批次 API 的電影 ID（逗號分隔字串或列表），去除重複並保留順序
+    
+    Args:
+        raw_ids: 原始 ID 參數
+    
+    Returns:
+        電影 ID 列表；格式錯誤時回傳 None
+    """
+    if isinstance(raw_ids, str):
+        raw_ids = [value for value in raw_ids.split(',') if value.strip()]
+    if not isinstance(raw_ids, list):
+        return None
+    
+    try:
+        movie_ids = [int(value) for value in raw_ids]
+    except (TypeError, ValueError):
+        return None
+    return list(dict.fromkeys(movie_ids))
+
+
+@main.route('/api/movies/ratings', methods=['GET', 'POST'])
+@csrf.exempt
+def get_movies_ratings():
+    """
+    API: 批次取得多部電影的評分資訊
+    
+    GET 以 ?ids=1,2,3 傳入；ID 較多時可用 POST（JSON {"ids": [...]} 或表單欄位 ids）。
+    回應以電影 ID 為鍵：{"avg": 平均評分, "total": 評論數, "dist": [1-5 星評論數]}。
+    """
+    if request.method == 'POST':
+        payload = request.get_json(silent=True)
+        raw_ids = payload.get('ids') if isinstance(payload, dict) else request.form.get('ids', '')
+    else:
+        raw_ids = request.args.get('ids', '')
+    
+    movie_ids = _parse_movie_ids(raw_ids)
+    if movie_ids is None:
+        return jsonify({'error': 'ids 格式錯誤'}), 400
+    
+    max_ids = current_app.config.get('RATINGS_BATCH_MAX_IDS', 200)
+    if len(movie_ids) > max_ids:
+        return jsonify({'error': f'ids 最多 {max_ids} 筆'}), 400
+    
+    ratings = {}
+    if movie_ids:
+        # 單一查詢讀取增量維護的評分統計欄位
+        rating_columns = [getattr(Movie, f'rating_{rating}_count') for rating in RATING_VALUES]
+        rows = db.session.query(Movie.movie_id, Movie.avg_rating, Movie.review_count, *rating_columns)\
+            .filter(Movie.movie_id.in_(movie_ids))\
+            .all()
+        for movie_id, avg_rating, review_count, *distribution in rows:
+            ratings[str(movie_id)] = {
+                'avg': avg_rating or 0.0,
+                'total': review_count or 0,
+                'dist': [count or 0 for count in distribution]
+            }
     
     return jsonify({
-        'avg_rating': avg_rating,
-        'total_reviews': total_reviews,
-        'distribution': {str(rating): count for rating, count in rating_stats}
+        'ratings': ratings,
+        'missing': [movie_id for movie_id in movie_ids if str(movie_id) not in ratings]
     })
 
 
@@ -345,14 +423,23 @@ def user_profile(user_id):
     """使用者個人頁"""
     user = User.query.get_or_404(user_id)
     
-    page = request.args.get('page', 1, type=int)
-    reviews_pagination = Review.query\
-        .filter_by(user_id=user_id)\
-        .order_by(Review.created_at.desc())\
-        .paginate(page=page, per_page=current_app.config.get('REVIEWS_PER_PAGE', 10), error_out=False)
-    
     total_reviews = db.session.query(func.count(Review.review_id))\
         .filter_by(user_id=user_id).scalar()
+    
+    page = request.args.get('page', 1, type=int)
+    reviews_query = Review.query\
+        .options(*Review.listing_options(with_user=False))\
+        .filter_by(user_id=user_id)
+    reviews_pagination = keyset_paginate(
+        reviews_query,
+        REVIEW_SORT_KEYS,
+        True,
+        current_app.config.get('REVIEWS_PER_PAGE', 10),
+        page=page,
+        cursor=request.args.get('cursor'),
+        total=total_reviews,
+        offset_pages=current_app.config.get('PAGINATION_OFFSET_PAGES', 5)
+    )
     avg_rating_given = db.session.query(func.avg(Review.rating))\
         .filter_by(user_id=user_id).scalar()
     avg_rating_given = round(avg_rating_given, 2) if avg_rating_given else 0
@@ -1,13 +1,81 @@
 """
-排程器 - 每日更新排行榜
+排程器 - 每日更新排行榜與其他定期工作（多行程部署時由資料庫租約選出單一執行者）
 """
 import logging
+import signal
+import sys
+import threading
 from datetime import datetime
+from typing import Any, Callable, List, Optional, Set, Tuple
+import click
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import BaseScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
-from flask import Flask
+from apscheduler.triggers.interval import IntervalTrigger
+from flask import Flask, current_app
+from flask.cli import AppGroup
+from sqlalchemy import case, delete, func, insert, literal, or_, update
+from sqlalchemy.orm import Query
 from app import db
-from app.models import Movie
+from app.models import Movie, Review, RankingSnapshot, RATING_VALUES
+from app.scheduler_lock import LEADER_LOCK, acquire_lock, job_lock_name, list_locks, new_owner_id, release_lock
+
+# 排行榜快照種類
+SNAPSHOT_POPULAR = 'popular'
+SNAPSHOT_TOP_RATED = 'top_rated'
+SNAPSHOT_HERO = 'hero'
+
+# 需要預先計算的高分排行門檻（首頁 3 則、排行榜頁 5 則）
+TOP_RATED_MIN_REVIEWS = (3, 5)
+
+scheduler_cli = AppGroup('scheduler', help='排程器')
+
+
+def recalculate_rating_stats() -> int:
+    """
+    以單一聚合 UPDATE 重新計算全站電影的評分統計
+    
+    以 movies LEFT JOIN reviews 的分組子查詢產生每部電影的統計，
+    僅更新與現值不一致的列，不將任何電影載入記憶體。
+    
+    Returns:
+        實際變更的電影數
+    """
+    review_count = func.count(Review.review_id)
+    rating_sum = func.coalesce(func.sum(Review.rating), 0)
+    stats_columns = [
+        Movie.movie_id.label('movie_id'),
+        review_count.label('review_count'),
+        rating_sum.label('rating_sum'),
+        case(
+            (review_count > 0, func.round(rating_sum * 1.0 / review_count, 2)),
+            else_=0.0
+        ).label('avg_rating')
+    ]
+    for rating in RATING_VALUES:
+        stats_columns.append(
+            func.coalesce(func.sum(case((Review.rating == rating, 1), else_=0)), 0)
+            .label(f'rating_{rating}_count')
+        )
+    
+    stats = db.session.query(*stats_columns)\
+        .select_from(Movie)\
+        .outerjoin(Review, Review.movie_id == Movie.movie_id)\
+        .group_by(Movie.movie_id)\
+        .subquery()
+    
+    stat_names = ['review_count', 'rating_sum', 'avg_rating'] + \
+        [f'rating_{rating}_count' for rating in RATING_VALUES]
+    movies = Movie.__table__
+    
+    result = db.session.execute(
+        update(movies)
+        .where(movies.c.movie_id == stats.c.movie_id)
+        .where(or_(*(movies.c[name] != stats.c[name] for name in stat_names)))
+        .values({movies.c[name]: stats.c[name] for name in stat_names})
+    )
+    return result.rowcount
 
 
 def update_rankings() -> None:
@@ -18,46 +86,182 @@ def update_rankings() -> None:
     try:
         logging.info('開始更新電影排行榜...')
         
-        # 重新計算所有電影的平均評分
-        movies = Movie.query.all()
-        updated_count = 0
-        
-        for movie in movies:
-            old_rating = movie.avg_rating
-            movie.calculate_avg_rating()
-            
-            if old_rating != movie.avg_rating:
-                updated_count += 1
-        
+        # 以單一交易重新計算所有電影的評分統計並重建排行榜快照
+        updated_count = recalculate_rating_stats()
+        snapshot_rows = refresh_ranking_snapshots()
         db.session.commit()
         
-        logging.info(f'排行榜更新完成，共更新 {updated_count} 部電影的評分')
+        logging.info(
+            f'排行榜更新完成，共更新 {updated_count} 部電影的評分，'
+            f'寫入 {snapshot_rows} 筆排行榜快照'
+        )
         
     except Exception as e:
         logging.error(f'更新排行榜時發生錯誤: {str(e)}')
         db.session.rollback()
 
 
-def get_top_movies_by_reviews(limit: int = 50):
+def _review_count():
+    """評論數聚合欄位"""
+    return func.count(Review.review_id)
+
+
+def _popular_ranking() -> Tuple[Query, list, Any]:
     """
-    取得依評論數排序的熱門電影
+    熱門電影排行：依評論數 ➜ 上映年份 ➜ 建立時間
+    
+    Returns:
+        (查詢, 排序條件, 分數欄位)
+    """
+    query = db.session.query(Movie)\
+        .join(Movie.reviews)\
+        .group_by(Movie.movie_id)
+    order_by = [
+        _review_count().desc(),    # 評論數降序
+        Movie.release_year.desc(),  # 上映年份降序
+        Movie.created_at.desc()     # 建立時間降序
+    ]
+    return query, order_by, _review_count()
+
+
+def _top_rated_ranking(min_reviews: int) -> Tuple[Query, list, Any]:
+    """
+    高分電影排行：依平均評分 ➜ 評論數 ➜ 上映年份
     
     Args:
-        limit: 限制數量
+        min_reviews: 最少評論數要求
         
     Returns:
-        電影列表，依評論數降序排列，相同評論數時依上映日降序
+        (查詢, 排序條件, 分數欄位)
     """
-    return db.session.query(Movie)\
+    query = db.session.query(Movie)\
         .join(Movie.reviews)\
         .group_by(Movie.movie_id)\
-        .order_by(
-            db.func.count(Movie.reviews).desc(),  # 評論數降序
-            Movie.release_year.desc(),            # 上映年份降序
-            Movie.created_at.desc()               # 建立時間降序
-        )\
+        .having(_review_count() >= min_reviews)
+    order_by = [
+        Movie.avg_rating.desc(),    # 平均評分降序
+        _review_count().desc(),     # 評論數降序
+        Movie.release_year.desc()   # 上映年份降序
+    ]
+    return query, order_by, Movie.avg_rating
+
+
+def _hero_ranking() -> Tuple[Query, list, Any]:
+    """
+    首頁輪播排行：有海報且評論數較多的電影
+    
+    Returns:
+        (查詢, 排序條件, 分數欄位)
+    """
+    query = db.session.query(Movie)\
+        .filter(Movie.poster_url.isnot(None))\
+        .filter(Movie.poster_url != '')\
+        .join(Movie.reviews)\
+        .group_by(Movie.movie_id)\
+        .having(_review_count() >= 3)
+    order_by = [
+        _review_count().desc(),
+        Movie.avg_rating.desc(),
+        Movie.release_year.desc()
+    ]
+    return query, order_by, _review_count()
+
+
+def _top_rated_kind(min_reviews: int) -> str:
+    """高分排行快照種類名稱"""
+    return f'{SNAPSHOT_TOP_RATED}_{min_reviews}'
+
+
+def _get_snapshot_movies(kind: str, limit: int) -> Optional[List[Movie]]:
+    """
+    從排行榜快照讀取電影
+    
+    Args:
+        kind: 快照種類
+        limit: 限制數量
+        
+    Returns:
+        電影列表；尚未建立任何快照或快照不足以回應時回傳 None，由呼叫端改用即時查詢
+    """
+    snapshot_kinds = {SNAPSHOT_POPULAR, SNAPSHOT_HERO} | {_top_rated_kind(n) for n in TOP_RATED_MIN_REVIEWS}
+    if kind not in snapshot_kinds or limit > current_app.config.get('RANKING_SNAPSHOT_SIZE', 50):
+        return None
+    
+    movies = db.session.query(Movie)\
+        .join(RankingSnapshot, RankingSnapshot.movie_id == Movie.movie_id)\
+        .filter(RankingSnapshot.kind == kind)\
+        .order_by(RankingSnapshot.position)\
         .limit(limit)\
         .all()
+    if movies:
+        return movies
+    
+    # 快照已建立但此排行沒有電影（例如尚無電影達到最低評論數）時，即時查詢的結果同樣為空
+    has_snapshots = db.session.query(RankingSnapshot.kind).first() is not None
+    return [] if has_snapshots else None
+
+
+def refresh_ranking_snapshots() -> int:
+    """
+    重建排行榜快照
+    
+    先清空舊快照，再以 INSERT ... SELECT 寫入各排行的前 N 名；
+    呼叫端於同一交易中提交，讀取端只會看到完整的舊版或新版快照。
+    
+    Returns:
+        寫入的快照列數
+    """
+    size = current_app.config.get('RANKING_SNAPSHOT_SIZE', 50)
+    computed_at = datetime.utcnow()
+    
+    rankings = [
+        (SNAPSHOT_POPULAR, _popular_ranking()),
+        (SNAPSHOT_HERO, _hero_ranking())
+    ]
+    for min_reviews in TOP_RATED_MIN_REVIEWS:
+        rankings.append((_top_rated_kind(min_reviews), _top_rated_ranking(min_reviews)))
+    
+    snapshot = RankingSnapshot.__table__
+    db.session.execute(delete(snapshot))
+    
+    total_rows = 0
+    for kind, (query, order_by, score) in rankings:
+        rows = query.with_entities(
+            literal(kind, db.String),
+            func.row_number().over(order_by=order_by),
+            Movie.movie_id,
+            score,
+            _review_count(),
+            literal(computed_at, db.DateTime)
+        ).order_by(*order_by).limit(size)
+        
+        result = db.session.execute(
+            insert(snapshot).from_select(
+                ['kind', 'position', 'movie_id', 'score', 'review_count', 'computed_at'],
+                rows.statement
+            )
+        )
+        total_rows += result.rowcount
+    
+    return total_rows
+
+
+def get_top_movies_by_reviews(limit: int = 50):
+    """
+    取得依評論數排序的熱門電影
+    
+    Args:
+        limit: 限制數量
+        
+    Returns:
+        電影列表，依評論數降序排列，相同評論數時依上映日降序
+    """
+    movies = _get_snapshot_movies(SNAPSHOT_POPULAR, limit)
+    if movies is not None:
+        return movies
+    
+    query, order_by, _ = _popular_ranking()
+    return query.order_by(*order_by).limit(limit).all()
 
 
 def get_top_movies_by_rating(limit: int = 50, min_reviews: int = 5):
@@ -71,17 +275,12 @@ def get_top_movies_by_rating(limit: int = 50, min_reviews: int = 5):
     Returns:
         電影列表，依平均評分降序排列
     """
-    return db.session.query(Movie)\
-        .join(Movie.reviews)\
-        .group_by(Movie.movie_id)\
-        .having(db.func.count(Movie.reviews) >= min_reviews)\
-        .order_by(
-            Movie.avg_rating.desc(),              # 平均評分降序
-            db.func.count(Movie.reviews).desc(),  # 評論數降序
-            Movie.release_year.desc()             # 上映年份降序
-        )\
-        .limit(limit)\
-        .all()
+    movies = _get_snapshot_movies(_top_rated_kind(min_reviews), limit)
+    if movies is not None:
+        return movies
+    
+    query, order_by, _ = _top_rated_ranking(min_reviews)
+    return query.order_by(*order_by).limit(limit).all()
 
 
 def get_recent_movies(limit: int = 20):
@@ -115,88 +314,217 @@ def get_hero_carousel_movies(limit: int = 5):
     Returns:
         電影列表，用於首頁輪播
     """
+    movies = _get_snapshot_movies(SNAPSHOT_HERO, limit)
+    if movies is not None:
+        return movies
+    
     # 選擇有海報且評論數較多的電影
-    return db.session.query(Movie)\
-        .filter(Movie.poster_url.isnot(None))\
-        .filter(Movie.poster_url != '')\
-        .join(Movie.reviews)\
-        .group_by(Movie.movie_id)\
-        .having(db.func.count(Movie.reviews) >= 3)\
-        .order_by(
-            db.func.count(Movie.reviews).desc(),
-            Movie.avg_rating.desc(),
-            Movie.release_year.desc()
-        )\
-        .limit(limit)\
-        .all()
+    query, order_by, _ = _hero_ranking()
+    return query.order_by(*order_by).limit(limit).all()
 
 
 def cleanup_expired_tokens() -> None:
     """
-    清理過期的確認令牌
+    清理過期的確認與重設令牌
     """
     try:
-        from app.models import User
-        from datetime import timedelta
-        
-        # 清理30分鐘前的令牌（假設重設連結30分鐘過期）
-        expiry_time = datetime.utcnow() - timedelta(minutes=30)
+        from app.auth.tokens import purge_expired_tokens
         
-        expired_users = User.query.filter(
-            User.confirmation_token.isnot(None),
-            User.created_at < expiry_time,
-            User.email_confirmed == False
-        ).all()
-        
-        for user in expired_users:
-            user.confirmation_token = None
-        
-        if expired_users:
-            db.session.commit()
-            logging.info(f'已清理 {len(expired_users)} 個過期的確認令牌')
+        purged = purge_expired_tokens()
+        if purged:
+            logging.info(f'已清理 {purged} 個過期的令牌')
             
     except Exception as e:
         logging.error(f'清理過期令牌時發生錯誤: {str(e)}')
         db.session.rollback()
 
 
-def start_scheduler(app: Flask) -> None:
+class SchedulerRunner:
     """
-    啟動排程器
+    排程工作的執行者（可同時存在於多個行程）
     
-    Args:
-        app: Flask 應用程式實例
+    每個行程的排程器都以心跳競爭資料庫中的領導者租約，只有領導者會執行工作；
+    工作開始前另取得該工作的執行中租約，前一次尚未結束時略過本次，
+    執行期間由心跳續約，行程中斷時租約逾期後由其他行程接手。
     """
-    scheduler = BackgroundScheduler()
     
-    # 設定排程器的日誌記錄器
-    logging.getLogger('apscheduler').setLevel(logging.WARNING)
+    def __init__(self, app: Flask) -> None:
+        self.app = app
+        self.owner = new_owner_id()
+        self.leader_ttl = app.config.get('SCHEDULER_LEADER_TTL_SECONDS', 90)
+        self.job_ttl = app.config.get('SCHEDULER_JOB_LOCK_SECONDS', 600)
+        self._running: Set[str] = set()
+        self._lock = threading.Lock()
     
-    with app.app_context():
-        # 每日 02:00 更新排行榜
+    def heartbeat(self) -> None:
+        """取得或續約領導者租約，並續約執行中工作的租約"""
+        with self.app.app_context():
+            try:
+                is_leader = acquire_lock(LEADER_LOCK, self.owner, self.leader_ttl)
+                with self._lock:
+                    running = list(self._running)
+                for job_id in running:
+                    acquire_lock(job_lock_name(job_id), self.owner, self.job_ttl)
+                logging.debug(f'排程器心跳 {self.owner}: {"領導者" if is_leader else "待命"}')
+            except Exception as e:
+                logging.error(f'排程器心跳失敗: {str(e)}')
+    
+    def wrap(self, job_id: str, func: Callable[[], Any]) -> Callable[[], None]:
+        """
+        包裝排程工作：僅由領導者執行，且同一工作不重疊執行
+        
+        Args:
+            job_id: 工作 ID
+            func: 工作函數（於應用程式情境中執行）
+        
+        Returns:
+            交給 APScheduler 的函數
+        """
+        def run() -> None:
+            with self.app.app_context():
+                try:
+                    if not acquire_lock(LEADER_LOCK, self.owner, self.leader_ttl):
+                        return
+                    with self._lock:
+                        already_running = job_id in self._running
+                    if already_running or not acquire_lock(job_lock_name(job_id), self.owner, self.job_ttl):
+                        logging.warning(f'排程工作 {job_id} 的前一次執行尚未結束，略過本次')
+                        return
+                    with self._lock:
+                        self._running.add(job_id)
+                    try:
+                        func()
+                    finally:
+                        with self._lock:
+                            self._running.discard(job_id)
+                        release_lock(job_lock_name(job_id), self.owner)
+                except Exception as e:
+                    logging.error(f'排程工作 {job_id} 發生錯誤: {str(e)}')
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+        return run
+    
+    def add_jobs(self, scheduler: BaseScheduler) -> None:
+        """
+        註冊心跳與所有排程工作
+        
+        Args:
+            scheduler: APScheduler 排程器
+        """
+        app = self.app
+        
+        def add_job(job_id: str, name: str, func: Callable[[], Any], trigger) -> None:
+            scheduler.add_job(
+                func=self.wrap(job_id, func),
+                trigger=trigger,
+                id=job_id,
+                name=name,
+                replace_existing=True,
+                max_instances=1,  # 同一行程內也不重疊執行
+                coalesce=True
+            )
+        
         scheduler.add_job(
-            func=lambda: app.app_context().push() or update_rankings(),
-            trigger=CronTrigger(hour=2, minute=0),
-            id='update_rankings',
-            name='更新電影排行榜',
+            func=self.heartbeat,
+            trigger=IntervalTrigger(seconds=app.config.get('SCHEDULER_HEARTBEAT_SECONDS', 30)),
+            id='scheduler_heartbeat',
+            name='排程器心跳',
+            next_run_time=datetime.now(),
             replace_existing=True
         )
         
+        # 每日 02:00 更新排行榜
+        add_job('update_rankings', '更新電影排行榜', update_rankings,
+                CronTrigger(hour=app.config.get('RANKING_UPDATE_HOUR', 2), minute=0))
+        
+        # 每日同步 TMDb 變更（需設定 API Key）
+        if app.config.get('TMDB_API_KEY'):
+            from app.tmdb_sync import sync_tmdb_changes
+            add_job('sync_tmdb', '同步 TMDb 電影資料', sync_tmdb_changes,
+                    CronTrigger(hour=app.config.get('TMDB_SYNC_HOUR', 3), minute=30))
+        
+        # 每小時下載尚未鏡像的海報（需啟用本機海報鏡像）
+        if app.config.get('POSTER_MIRROR_ENABLED'):
+            from app.poster_mirror import mirror_posters
+            add_job('mirror_posters', '鏡像電影海報', mirror_posters, CronTrigger(minute=15))
+        
+        # 每日 04:00 刪除已寄出與 dead 的舊信件
+        from app.email_outbox import purge_outbox
+        add_job('purge_outbox', '清理寄件匣', purge_outbox, CronTrigger(hour=4, minute=0))
+        
         # 每小時清理過期令牌
-        scheduler.add_job(
-            func=lambda: app.app_context().push() or cleanup_expired_tokens(),
-            trigger=CronTrigger(minute=0),
-            id='cleanup_tokens',
-            name='清理過期令牌',
-            replace_existing=True
-        )
+        add_job('cleanup_tokens', '清理過期令牌', cleanup_expired_tokens, CronTrigger(minute=0))
+    
+    def release(self) -> None:
+        """釋放本行程持有的領導者租約（行程結束時呼叫，讓其他行程盡快接手）"""
+        with self.app.app_context():
+            try:
+                release_lock(LEADER_LOCK, self.owner)
+            except Exception as e:
+                logging.error(f'釋放排程器租約失敗: {str(e)}')
+
+
+def start_scheduler(app: Flask) -> BackgroundScheduler:
+    """
+    在背景執行緒啟動排程器（多個 worker 皆啟動時，由領導者租約決定誰執行工作）
     
+    Args:
+        app: Flask 應用程式實例
+    
+    Returns:
+        排程器
+    """
+    scheduler = BackgroundScheduler()
+    runner = SchedulerRunner(app)
+    
+    # 設定排程器的日誌記錄器
+    logging.getLogger('apscheduler').setLevel(logging.WARNING)
+    
+    runner.add_jobs(scheduler)
     try:
         scheduler.start()
+        app.extensions['scheduler'] = scheduler
         app.logger.info('排程器已啟動')
     except Exception as e:
         app.logger.error(f'排程器啟動失敗: {str(e)}')
     
     # 註冊應用程式關閉時的清理函數
     import atexit
-    atexit.register(lambda: scheduler.shutdown())
+    atexit.register(lambda: scheduler.shutdown() or runner.release())
+    return scheduler
+
+
+@scheduler_cli.command('run')
+def run_command() -> None:
+    """在前景執行排程器（搭配 SCHEDULER_ENABLED=False 的網站 worker 使用）"""
+    app = current_app._get_current_object()
+    background = app.extensions.pop('scheduler', None)
+    if background is not None:
+        background.shutdown(wait=False)
+    
+    scheduler = BlockingScheduler()
+    runner = SchedulerRunner(app)
+    runner.add_jobs(scheduler)
+    logging.getLogger('apscheduler').setLevel(logging.WARNING)
+    click.echo(f'排程器執行中（{runner.owner}），按 Ctrl+C 結束')
+    # 收到 SIGTERM（例如 systemd、容器停止）時同樣釋放租約
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        runner.release()
+
+
+@scheduler_cli.command('status')
+def status_command() -> None:
+    """顯示排程領導者與執行中工作的租約"""
+    now = datetime.utcnow()
+    locks = list_locks()
+    if not locks:
+        click.echo('目前沒有排程器持有租約')
+    for lock in locks:
+        state = '有效' if lock.expires_at > now else '已逾期'
+        click.echo(f'{lock.name:<24} {lock.owner:<40} 取得於 {lock.acquired_at:%Y-%m-%d %H:%M:%S} {state}')
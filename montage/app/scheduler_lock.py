@@ -0,0 +1,83 @@
+"""
+排程器租約鎖 - 以資料表實作的跨行程鎖，確保同一時間只有一個行程執行排程工作
+"""
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy import case, delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import SchedulerLock
+
+# 排程領導者的鎖名稱
+LEADER_LOCK = 'scheduler'
+
+
+def job_lock_name(job_id: str) -> str:
+    """工作執行中標記的鎖名稱"""
+    return f'job:{job_id}'
+
+
+def new_owner_id() -> str:
+    """產生本行程排程器的擁有者識別碼（主機:行程:隨機碼）"""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def acquire_lock(name: str, owner: str, ttl: float) -> bool:
+    """
+    取得或續約租約鎖
+    
+    以獨立連線的短交易執行，不影響工作本身的 session：
+    自己持有或已逾期的鎖以 UPDATE 接手，不存在時 INSERT，主鍵衝突代表已被他人取得。
+    
+    Args:
+        name: 鎖名稱
+        owner: 擁有者識別碼
+        ttl: 租約秒數
+    
+    Returns:
+        是否取得（或續約）成功
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+    locks = SchedulerLock.__table__
+    try:
+        with db.engine.begin() as connection:
+            result = connection.execute(
+                update(locks)
+                .where(locks.c.name == name)
+                .where(or_(locks.c.owner == owner, locks.c.expires_at < now))
+                .values(
+                    owner=owner,
+                    expires_at=expires_at,
+                    acquired_at=case((locks.c.owner == owner, locks.c.acquired_at), else_=now)
+                )
+            )
+            if result.rowcount:
+                return True
+            connection.execute(
+                insert(locks).values(name=name, owner=owner, acquired_at=now, expires_at=expires_at)
+            )
+        return True
+    except IntegrityError:
+        return False
+
+
+def release_lock(name: str, owner: str) -> None:
+    """
+    釋放自己持有的租約鎖
+    
+    Args:
+        name: 鎖名稱
+        owner: 擁有者識別碼
+    """
+    locks = SchedulerLock.__table__
+    with db.engine.begin() as connection:
+        connection.execute(delete(locks).where(locks.c.name == name).where(locks.c.owner == owner))
+
+
+def list_locks() -> List[SchedulerLock]:
+    """列出所有租約鎖"""
+    return SchedulerLock.query.order_by(SchedulerLock.name).all()
@@ -0,0 +1,56 @@
+"""
+資料庫結構 - 建立表格、套用 Flask-Migrate 遷移、全文檢索索引與預設類型資料（部署步驟，不在每次啟動時執行）
+"""
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+from app import db
+
+schema_cli = AppGroup('schema', help='資料庫結構')
+
+# 導入 Flask-Migrate 前由 db.create_all() 建立的結構（migrations/versions/a3f9c2e17b05_initial_schema.py）
+BASELINE_REVISION = 'a3f9c2e17b05'
+
+
+def _stamp_legacy_database() -> None:
+    """將導入遷移前建立的資料庫標記為初始版本，之後的遷移才會依序套用"""
+    from flask_migrate import stamp
+    
+    table_names = db.inspect(db.engine).get_table_names()
+    if 'alembic_version' in table_names or 'users' not in table_names:
+        return
+    stamp(revision=BASELINE_REVISION)
+
+
+def init_schema(app: Flask) -> None:
+    """
+    建立缺少的資料表、全文檢索索引與類型資料（可重複執行，需在應用程式上下文中呼叫）
+    
+    資料表、欄位與索引全部依 migrations/ 的遷移依序建立；導入遷移前建立的資料庫先標記為初始版本再升級。
+    排行榜快照尚未建立時立即建立一次，不必等到排程器第一次執行。
+    
+    Args:
+        app: Flask 應用程式實例
+    """
+    from app.search_index import ensure_search_index
+    from app.genres import ensure_genres
+    from app.models import RankingSnapshot
+    from app.scheduler import refresh_ranking_snapshots
+    from flask_migrate import upgrade
+    
+    _stamp_legacy_database()
+    upgrade()
+    ensure_search_index(app)
+    ensure_genres(app)
+    
+    if db.session.query(RankingSnapshot.kind).first() is None:
+        refresh_ranking_snapshots()
+        db.session.commit()
+
+
+@schema_cli.command('init')
+def init_command() -> None:
+    """建立或補齊資料庫結構（安裝與升級後執行）"""
+    init_schema(current_app)
+    search_index = '啟用' if current_app.extensions.get('search_index') else '無法使用（改用 LIKE 搜尋）'
+    click.echo(f'資料庫結構已就緒，全文檢索{search_index}')
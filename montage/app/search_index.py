@@ -0,0 +1,370 @@
+"""
+全文檢索 - SQLite FTS5 索引（電影與評論）
+"""
+import re
+from typing import List, Optional, Tuple
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, or_, desc, text
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import Movie, Review
+
+# trigram 分詞器以三個字元為單位切分，可直接處理繁體中文；
+# 較短的詞（多數中文詞只有兩個字）改查二元索引，不必退回 LIKE 全表掃描
+MIN_TERM_LENGTH = 3
+
+# 二元索引的分詞：每個詞拆成相鄰兩字與詞尾單字，由 search_bigrams() 在寫入時產生
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+# bm25 欄位權重（title, overview, tagline）：標題 > 標語 > 簡介
+MOVIE_RANK_WEIGHTS = '10.0, 1.0, 3.0'
+
+SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+        title, overview, tagline,
+        content='movies', content_rowid='movie_id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5(
+        comment_text,
+        content='reviews', content_rowid='review_id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_ai AFTER INSERT ON movies BEGIN
+        INSERT INTO movies_fts(rowid, title, overview, tagline)
+        VALUES (new.movie_id, new.title, new.overview, new.tagline);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_ad AFTER DELETE ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title, overview, tagline)
+        VALUES ('delete', old.movie_id, old.title, old.overview, old.tagline);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_au AFTER UPDATE OF title, overview, tagline ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title, overview, tagline)
+        VALUES ('delete', old.movie_id, old.title, old.overview, old.tagline);
+        INSERT INTO movies_fts(rowid, title, overview, tagline)
+        VALUES (new.movie_id, new.title, new.overview, new.tagline);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reviews_fts_ai AFTER INSERT ON reviews BEGIN
+        INSERT INTO reviews_fts(rowid, comment_text) VALUES (new.review_id, new.comment_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reviews_fts_ad AFTER DELETE ON reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, comment_text)
+        VALUES ('delete', old.review_id, old.comment_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reviews_fts_au AFTER UPDATE OF comment_text ON reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, comment_text)
+        VALUES ('delete', old.review_id, old.comment_text);
+        INSERT INTO reviews_fts(rowid, comment_text) VALUES (new.review_id, new.comment_text);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS movies_bigram_fts USING fts5(
+        title, overview, tagline,
+        content='', tokenize='unicode61'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS reviews_bigram_fts USING fts5(
+        comment_text,
+        content='', tokenize='unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_bigram_fts_ai AFTER INSERT ON movies BEGIN
+        INSERT INTO movies_bigram_fts(rowid, title, overview, tagline)
+        VALUES (new.movie_id, search_bigrams(new.title), search_bigrams(new.overview), search_bigrams(new.tagline));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_bigram_fts_ad AFTER DELETE ON movies BEGIN
+        INSERT INTO movies_bigram_fts(movies_bigram_fts, rowid, title, overview, tagline)
+        VALUES ('delete', old.movie_id, search_bigrams(old.title), search_bigrams(old.overview), search_bigrams(old.tagline));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_bigram_fts_au AFTER UPDATE OF title, overview, tagline ON movies BEGIN
+        INSERT INTO movies_bigram_fts(movies_bigram_fts, rowid, title, overview, tagline)
+        VALUES ('delete', old.movie_id, search_bigrams(old.title), search_bigrams(old.overview), search_bigrams(old.tagline));
+        INSERT INTO movies_bigram_fts(rowid, title, overview, tagline)
+        VALUES (new.movie_id, search_bigrams(new.title), search_bigrams(new.overview), search_bigrams(new.tagline));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reviews_bigram_fts_ai AFTER INSERT ON reviews BEGIN
+        INSERT INTO reviews_bigram_fts(rowid, comment_text) VALUES (new.review_id, search_bigrams(new.comment_text));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reviews_bigram_fts_ad AFTER DELETE ON reviews BEGIN
+        INSERT INTO reviews_bigram_fts(reviews_bigram_fts, rowid, comment_text)
+        VALUES ('delete', old.review_id, search_bigrams(old.comment_text));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reviews_bigram_fts_au AFTER UPDATE OF comment_text ON reviews BEGIN
+        INSERT INTO reviews_bigram_fts(reviews_bigram_fts, rowid, comment_text)
+        VALUES ('delete', old.review_id, search_bigrams(old.comment_text));
+        INSERT INTO reviews_bigram_fts(rowid, comment_text) VALUES (new.review_id, search_bigrams(new.comment_text));
+    END
+    """
+]
+
+# 以現有資料填入索引（二元索引為無內容表格，先清空再以 search_bigrams() 寫入）
+SEARCH_INDEX_REBUILD = {
+    'movies_fts': ["INSERT INTO movies_fts(movies_fts) VALUES ('rebuild')"],
+    'reviews_fts': ["INSERT INTO reviews_fts(reviews_fts) VALUES ('rebuild')"],
+    'movies_bigram_fts': [
+        "INSERT INTO movies_bigram_fts(movies_bigram_fts) VALUES ('delete-all')",
+        'INSERT INTO movies_bigram_fts(rowid, title, overview, tagline) '
+        'SELECT movie_id, search_bigrams(title), search_bigrams(overview), search_bigrams(tagline) FROM movies'
+    ],
+    'reviews_bigram_fts': [
+        "INSERT INTO reviews_bigram_fts(reviews_bigram_fts) VALUES ('delete-all')",
+        'INSERT INTO reviews_bigram_fts(rowid, comment_text) '
+        'SELECT review_id, search_bigrams(comment_text) FROM reviews'
+    ]
+}
+
+search_index_cli = AppGroup('search-index', help='全文檢索索引管理')
+
+
+def search_bigrams(value: Optional[str]) -> Optional[str]:
+    """
+    將文字轉為二元索引的分詞字串（SQL 函數 search_bigrams，由觸發器呼叫）
+    
+    每個詞拆成相鄰兩字，並加上詞尾單字，使任一單字都是某個分詞的開頭。
+    
+    Args:
+        value: 電影標題、簡介、標語或評論內容
+    
+    Returns:
+        以空白分隔的分詞
+    """
+    if value is None:
+        return None
+    tokens = []
+    for word in WORD_PATTERN.findall(value):
+        tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        tokens.append(word[-1])
+    return ' '.join(tokens)
+
+
+def register_search_functions(app: Flask) -> None:
+    """
+    為應用程式的 SQLite 引擎註冊 search_bigrams() 函數
+    
+    二元索引的觸發器呼叫此函數，因此寫入 movies 與 reviews 的連線都必須經由應用程式的引擎。
+    
+    Args:
+        app: 已初始化 Flask-SQLAlchemy 的應用程式實例
+    """
+    def register(dbapi_connection, connection_record) -> None:
+        dbapi_connection.create_function('search_bigrams', 1, search_bigrams, deterministic=True)
+    
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', register)
+
+
+def ensure_search_index(app: Flask) -> bool:
+    """
+    建立 FTS5 虛擬表格與同步觸發器（可重複執行）
+    
+    Args:
+        app: Flask 應用程式實例
+    
+    Returns:
+        全文檢索是否可用
+    """
+    available = False
+    if db.engine.dialect.name == 'sqlite':
+        try:
+            with db.engine.begin() as connection:
+                existing = set(connection.execute(text(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                )).scalars())
+                for statement in SEARCH_INDEX_DDL:
+                    connection.execute(text(statement))
+                
+                # 首次建立的索引以現有資料填入
+                for table, statements in SEARCH_INDEX_REBUILD.items():
+                    if table not in existing:
+                        for statement in statements:
+                            connection.execute(text(statement))
+            available = True
+        except OperationalError as e:
+            app.logger.error(f'無法建立全文檢索索引，改用 LIKE 搜尋: {str(e)}')
+    
+    app.extensions['search_index'] = available
+    return available
+
+
+def rebuild_search_index() -> None:
+    """依電影與評論資料表重建全文檢索索引"""
+    for statements in SEARCH_INDEX_REBUILD.values():
+        for statement in statements:
+            db.session.execute(text(statement))
+    db.session.commit()
+
+
+def _bigram_phrase(term: str) -> Optional[str]:
+    """
+    將一個詞轉為二元索引的片語
+    
+    詞尾不一定是原文的詞尾，因此最後一個詞不加詞尾單字；只剩單字時以前綴查詢比對。
+    
+    Args:
+        term: 以空白分隔的單一搜尋詞
+    
+    Returns:
+        FTS5 片語；詞中沒有文字或數字時回傳 None
+    """
+    words = WORD_PATTERN.findall(term)
+    if not words:
+        return None
+    tokens = []
+    for word in words[:-1]:
+        tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        tokens.append(word[-1])
+    last_word = words[-1]
+    if len(last_word) == 1:
+        return '"{}" *'.format(' '.join(tokens + [last_word]))
+    tokens.extend(last_word[i:i + 2] for i in range(len(last_word) - 1))
+    return '"{}"'.format(' '.join(tokens))
+
+
+def _build_match_query(query: str, table: str) -> Optional[Tuple[str, str]]:
+    """
+    將使用者輸入轉為 FTS5 MATCH 語法，並選擇查詢的索引
+    
+    每個以空白分隔的詞都視為一個片語（AND 結合）。所有詞都達到 trigram 最小長度時查 trigram 索引
+    （跳脫雙引號），否則查二元索引。
+    
+    Args:
+        query: 搜尋關鍵字
+        table: trigram 索引名稱（movies_fts 或 reviews_fts）
+    
+    Returns:
+        (索引名稱, MATCH 字串)；沒有可比對的詞時回傳 None
+    """
+    terms = query.split()
+    if not terms:
+        return None
+    if all(len(term) >= MIN_TERM_LENGTH for term in terms):
+        return table, ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+    
+    phrases = [phrase for phrase in map(_bigram_phrase, terms) if phrase]
+    if not phrases:
+        return None
+    return table.replace('_fts', '_bigram_fts'), ' '.join(phrases)
+
+
+def _search_index_enabled() -> bool:
+    """目前應用程式是否可使用全文檢索（未於本行程執行 ensure_search_index 時，檢查索引是否已建立）"""
+    available = current_app.extensions.get('search_index')
+    if available is None:
+        available = False
+        if db.engine.dialect.name == 'sqlite':
+            with db.engine.connect() as connection:
+                available = connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movies_bigram_fts'"
+                )).first() is not None
+        current_app.extensions['search_index'] = available
+    return available
+
+
+def search_movies(query: str, limit: int = 20) -> List[Movie]:
+    """
+    搜尋電影標題、簡介與標語
+    
+    Args:
+        query: 搜尋關鍵字
+        limit: 限制數量
+    
+    Returns:
+        電影列表，依 BM25 相關度排序（LIKE 回退時依平均評分排序）
+    """
+    match = _build_match_query(query, 'movies_fts')
+    if match is None or not _search_index_enabled():
+        return Movie.query.filter(
+            or_(
+                Movie.title.contains(query),
+                Movie.overview.contains(query),
+                Movie.tagline.contains(query)
+            )
+        ).order_by(desc(Movie.avg_rating)).limit(limit).all()
+    
+    table, match = match
+    ranked = text(
+        f'SELECT rowid AS movie_id, bm25({table}, {MOVIE_RANK_WEIGHTS}) AS score '
+        f'FROM {table} WHERE {table} MATCH :match '
+        'ORDER BY score LIMIT :limit'
+    ).bindparams(match=match, limit=limit)\
+     .columns(movie_id=db.Integer, score=db.Float)\
+     .subquery('ranked_movies')
+    
+    return Movie.query\
+        .join(ranked, ranked.c.movie_id == Movie.movie_id)\
+        .order_by(ranked.c.score)\
+        .all()
+
+
+def search_reviews(query: str, limit: int = 15) -> List[Review]:
+    """
+    搜尋評論內容
+    
+    Args:
+        query: 搜尋關鍵字
+        limit: 限制數量
+    
+    Returns:
+        評論列表，依 BM25 相關度排序（LIKE 回退時依建立時間排序）
+    """
+    match = _build_match_query(query, 'reviews_fts')
+    if match is None or not _search_index_enabled():
+        return Review.query.options(*Review.listing_options()).filter(
+            Review.comment_text.contains(query)
+        ).order_by(desc(Review.created_at)).limit(limit).all()
+    
+    table, match = match
+    ranked = text(
+        f'SELECT rowid AS review_id, bm25({table}) AS score '
+        f'FROM {table} WHERE {table} MATCH :match '
+        'ORDER BY score LIMIT :limit'
+    ).bindparams(match=match, limit=limit)\
+     .columns(review_id=db.Integer, score=db.Float)\
+     .subquery('ranked_reviews')
+    
+    return Review.query\
+        .options(*Review.listing_options())\
+        .join(ranked, ranked.c.review_id == Review.review_id)\
+        .order_by(ranked.c.score)\
+        .all()
+
+
+@search_index_cli.command('rebuild')
+def rebuild_command() -> None:
+    """重建電影與評論的全文檢索索引"""
+    if not ensure_search_index(current_app):
+        click.echo('目前資料庫不支援 FTS5 全文檢索')
+        return
+    
+    rebuild_search_index()
+    click.echo(f'全文檢索索引重建完成：{Movie.query.count()} 部電影、{Review.query.count()} 則評論')
@@ -0,0 +1,41 @@
+"""
+SQLite 連線設定 - 每條連線建立時套用 PRAGMA（WAL、同步模式、快取與鎖定等待）
+"""
+from typing import Callable, Dict
+from flask import Flask
+from sqlalchemy import event
+from app import db
+
+
+def _pragma_listener(pragmas: Dict[str, object]) -> Callable:
+    """建立 connect 事件處理函數，依序執行 PRAGMA"""
+    def set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def apply_sqlite_profile(app: Flask) -> None:
+    """
+    為應用程式的 SQLite 引擎註冊 SQLITE_PRAGMAS（其他資料庫不受影響）
+    
+    Args:
+        app: 已初始化 Flask-SQLAlchemy 的應用程式實例
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if not pragmas:
+        return
+    
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            engine_pragmas = pragmas
+            if engine.url.query.get('mode') == 'ro':
+                # 唯讀連線（例如讀取副本）無法切換日誌模式
+                engine_pragmas = {name: value for name, value in pragmas.items() if name != 'journal_mode'}
+            event.listen(engine, 'connect', _pragma_listener(engine_pragmas))
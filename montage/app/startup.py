@@ -0,0 +1,120 @@
+"""
+啟動效能 - 工廠各階段計時與啟動時間報告
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+# python -X importtime 的輸出格式：import time: 自身 | 累計 | 模組（縮排表示巢狀匯入）
+IMPORT_TIME_PATTERN = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+startup_cli = AppGroup('startup', help='啟動效能')
+
+
+class StartupTimer:
+    """記錄應用程式工廠各階段的耗時"""
+    
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+    
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        計時一個階段
+        
+        Args:
+            name: 階段名稱
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started_at))
+    
+    @property
+    def total(self) -> float:
+        """自建立計時器起的總耗時（秒）"""
+        return time.perf_counter() - self.started_at
+    
+    def as_dict(self) -> Dict[str, object]:
+        return {'phases': self.phases, 'total': self.total}
+
+
+def _parse_import_times(output: str) -> List[Tuple[str, int, int, int]]:
+    """
+    解析 -X importtime 的輸出
+    
+    Returns:
+        [(模組, 巢狀深度, 自身微秒, 累計微秒)]
+    """
+    rows = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, len(indent) // 2, int(self_us), int(cumulative_us)))
+    return rows
+
+
+# 子行程中執行：建立應用程式並輸出各階段耗時
+_PROBE = '''
+import json, sys, time
+started_at = time.perf_counter()
+from app import create_app
+imported_at = time.perf_counter()
+app = create_app()
+timings = app.extensions['startup'].as_dict()
+timings['import_app'] = imported_at - started_at
+sys.stdout.write(json.dumps(timings))
+sys.stdout.flush()
+'''
+
+
+@startup_cli.command('report')
+@click.option('--top', default=15, show_default=True, help='列出的模組數')
+def report_command(top: int) -> None:
+    """在新的行程中啟動應用程式，報告匯入與工廠各階段的耗時"""
+    project_dir = os.path.dirname(current_app.root_path)
+    started_at = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE],
+        cwd=project_dir,
+        capture_output=True,
+        text=True
+    )
+    wall_time = time.perf_counter() - started_at
+    if result.returncode != 0:
+        click.echo(result.stderr[-2000:], err=True)
+        raise click.ClickException('應用程式啟動失敗')
+    
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = _parse_import_times(result.stderr)
+    
+    click.echo(f'行程總耗時 {wall_time * 1000:.0f} ms（含直譯器啟動）')
+    click.echo(f'匯入 app 套件 {timings["import_app"] * 1000:7.1f} ms')
+    click.echo(f'create_app    {timings["total"] * 1000:7.1f} ms')
+    for name, seconds in timings['phases']:
+        click.echo(f'  {name:<24} {seconds * 1000:7.1f} ms')
+    
+    click.echo(f'\n匯入最久的套件（累計，前 {top} 名）：')
+    packages = {}
+    for module, _, _, cumulative_us in imports:
+        if '.' not in module and module not in ('app', 'config'):
+            packages[module] = max(packages.get(module, 0), cumulative_us)
+    for module, cumulative_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        click.echo(f'  {module:<40} {cumulative_us / 1000:7.1f} ms')
+    
+    click.echo(f'\n本專案模組（累計，前 {top} 名）：')
+    own_modules = sorted((row for row in imports if row[0].split('.')[0] in ('app', 'config')),
+                         key=lambda row: -row[3])
+    for module, _, _, cumulative_us in own_modules[:top]:
+        click.echo(f'  {module:<40} {cumulative_us / 1000:7.1f} ms')
@@ -0,0 +1,305 @@
+"""
+TMDb API 用戶端 - 連線池、併發抓取、速率限制與重試
+"""
+import email.utils
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+
+TMDB_IMAGE_BASE_URL = 'https://image.tmdb.org/t/p/w500'
+
+# 需要重試的 HTTP 狀態碼（速率限制與暫時性伺服器錯誤）
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    權杖桶速率限制器（執行緒安全）
+    
+    以固定速率補充權杖，允許短暫突發；收到 429 時可暫停整個桶，
+    讓所有工作執行緒一起等待 Retry-After 指定的時間。
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[int] = None) -> None:
+        """
+        初始化速率限制器
+        
+        Args:
+            rate: 每秒補充的權杖數（即每秒請求數上限）
+            capacity: 權杖桶容量（突發上限），預設等於 rate
+        """
+        self.rate = rate
+        self.capacity = capacity or max(int(rate), 1)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """取得一個權杖（不足時阻塞等待）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                    self._updated_at = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+    
+    def pause(self, seconds: float) -> None:
+        """
+        暫停發放權杖
+        
+        Args:
+            seconds: 暫停秒數
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 標頭（秒數或 HTTP 日期）"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class TMDbClient:
+    """
+    TMDb API 用戶端
+    
+    所有請求共用同一個 keep-alive 連線池並經過權杖桶限速；
+    429 與暫時性錯誤以指數退避重試，429 會依 Retry-After 暫停所有請求。
+    """
+    
+    def __init__(self, api_key: str, base_url: str = 'https://api.themoviedb.org/3',
+                 language: str = 'zh-TW', rate: float = 20.0, workers: int = 8,
+                 max_retries: int = 5, backoff: float = 0.5, timeout: float = 10.0) -> None:
+        """
+        初始化用戶端
+        
+        Args:
+            api_key: TMDb API Key
+            base_url: API 基礎網址（可指向本機測試伺服器）
+            language: 回應語系
+            rate: 每秒請求數上限
+            workers: 併發工作執行緒數
+            max_retries: 最大重試次數
+            backoff: 指數退避的基礎秒數
+            timeout: 單次請求逾時秒數
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.language = language
+        self.workers = max(workers, 1)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate)
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'TMDbClient':
+        """
+        依應用程式設定建立用戶端
+        
+        Args:
+            config: Flask 設定
+        
+        Returns:
+            TMDb 用戶端
+        """
+        return cls(
+            api_key=config.get('TMDB_API_KEY'),
+            base_url=config.get('TMDB_BASE_URL') or 'https://api.themoviedb.org/3',
+            rate=config.get('TMDB_RATE_LIMIT', 20.0),
+            workers=config.get('TMDB_WORKERS', 8),
+            max_retries=config.get('TMDB_MAX_RETRIES', 5)
+        )
+    
+    def close(self) -> None:
+        """關閉連線池"""
+        self.session.close()
+    
+    def __enter__(self) -> 'TMDbClient':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def get(self, path: str, **params) -> Optional[Dict[str, Any]]:
+        """
+        發送 GET 請求（含限速與重試）
+        
+        Args:
+            path: API 路徑，例如 /movie/550
+            **params: 查詢參數
+        
+        Returns:
+            JSON 回應；資源不存在或重試用盡時回傳 None
+        """
+        params = {'api_key': self.api_key, 'language': self.language, **params}
+        url = f'{self.base_url}{path}'
+        
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                delay = self.backoff * (2 ** attempt)
+                logging.warning(f'TMDb 請求失敗 {path}: {e}（{delay:.1f} 秒後重試）')
+            else:
+                if response.status_code == 404:
+                    return None
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+                
+                delay = self.backoff * (2 ** attempt)
+                if response.status_code == 429:
+                    retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                    if retry_after is not None:
+                        delay = retry_after
+                    self.limiter.pause(delay)
+                logging.warning(f'TMDb 回應 {response.status_code} {path}（{delay:.1f} 秒後重試）')
+            
+            if attempt < self.max_retries:
+                time.sleep(delay)
+        
+        logging.error(f'TMDb 請求重試用盡: {path}')
+        return None
+    
+    def map(self, fetch: Callable[[Any], Any], items: Iterable[Any],
+            progress: Optional[Callable[[int, int], None]] = None) -> Iterator[Tuple[Any, Any]]:
+        """
+        以工作執行緒池併發處理項目
+        
+        Args:
+            fetch: 處理單一項目的函數
+            items: 項目
+            progress: 進度回呼 (已完成數, 總數)
+        
+        Yields:
+            (項目, 結果)，依完成順序；單一項目失敗時結果為 None
+        """
+        items = list(items)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(fetch, item): item for item in items}
+            for done, future in enumerate(as_completed(futures), start=1):
+                item = futures[future]
+                try:
+                    result = future.result()
+                except (requests.RequestException, ValueError) as e:
+                    logging.error(f'TMDb 資料處理失敗 {item}: {e}')
+                    result = None
+                if progress:
+                    progress(done, len(items))
+                yield item, result
+    
+    def get_movie_list(self, category: str = 'popular', total_needed: int = 500,
+                       progress: Optional[Callable[[int, int], None]] = None) -> List[Dict[str, Any]]:
+        """
+        併發取得電影列表的多個分頁
+        
+        Args:
+            category: 電影類別 ('popular', 'top_rated', 'now_playing', 'upcoming')
+            total_needed: 需要的電影數量
+            progress: 進度回呼
+        
+        Returns:
+            電影列表（依分頁順序）
+        """
+        max_pages = 500  # TMDb 列表最多 500 頁，每頁 20 部電影
+        pages = range(1, min((total_needed + 19) // 20, max_pages) + 1)
+        results = dict(self.map(lambda page: self.get(f'/movie/{category}', page=page), pages, progress))
+        
+        movies = []
+        for page in pages:
+            movies.extend((results.get(page) or {}).get('results') or [])
+        return movies[:total_needed]
+    
+    def get_movie_details(self, tmdb_ids: Iterable[int],
+                          progress: Optional[Callable[[int, int], None]] = None
+                          ) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+        """
+        併發取得多部電影的詳細資訊
+        
+        Args:
+            tmdb_ids: TMDb 電影 ID
+            progress: 進度回呼
+        
+        Yields:
+            (TMDb ID, 詳細資訊)，依完成順序；取得失敗時詳細資訊為 None
+        """
+        return self.map(lambda tmdb_id: self.get(f'/movie/{tmdb_id}'), tmdb_ids, progress)
+
+
+def movie_fields(movie_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    將 TMDb 電影資料轉為 Movie 欄位
+    
+    Args:
+        movie_data: TMDb 列表或詳細資訊
+    
+    Returns:
+        Movie 欄位字典
+    """
+    poster_path = movie_data.get('poster_path')
+    release_date = movie_data.get('release_date') or ''
+    genres = movie_data.get('genres') or []
+    genre_ids = [genre['id'] for genre in genres] if genres else movie_data.get('genre_ids') or []
+    
+    return {
+        'title': movie_data.get('title') or '未知電影',
+        'release_year': int(release_date[:4]) if len(release_date) >= 4 and release_date[:4].isdigit() else None,
+        'poster_url': f'{TMDB_IMAGE_BASE_URL}{poster_path}' if poster_path else '',
+        'genre_ids': ','.join(str(genre_id) for genre_id in genre_ids),
+        'runtime': movie_data.get('runtime'),
+        'tagline': movie_data.get('tagline') or '',
+        'overview': movie_data.get('overview') or '',
+        'vote_average': float(movie_data.get('vote_average') or 0.0),
+        'tmdb_id': movie_data['id']
+    }
+
+
+class ConsoleProgress:
+    """在終端機以單行更新的方式顯示進度（最多每隔 interval 秒更新一次）"""
+    
+    def __init__(self, label: str, interval: float = 0.5) -> None:
+        self.label = label
+        self.interval = interval
+        self.started_at = time.monotonic()
+        self._printed_at = 0.0
+    
+    def __call__(self, done: int, total: int) -> None:
+        now = time.monotonic()
+        if done < total and now - self._printed_at < self.interval:
+            return
+        self._printed_at = now
+        elapsed = now - self.started_at
+        rate = done / elapsed if elapsed else 0.0
+        end = '\n' if done == total else ''
+        print(f'\r{self.label}: {done}/{total}（{rate:.1f} 筆/秒）', end=end, flush=True)
@@ -0,0 +1,181 @@
+"""
+TMDb 增量同步 - 依變更清單（changes feed）更新本站電影資料，可中斷後續跑
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app import db
+from app.models import Movie, TMDbSyncRun
+from app.movie_ingest import upsert_movies
+from app.tmdb import TMDbClient, movie_fields
+
+# TMDb changes feed 單次查詢的最長區間
+MAX_WINDOW_DAYS = 14
+
+# 首次同步（尚無檢查點）回溯的天數
+INITIAL_WINDOW_DAYS = 1
+
+tmdb_cli = AppGroup('tmdb', help='TMDb 資料同步')
+
+
+def _next_window(now: datetime) -> Tuple[datetime, datetime]:
+    """
+    依上次完成的同步計算本次變更區間
+    
+    Args:
+        now: 目前時間（UTC）
+    
+    Returns:
+        (區間起點, 區間終點)；落後超過上限時分次追上
+    """
+    last_run = TMDbSyncRun.query\
+        .filter_by(status=TMDbSyncRun.STATUS_COMPLETED)\
+        .order_by(TMDbSyncRun.window_end.desc())\
+        .first()
+    window_start = last_run.window_end if last_run else now - timedelta(days=INITIAL_WINDOW_DAYS)
+    return window_start, min(now, window_start + timedelta(days=MAX_WINDOW_DAYS))
+
+
+def _resumable_run() -> Optional[TMDbSyncRun]:
+    """取得中斷或失敗、需要續跑的同步紀錄"""
+    return TMDbSyncRun.query\
+        .filter(TMDbSyncRun.status.in_([TMDbSyncRun.STATUS_RUNNING, TMDbSyncRun.STATUS_FAILED]))\
+        .order_by(TMDbSyncRun.run_id.desc())\
+        .first()
+
+
+def _apply_changes(client: TMDbClient, tmdb_ids: List[int], run: TMDbSyncRun) -> None:
+    """
+    以一批變更的 TMDb ID 更新本站電影（依 tmdb_id 批次 upsert，由呼叫端提交）
+    
+    Args:
+        client: TMDb 用戶端
+        tmdb_ids: 本批變更的 TMDb ID
+        run: 同步紀錄（累加統計）
+    """
+    known_tmdb_ids = {
+        tmdb_id for (tmdb_id,) in db.session.query(Movie.tmdb_id).filter(Movie.tmdb_id.in_(tmdb_ids))
+    } if tmdb_ids else set()
+    run.skipped_count += len(tmdb_ids) - len(known_tmdb_ids)
+    
+    rows = []
+    for tmdb_id, details in client.get_movie_details(known_tmdb_ids):
+        if details:
+            rows.append(movie_fields(details))
+        else:
+            run.failed_count += 1
+    
+    counts = upsert_movies(rows, known_tmdb_ids=known_tmdb_ids, commit=False)
+    run.updated_count += counts['updated']
+    run.unchanged_count += counts['skipped']
+
+
+def sync_tmdb_changes(client: Optional[TMDbClient] = None) -> Optional[TMDbSyncRun]:
+    """
+    同步 TMDb 變更清單中、已收錄於本站的電影
+    
+    每個變更清單分頁為一批，電影更新與檢查點（last_page）在同一交易提交；
+    若上次同步中斷或失敗，沿用其區間並從下一個分頁續跑。
+    
+    Args:
+        client: TMDb 用戶端（預設依應用程式設定建立）
+    
+    Returns:
+        本次同步紀錄；未設定 API Key 時回傳 None
+    """
+    if not current_app.config.get('TMDB_API_KEY'):
+        logging.warning('未設定 TMDB_API_KEY，略過 TMDb 同步')
+        return None
+    
+    run = _resumable_run()
+    if run is None:
+        window_start, window_end = _next_window(datetime.utcnow())
+        run = TMDbSyncRun(window_start=window_start, window_end=window_end)
+        db.session.add(run)
+    else:
+        run.status = TMDbSyncRun.STATUS_RUNNING
+        run.error = None
+    db.session.commit()
+    
+    run_id = run.run_id
+    base_duration = run.duration_seconds or 0.0
+    started_at = time.monotonic()
+    own_client = client is None
+    client = client or TMDbClient.from_config(current_app.config)
+    
+    try:
+        page = run.last_page + 1
+        while run.total_pages is None or page <= run.total_pages:
+            data = client.get(
+                '/movie/changes',
+                start_date=run.window_start.strftime('%Y-%m-%d'),
+                end_date=run.window_end.strftime('%Y-%m-%d'),
+                page=page
+            )
+            if data is None:
+                raise RuntimeError(f'無法取得 TMDb 變更清單第 {page} 頁')
+            
+            tmdb_ids = list(dict.fromkeys(
+                item['id'] for item in data.get('results') or [] if not item.get('adult')
+            ))
+            run.total_pages = data.get('total_pages') or 0
+            run.changed_count += len(tmdb_ids)
+            _apply_changes(client, tmdb_ids, run)
+            
+            run.last_page = page
+            run.duration_seconds = base_duration + time.monotonic() - started_at
+            db.session.commit()
+            page += 1
+        
+        run.status = TMDbSyncRun.STATUS_COMPLETED
+        run.finished_at = datetime.utcnow()
+    except Exception as e:
+        db.session.rollback()
+        run = db.session.get(TMDbSyncRun, run_id)
+        run.status = TMDbSyncRun.STATUS_FAILED
+        run.error = str(e)
+        logging.error(f'TMDb 同步 #{run_id} 失敗（已提交至第 {run.last_page} 頁）: {str(e)}')
+    finally:
+        if own_client:
+            client.close()
+    
+    run.duration_seconds = base_duration + time.monotonic() - started_at
+    db.session.commit()
+    return run
+
+
+@tmdb_cli.command('sync')
+def sync_command() -> None:
+    """同步 TMDb 變更清單中、已收錄於本站的電影"""
+    run = sync_tmdb_changes()
+    if run is None:
+        click.echo('未設定 TMDB_API_KEY')
+        return
+    
+    click.echo(
+        f'同步 #{run.run_id}（{run.window_start:%Y-%m-%d} ~ {run.window_end:%Y-%m-%d}）{run.status}：'
+        f'第 {run.last_page}/{run.total_pages} 頁'
+    )
+    click.echo(
+        f'變更 {run.changed_count}、更新 {run.updated_count}、未變動 {run.unchanged_count}、'
+        f'略過 {run.skipped_count}、失敗 {run.failed_count}，耗時 {run.duration_seconds:.1f} 秒'
+    )
+    if run.error:
+        click.echo(f'錯誤：{run.error}')
+
+
+@tmdb_cli.command('runs')
+@click.option('--limit', default=10, show_default=True, help='顯示筆數')
+def runs_command(limit: int) -> None:
+    """列出最近的 TMDb 同步紀錄"""
+    for run in TMDbSyncRun.query.order_by(TMDbSyncRun.run_id.desc()).limit(limit):
+        click.echo(
+            f'#{run.run_id} {run.started_at:%Y-%m-%d %H:%M} {run.status:<9} '
+            f'{run.window_start:%Y-%m-%d}~{run.window_end:%Y-%m-%d} '
+            f'頁 {run.last_page}/{run.total_pages or 0} 更新 {run.updated_count} '
+            f'失敗 {run.failed_count} {run.duration_seconds:.1f}s'
+        )
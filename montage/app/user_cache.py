@@ -0,0 +1,125 @@
+"""
+登入身分快取 - load_user 使用的精簡使用者資料（行程內 LRU + TTL）
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Set
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.db_routing import primary_reads_since
+from app.models import User
+
+
+class UserIdentity(UserMixin):
+    """
+    已登入使用者的精簡身分（current_user）
+    
+    只包含頁面與權限判斷需要的欄位；需要完整資料時以 user_id 查詢 User。
+    """
+    
+    __slots__ = ('user_id', 'display_name', 'is_active', 'email_confirmed')
+    
+    def __init__(self, user_id: int, display_name: str, is_active: bool, email_confirmed: bool) -> None:
+        self.user_id = user_id
+        self.display_name = display_name
+        self.is_active = is_active
+        self.email_confirmed = email_confirmed
+    
+    def get_id(self) -> str:
+        """Flask-Login 需要的方法"""
+        return str(self.user_id)
+    
+    def __repr__(self) -> str:
+        return f'<UserIdentity {self.user_id}>'
+
+
+_lock = threading.Lock()
+_generation = 0
+_invalidated_at: Optional[float] = None  # 最近一次失效的時間（time.monotonic()）
+_identities: OrderedDict = OrderedDict()  # {user_id: (到期時間, UserIdentity)}
+
+
+def invalidate_users(user_ids: Iterable[int]) -> None:
+    """
+    使指定使用者的身分快取失效
+    
+    Args:
+        user_ids: 使用者 ID
+    """
+    global _generation, _invalidated_at
+    with _lock:
+        _generation += 1
+        _invalidated_at = time.monotonic()
+        for user_id in user_ids:
+            _identities.pop(user_id, None)
+
+
+def load_identity(user_id: int) -> Optional[UserIdentity]:
+    """
+    取得使用者身分（快取未命中時以單一欄位投影查詢）
+    
+    Args:
+        user_id: 使用者 ID
+    
+    Returns:
+        使用者身分；使用者不存在時回傳 None
+    """
+    with _lock:
+        entry = _identities.get(user_id)
+        generation = _generation
+        invalidated_at = _invalidated_at
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                _identities.move_to_end(user_id)
+                return entry[1]
+            del _identities[user_id]
+    
+    with primary_reads_since(invalidated_at):
+        row = db.session.query(User.user_id, User.display_name, User.is_active, User.email_confirmed)\
+            .filter(User.user_id == user_id)\
+            .first()
+    if row is None:
+        return None
+    
+    identity = UserIdentity(*row)
+    config = current_app.config
+    with _lock:
+        # 查詢期間若有失效則不寫入，避免以舊資料覆蓋
+        if generation == _generation:
+            _identities[user_id] = (time.monotonic() + config.get('USER_CACHE_SECONDS', 60), identity)
+            _identities.move_to_end(user_id)
+            while len(_identities) > config.get('USER_CACHE_MAX_ENTRIES', 10000):
+                _identities.popitem(last=False)
+    return identity
+
+
+def _pending_user_ids(session_: Session) -> Set[int]:
+    """取得交易中有異動的使用者 ID"""
+    return session_.info.setdefault('user_cache_ids', set())
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target: User) -> None:
+    """記錄異動的使用者（個人資料、後台編輯、密碼重設等），待交易提交後使快取失效"""
+    session_ = Session.object_session(target)
+    if session_ is not None:
+        _pending_user_ids(session_).add(target.user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session_: Session) -> None:
+    """交易提交後使異動使用者的身分快取失效"""
+    user_ids = session_.info.pop('user_cache_ids', None)
+    if user_ids:
+        invalidate_users(user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session_: Session) -> None:
+    """交易回滾時捨棄待失效紀錄"""
+    session_.info.pop('user_cache_ids', None)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登入尖峰基準測試 - 大量登入同時進行時，一般頁面的回應延遲
+
+以暫存的 SQLite 資料庫啟動應用程式，建立測試帳號與電影後，
+同時送出大量登入請求並持續量測電影列表頁的延遲，
+比較「無登入」與「登入尖峰」兩種情況。
+
+用法（以 --workers 比較不同的雜湊併發上限，例如 2 與 32）：
+    python benchmark_login_storm.py --logins 200 --login-threads 12 --workers 2 --rounds 12
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+
+def parse_args() -> argparse.Namespace:
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(description='登入尖峰下的頁面延遲基準測試')
+    parser.add_argument('--logins', type=int, default=200, help='登入請求總數')
+    parser.add_argument('--login-threads', type=int, default=12, help='同時登入的執行緒數（不超過資料庫連線池大小）')
+    parser.add_argument('--workers', type=int, default=2, help='PASSWORD_HASH_WORKERS（bcrypt 同時計算數）')
+    parser.add_argument('--rounds', type=int, default=12, help='BCRYPT_ROUNDS')
+    parser.add_argument('--page-requests', type=int, default=50, help='每個情境量測的頁面請求數')
+    return parser.parse_args()
+
+
+def measure_pages(client, count: int) -> List[float]:
+    """依序請求電影列表頁，回傳各次延遲（毫秒）"""
+    latencies = []
+    for _ in range(count):
+        started_at = time.perf_counter()
+        response = client.get('/movies')
+        latencies.append((time.perf_counter() - started_at) * 1000)
+        assert response.status_code == 200, response.status_code
+    return latencies
+
+
+def summarize(label: str, latencies: List[float]) -> None:
+    """輸出延遲統計"""
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f'{label:<12} 中位數 {statistics.median(latencies):7.1f} ms   p95 {p95:7.1f} ms   最大 {latencies[-1]:7.1f} ms')
+
+
+def main() -> None:
+    args = parse_args()
+    
+    database = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    os.environ['BCRYPT_ROUNDS'] = str(args.rounds)
+    os.environ['PASSWORD_HASH_WORKERS'] = str(args.workers)
+    
+    from app import create_app, db
+    from app.models import Movie, User
+    from app.schema import init_schema
+    
+    app = create_app('development', config_overrides={
+        'WTF_CSRF_ENABLED': False,
+        'PASSWORD_HASH_MAX_PENDING': args.logins,
+        'SCHEDULER_ENABLED': False,
+        'EMAIL_OUTBOX_WORKER': False
+    })
+    
+    with app.app_context():
+        init_schema(app)
+        user = User('storm@example.com', 'storm-password', 'storm')
+        user.email_confirmed = True
+        db.session.add(user)
+        db.session.add_all(Movie(f'電影 {i}', 2000 + i % 25) for i in range(200))
+        db.session.commit()
+    
+    print(f'bcrypt 成本 {args.rounds}、雜湊執行緒 {args.workers}、登入 {args.logins} 次（{args.login_threads} 執行緒）')
+    summarize('無登入', measure_pages(app.test_client(), args.page_requests))
+    
+    done = threading.Event()
+    
+    def login(_) -> float:
+        client = app.test_client()
+        started_at = time.perf_counter()
+        client.post('/auth/login', data={'email': 'storm@example.com', 'password': 'storm-password'})
+        return (time.perf_counter() - started_at) * 1000
+    
+    def storm() -> List[float]:
+        with ThreadPoolExecutor(max_workers=args.login_threads) as executor:
+            results = list(executor.map(login, range(args.logins)))
+        done.set()
+        return results
+    
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        storm_future = runner.submit(storm)
+        time.sleep(0.2)  # 讓登入請求先佔滿執行緒
+        page_latencies = measure_pages(app.test_client(), args.page_requests)
+        login_latencies = storm_future.result()
+    elapsed = time.perf_counter() - started_at
+    
+    summarize('登入尖峰', page_latencies)
+    summarize('登入請求', login_latencies)
+    print(f'登入吞吐量 {args.logins / elapsed:.1f} 次/秒')
+    if not done.is_set():
+        print('⚠️ 頁面量測結束時登入尚未全部完成', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
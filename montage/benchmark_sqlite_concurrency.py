@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 併發基準測試 - 評論寫入進行時，電影列表頁的讀取延遲
+
+分別以 SQLite 預設值（rollback journal）與 SQLITE_PRAGMAS（WAL 等）建立暫存資料庫，
+先量測無寫入時 /movies 的延遲，再由多個已登入使用者的行程持續送出 /movie/<id>/review，
+同時由其他行程量測 /movies 的延遲與寫入失敗（database is locked）次數。
+讀寫各自在獨立行程中執行，與多個 worker 共用同一個資料庫檔案的部署方式相同。
+
+寫入預設以固定速率進行，兩種情境的寫入量相同，讀取延遲的差異來自鎖定而非 CPU 競爭。
+
+用法：
+    python benchmark_sqlite_concurrency.py --writers 4 --write-rate 10 --readers 2 --duration 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+
+def parse_args() -> argparse.Namespace:
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(description='評論寫入下的頁面讀取延遲基準測試')
+    parser.add_argument('--movies', type=int, default=500, help='電影數量')
+    parser.add_argument('--writers', type=int, default=4, help='同時寫入評論的行程數')
+    parser.add_argument('--readers', type=int, default=2, help='同時讀取 /movies 的行程數')
+    parser.add_argument('--write-rate', type=float, default=10, help='每個寫入行程每秒的評論數上限（0 表示不限制）')
+    parser.add_argument('--duration', type=float, default=10, help='併發情境的秒數')
+    parser.add_argument('--page-requests', type=int, default=50, help='無寫入情境的頁面請求數')
+    return parser.parse_args()
+
+
+def summarize(label: str, latencies: List[float]) -> None:
+    """輸出延遲統計"""
+    if not latencies:
+        print(f'{label:<16} 沒有完成的請求')
+        return
+    latencies = sorted(latencies)
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(f'{label:<16} {len(latencies):5d} 次   中位數 {statistics.median(latencies):7.1f} ms   '
+          f'p95 {p95:7.1f} ms   最大 {latencies[-1]:7.1f} ms')
+
+
+def timed_get(client, path: str) -> float:
+    """送出 GET 請求，回傳延遲（毫秒）"""
+    started_at = time.perf_counter()
+    response = client.get(path)
+    assert response.status_code == 200, response.status_code
+    return (time.perf_counter() - started_at) * 1000
+
+
+def make_app(database: str, pragmas: Dict[str, object]):
+    """以暫存資料庫建立應用程式（每個行程各自建立）"""
+    from app import create_app
+    
+    return create_app('development', config_overrides={
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+        'SQLITE_PRAGMAS': pragmas,
+        'WTF_CSRF_ENABLED': False,
+        'BCRYPT_ROUNDS': 4,
+        'PAGE_CACHE_ENABLED': False,
+        'SCHEDULER_ENABLED': False,
+        'EMAIL_OUTBOX_WORKER': False
+    })
+
+
+def writer_process(database: str, pragmas: Dict[str, object], writer: int, args: argparse.Namespace,
+                   ready, start, stop, results) -> None:
+    """以一位使用者的身分依固定速率新增或更新評論"""
+    app = make_app(database, pragmas)
+    client = app.test_client()
+    client.post('/auth/login', data={'email': f'writer{writer}@example.com', 'password': 'writer-password'})
+    written = failed = 0
+    movie_id = writer + 1
+    interval = 1 / args.write_rate if args.write_rate else 0
+    ready.release()
+    start.wait()
+    next_write_at = time.perf_counter()
+    while not stop.is_set():
+        next_write_at += interval
+        try:
+            response = client.post(f'/movie/{movie_id}/review', data={'rating': str(movie_id % 5 + 1), 'comment_text': '基準測試'})
+            if response.status_code == 302:
+                written += 1
+            else:
+                failed += 1
+        except Exception:
+            # 開發模式會把 OperationalError（database is locked）直接拋出
+            failed += 1
+        movie_id = (movie_id + args.writers - 1) % args.movies + 1
+        time.sleep(max(next_write_at - time.perf_counter(), 0))
+    results.put(('write', written, failed))
+
+
+def reader_process(database: str, pragmas: Dict[str, object], ready, start, stop, results) -> None:
+    """持續讀取電影列表頁並記錄延遲"""
+    app = make_app(database, pragmas)
+    client = app.test_client()
+    timed_get(client, '/movies')
+    latencies = []
+    ready.release()
+    start.wait()
+    while not stop.is_set():
+        latencies.append(timed_get(client, '/movies'))
+    results.put(('read', latencies, 0))
+
+
+def run_scenario(label: str, pragmas: Dict[str, object], args: argparse.Namespace) -> None:
+    """
+    以指定的 PRAGMA 設定執行一次基準測試
+    
+    Args:
+        label: 情境名稱
+        pragmas: SQLITE_PRAGMAS（{} 表示 SQLite 預設值）
+        args: 命令列參數
+    """
+    from app import db
+    from app.models import Movie, User
+    from app.schema import init_schema
+    
+    database = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    app = make_app(database, pragmas)
+    with app.app_context():
+        init_schema(app)
+        for i in range(args.writers):
+            user = User(f'writer{i}@example.com', 'writer-password', f'writer{i}')
+            user.email_confirmed = True
+            db.session.add(user)
+        db.session.add_all(Movie(f'電影 {i}', 2000 + i % 25) for i in range(args.movies))
+        db.session.commit()
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+    
+    print(f'\n== {label}（journal_mode={journal_mode}）')
+    client = app.test_client()
+    timed_get(client, '/movies')
+    summarize('無寫入', [timed_get(client, '/movies') for _ in range(args.page_requests)])
+    
+    context = multiprocessing.get_context('spawn')
+    ready = context.Semaphore(0)
+    start = context.Event()
+    stop = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(target=writer_process,
+                        args=(database, pragmas, i, args, ready, start, stop, results))
+        for i in range(args.writers)
+    ] + [
+        context.Process(target=reader_process, args=(database, pragmas, ready, start, stop, results))
+        for _ in range(args.readers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+    
+    start.set()
+    time.sleep(args.duration)
+    stop.set()
+    
+    latencies: List[float] = []
+    written = failed = 0
+    for _ in processes:
+        kind, value, errors = results.get()
+        if kind == 'read':
+            latencies.extend(value)
+        else:
+            written += value
+            failed += errors
+    for process in processes:
+        process.join()
+    
+    summarize('寫入進行中', latencies)
+    print(f'評論寫入 {written / args.duration:.1f} 次/秒，失敗 {failed} 次')
+
+
+def main() -> None:
+    args = parse_args()
+    
+    from config import Config
+    
+    print(f'電影 {args.movies} 部、寫入 {args.writers} 行程（每行程 {args.write_rate:g} 次/秒）、讀取 {args.readers} 行程、每個情境 {args.duration:.0f} 秒')
+    run_scenario('SQLite 預設值', {}, args)
+    run_scenario('SQLITE_PRAGMAS', Config.SQLITE_PRAGMAS, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,16 +18,56 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
+        'pool_pre_ping': not SQLALCHEMY_DATABASE_URI.startswith('sqlite'),  # 本機檔案不會斷線，不需借出前 ping
         'connect_args': {'check_same_thread': False}
     }
     
+    # 讀取副本（選用，以逗號分隔多個連線字串；SQLite 可用 sqlite:///file:replica.db?mode=ro&uri=true）
+    DATABASE_REPLICA_URLS = [url.strip() for url in (os.environ.get('DATABASE_REPLICA_URLS') or '').split(',') if url.strip()]
+    SQLALCHEMY_BINDS = {f'replica_{i}': url for i, url in enumerate(DATABASE_REPLICA_URLS)}
+    READ_REPLICA_ENDPOINTS = {  # 只讀取資料的路由，由讀取副本提供
+        'main.index',
+        'main.movies',
+        'main.ranking',
+        'main.search',
+        'main.get_movie_rating',
+        'main.get_movies_ratings',
+        'admin.index'
+    }
+    READ_REPLICA_STICKY_SECONDS = 10  # 使用者寫入後改讀主資料庫的秒數（涵蓋副本延遲）
+    
+    # SQLite 效能設定（每條連線建立時依序套用，設為 {} 則維持 SQLite 預設值）
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5000),  # 遇到寫入鎖時等待的毫秒數，而非立即回報 database is locked
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL',  # 讀取不會被寫入阻擋
+        'synchronous': 'NORMAL',  # WAL 模式下只在檢查點同步，應用程式當機不會遺失資料
+        'cache_size': -64000,  # 每條連線約 64 MB 頁面快取（負值單位為 KiB）
+        'mmap_size': 256 * 1024 * 1024,  # 以記憶體映射讀取資料庫檔案
+        'temp_store': 'MEMORY'  # 排序與暫存表格放在記憶體
+    }
+    
+    # 啟動設定（資料庫結構由 flask schema init 建立；ADMIN_ENABLED=False 時不載入 Flask-Admin）
+    AUTO_CREATE_SCHEMA = os.environ.get('AUTO_CREATE_SCHEMA', 'False').lower() == 'true'  # 啟動時建立缺少的表格與索引
+    ADMIN_ENABLED = os.environ.get('ADMIN_ENABLED', 'True').lower() == 'true'
+    JINJA_BYTECODE_CACHE = True  # 模板編譯結果寫入檔案快取
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')  # 預設為 instance/jinja_cache
+    
     # Session 設定
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'False').lower() == 'true'
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     REMEMBER_COOKIE_DURATION = timedelta(days=30)
+    USER_CACHE_SECONDS = 60  # 登入身分（load_user）的行程內快取秒數，其他 worker 的異動依此過期
+    USER_CACHE_MAX_ENTRIES = 10000
+    EMAIL_CONFIRM_TOKEN_MINUTES = 48 * 60  # 電子郵件確認連結的有效期限
+    PASSWORD_RESET_TOKEN_MINUTES = 30  # 密碼重設連結的有效期限
+    
+    # 密碼雜湊（bcrypt 在專用執行緒池執行，調整成本後於登入時自動重新雜湊）
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS') or 12)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)  # 同時計算的雜湊數
+    PASSWORD_HASH_MAX_PENDING = 32  # 排隊等待的上限，超過時請使用者稍後再試
+    PASSWORD_HASH_QUEUE_TIMEOUT = 10  # 排隊等待秒數
     
     # 郵件設定 (Gmail SMTP)
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
@@ -37,9 +77,41 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
     
+    # 寄件匣（請求只寫入 email_outbox，由背景寄件程序批次寄出）
+    EMAIL_OUTBOX_WORKER = os.environ.get('EMAIL_OUTBOX_WORKER', 'True').lower() == 'true'  # 是否在應用程式內啟動寄件程序
+    EMAIL_OUTBOX_POLL_SECONDS = 5  # 沒有新信件時檢查到期重試的間隔
+    EMAIL_OUTBOX_BATCH_SIZE = 50  # 每批（同一 SMTP 連線）寄出的信件數
+    EMAIL_OUTBOX_MAX_ATTEMPTS = 6  # 超過後轉為 dead，不再自動重寄
+    EMAIL_OUTBOX_BACKOFF_SECONDS = 30  # 重試間隔 30、60、120 秒…
+    EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = 3600
+    EMAIL_OUTBOX_IDLE_SECONDS = 30  # SMTP 連線閒置多久後關閉
+    EMAIL_OUTBOX_LEASE_SECONDS = 300  # 認領逾期未完成的信件可再被認領
+    EMAIL_OUTBOX_KEEP_DAYS = 7  # 已寄出與 dead 信件的保留天數（內容在寄出或轉為 dead 時即清除）
+    
     # TMDb API 設定
     TMDB_API_KEY = os.environ.get('TMDB_API_KEY')
     TMDB_BASE_URL = os.environ.get('TMDB_BASE_URL') or 'https://api.themoviedb.org/3'
+    TMDB_RATE_LIMIT = float(os.environ.get('TMDB_RATE_LIMIT') or 20)  # 每秒請求數上限
+    TMDB_WORKERS = int(os.environ.get('TMDB_WORKERS') or 8)  # 併發抓取的工作執行緒數
+    TMDB_MAX_RETRIES = 5
+    TMDB_SYNC_HOUR = 3  # 每日 03:30 依 TMDb 變更清單同步電影資料
+    MOVIE_UPSERT_BATCH_SIZE = 1000  # 電影批次 upsert 每批筆數
+    
+    # 海報檢查設定
+    POSTER_CHECK_WORKERS = 16  # 併發檢查的工作執行緒數
+    POSTER_CHECK_PER_HOST = 4  # 同一主機的併發上限
+    POSTER_CHECK_TIMEOUT = 10  # 單次請求逾時秒數
+    POSTER_CHECK_MAX_AGE_HOURS = 72  # 檢查結果在此時間內有效，重新執行時略過
+    
+    # 本機海報鏡像（背景下載 TMDb 各尺寸海報，預設關閉）
+    POSTER_MIRROR_ENABLED = os.environ.get('POSTER_MIRROR_ENABLED', 'False').lower() == 'true'
+    POSTER_MIRROR_DIR = os.environ.get('POSTER_MIRROR_DIR')  # 預設為 instance/posters
+    POSTER_MIRROR_WORKERS = 8
+    POSTER_MIRROR_BATCH_SIZE = 200  # 每次排程處理的海報數
+    POSTER_MIRROR_MAX_BYTES = 5 * 1024 * 1024
+    POSTER_MIRROR_RETRY_HOURS = 24  # 下載失敗的海報在此時間內不再重試
+    POSTER_MAP_CACHE_SECONDS = 300  # 海報對照表的行程內快取秒數
+    POSTER_MAP_CACHE_MAX_ENTRIES = 4096  # 海報對照表快取的網址數上限（超過時淘汰最久未使用者）
     
     # 日誌設定
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'ERROR'
@@ -52,12 +124,32 @@ class Config:
     # 分頁設定
     MOVIES_PER_PAGE = 20
     REVIEWS_PER_PAGE = 10
+    PAGINATION_OFFSET_PAGES = 5  # 前幾頁以頁碼存取，之後改用游標（keyset）
+    FACET_CACHE_SECONDS = 300  # 篩選面板（含電影列表總數）快取秒數
+    FACET_CACHE_MAX_ENTRIES = 256  # 篩選組合的快取上限（超過時淘汰最久未使用者）
+    
+    # 匿名訪客整頁快取（預設關閉）
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'False').lower() == 'true'
+    PAGE_CACHE_TIMEOUTS = {
+        'main.index': 30,
+        'main.ranking': 60,
+        'main.movie_detail': 15
+    }
+    PAGE_CACHE_MAX_ENTRIES = 1000
+    
+    # 排程器（多個 worker 同時啟動時，由資料庫租約選出唯一執行工作的行程）
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'True').lower() == 'true'  # 是否在應用程式內啟動排程器
+    SCHEDULER_HEARTBEAT_SECONDS = 30  # 領導者租約的續約間隔
+    SCHEDULER_LEADER_TTL_SECONDS = 90  # 領導者失聯多久後由其他行程接手
+    SCHEDULER_JOB_LOCK_SECONDS = 600  # 工作執行中租約（執行期間由心跳續約）
     
     # 業務邏輯設定
     MAX_REVIEW_LENGTH = 500
     HERO_CAROUSEL_COUNT = 5
     HERO_AUTOPLAY_INTERVAL = 5000  # 5 秒
     RANKING_UPDATE_HOUR = 2  # 每日 02:00 更新排行榜
+    RANKING_SNAPSHOT_SIZE = 50  # 每種排行榜快照保留的名次數
+    RATINGS_BATCH_MAX_IDS = 200  # 批次評分 API 單次最多查詢的電影數
 
 
 class DevelopmentConfig(Config):
@@ -76,6 +168,8 @@ class TestingConfig(Config):
     """測試環境設定"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    AUTO_CREATE_SCHEMA = True
+    BCRYPT_ROUNDS = 4
     WTF_CSRF_ENABLED = False
 
 
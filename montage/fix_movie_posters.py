@@ -5,10 +5,13 @@
 檢查所有電影的海報是否可以正常訪問，並提供修復選項
 """
 
-import requests
-import time
-from app import create_app, db
+from app import create_app
 from app.models import Movie
+from app.poster_check import PosterChecker, verify_posters
+from app.tmdb import ConsoleProgress
+
+# 工具腳本不需要排程器與背景寄件程序
+SCRIPT_CONFIG = {'SCHEDULER_ENABLED': False, 'EMAIL_OUTBOX_WORKER': False}
 
 def check_poster_url(url, timeout=10):
     """
@@ -21,80 +24,57 @@ def check_poster_url(url, timeout=10):
     Returns:
         (status_code, is_valid)
     """
+    checker = PosterChecker(workers=1, per_host=1, timeout=timeout)
     try:
-        response = requests.head(url, timeout=timeout)
-        return response.status_code, response.status_code == 200
-    except:
-        return 0, False
+        status_code = checker.check(url)
+    finally:
+        checker.close()
+    return status_code, status_code == 200
+
+def print_broken_posters(result):
+    """列出損壞的海報"""
+    for movie_id, poster_url, status_code in result['broken_movies']:
+        print(f"❌ 電影 #{movie_id}: 海報無法訪問 (狀態碼: {status_code})")
+        print(f"   損壞URL: {poster_url}")
 
-def fix_broken_posters():
-    """檢查並修復損壞的海報"""
+def fix_broken_posters(fix=True):
+    """
+    檢查並修復損壞的海報
+    
+    Args:
+        fix: 是否寫入修復（False 時只檢查）
+    """
     
-    app = create_app()
+    app = create_app(config_overrides=SCRIPT_CONFIG)
     with app.app_context():
         print("🔍 開始檢查所有電影海報...")
+        print(f"⚙️ 併發數: {app.config['POSTER_CHECK_WORKERS']}（每個主機 {app.config['POSTER_CHECK_PER_HOST']}），"
+              f"{app.config['POSTER_CHECK_MAX_AGE_HOURS']} 小時內檢查過的海報將略過")
         
-        all_movies = Movie.query.all()
-        total_count = len(all_movies)
-        broken_count = 0
-        fixed_count = 0
+        result = verify_posters(fix=fix, progress=ConsoleProgress("處理進度"))
+        print_broken_posters(result)
         
-        print(f"📊 總共 {total_count} 部電影需要檢查")
+        if result['fixed'] > 0:
+            print(f"\n💾 已提交 {result['fixed']} 項修復")
         
-        # 備用海報URL (高品質通用海報)
-        fallback_posters = [
-            "https://image.tmdb.org/t/p/w500/wwemzKWzjKYJFfCeiB57q3r4Bcm.png",  # 通用電影海報 1
-            "https://via.placeholder.com/500x750/1a1a1a/ffffff?text=🎬+電影海報",      # 簡潔海報
-            "https://via.placeholder.com/500x750/2d3748/ffffff?text=📽️+Movie+Poster", # 英文海報
-        ]
+        print(f"\n📊 檢查結果:")
+        print(f"   • 總電影數: {result['total']}")
+        print(f"   • 本次檢查網址: {result['checked']}（沿用近期結果: {result['cached']}）")
+        print(f"   • 沒有海報URL: {result['missing']}")
+        print(f"   • 損壞海報: {result['broken']}")
+        print(f"   • 暫時無法連線（未取代）: {result['unreachable']}")
+        print(f"   • 已修復: {result['fixed']}")
+        print(f"   • 正常海報: {result['total'] - result['broken'] - result['unreachable'] - result['missing']}")
         
-        for i, movie in enumerate(all_movies, 1):
-            print(f"\r處理進度: {i}/{total_count} ({i/total_count*100:.1f}%)", end="", flush=True)
-            
-            if not movie.poster_url:
-                print(f"\n⚠️ {movie.title}: 沒有海報URL")
-                # 為沒有海報的電影設定備用海報
-                movie.poster_url = fallback_posters[0]
-                fixed_count += 1
-                continue
-            
-            status_code, is_valid = check_poster_url(movie.poster_url)
-            
-            if not is_valid:
-                print(f"\n❌ {movie.title}: 海報無法訪問 (狀態碼: {status_code})")
-                print(f"   損壞URL: {movie.poster_url}")
-                
-                # 嘗試使用備用海報
-                movie.poster_url = fallback_posters[broken_count % len(fallback_posters)]
-                print(f"   修復URL: {movie.poster_url}")
-                
-                broken_count += 1
-                fixed_count += 1
-            
-            # 避免請求過於頻繁
-            if i % 10 == 0:
-                time.sleep(0.5)
-        
-        # 提交更改
-        if fixed_count > 0:
-            db.session.commit()
-            print(f"\n\n💾 已提交 {fixed_count} 項修復")
-        
-        print(f"\n\n📊 檢查結果:")
-        print(f"   • 總電影數: {total_count}")
-        print(f"   • 損壞海報: {broken_count}")
-        print(f"   • 已修復: {fixed_count}")
-        print(f"   • 正常海報: {total_count - broken_count}")
-        
-        if broken_count == 0:
+        if result['broken'] == 0 and result['missing'] == 0:
             print("🎉 所有電影海報都正常！")
-        else:
-            print(f"✅ 已修復 {fixed_count} 個海報問題")
+        elif result['fixed'] > 0:
+            print(f"✅ 已修復 {result['fixed']} 個海報問題")
 
 def check_specific_movie(movie_title):
     """檢查特定電影的海報"""
     
-    app = create_app()
+    app = create_app(config_overrides=SCRIPT_CONFIG)
     with app.app_context():
         movie = Movie.query.filter(Movie.title.like(f'%{movie_title}%')).first()
         
@@ -131,14 +111,7 @@ if __name__ == '__main__':
             fix_broken_posters()
         elif choice == '2':
             # 只檢查，不修復
-            app = create_app()
-            with app.app_context():
-                movies = Movie.query.limit(10).all()
-                for movie in movies:
-                    if movie.poster_url:
-                        status_code, is_valid = check_poster_url(movie.poster_url)
-                        status = "✅" if is_valid else "❌"
-                        print(f"{status} {movie.title}: {status_code}")
+            fix_broken_posters(fix=False)
         else:
             print("❌ 無效選擇")
             
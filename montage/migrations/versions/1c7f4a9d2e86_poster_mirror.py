@@ -0,0 +1,42 @@
+"""本地海報鏡像檔案與下載失敗紀錄資料表
+
+Revision ID: 1c7f4a9d2e86
+Revises: b5d19c7e3a04
+Create Date: 2026-10-17 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c7f4a9d2e86'
+down_revision = 'b5d19c7e3a04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'poster_files',
+        sa.Column('source_url', sa.String(length=500), nullable=False),
+        sa.Column('variant', sa.String(length=16), nullable=False),
+        sa.Column('filename', sa.String(length=80), nullable=False),
+        sa.Column('content_type', sa.String(length=64), nullable=False),
+        sa.Column('byte_size', sa.Integer(), nullable=False),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('source_url', 'variant')
+    )
+    op.create_table(
+        'poster_mirror_failures',
+        sa.Column('source_url', sa.String(length=500), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('failed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('source_url')
+    )
+
+
+def downgrade():
+    op.drop_table('poster_mirror_failures')
+    op.drop_table('poster_files')
@@ -0,0 +1,40 @@
+"""電影類型與電影類型關聯資料表
+
+類型資料與關聯由 flask schema init 寫入與回填。
+
+Revision ID: 2f8a6d3c91e4
+Revises: 7c1d5e9a2b40
+Create Date: 2026-10-17 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f8a6d3c91e4'
+down_revision = '7c1d5e9a2b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'genres',
+        sa.Column('genre_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint('genre_id')
+    )
+    op.create_table(
+        'movie_genres',
+        sa.Column('movie_id', sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['movie_id'], ['movies.movie_id']),
+        sa.PrimaryKeyConstraint('movie_id', 'genre_id')
+    )
+    op.create_index('ix_movie_genres_genre_id', 'movie_genres', ['genre_id', 'movie_id'])
+
+
+def downgrade():
+    op.drop_table('movie_genres')
+    op.drop_table('genres')
@@ -0,0 +1,27 @@
+"""電影最後異動時間
+
+條件式請求的版本依據，既有電影以建立時間作為最後異動時間。
+
+Revision ID: 4d6c2b8e0f13
+Revises: 9e4b7a1c6d25
+Create Date: 2026-10-17 09:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d6c2b8e0f13'
+down_revision = '9e4b7a1c6d25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('movies', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE movies SET updated_at = created_at')
+
+
+def downgrade():
+    op.drop_column('movies', 'updated_at')
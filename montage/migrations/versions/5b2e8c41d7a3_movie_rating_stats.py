@@ -0,0 +1,55 @@
+"""電影評分統計欄位
+
+movies 表格新增評分統計欄位，並以評論資料回填一次。
+
+Revision ID: 5b2e8c41d7a3
+Revises: a3f9c2e17b05
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e8c41d7a3'
+down_revision = 'a3f9c2e17b05'
+branch_labels = None
+depends_on = None
+
+RATING_VALUES = (1, 2, 3, 4, 5)
+RATING_STAT_COLUMNS = ['review_count', 'rating_sum'] + [f'rating_{rating}_count' for rating in RATING_VALUES]
+
+# 以 movies LEFT JOIN reviews 的分組子查詢一次回填所有電影的評分統計（與排程器的重新計算相同）
+BACKFILL_RATING_STATS = sa.text(
+    'UPDATE movies SET '
+    'review_count = stats.review_count, '
+    'rating_sum = stats.rating_sum, '
+    'avg_rating = stats.avg_rating, '
+    + ', '.join(f'rating_{rating}_count = stats.rating_{rating}_count' for rating in RATING_VALUES) +
+    ' FROM ('
+    'SELECT movies.movie_id AS movie_id, '
+    'COUNT(reviews.review_id) AS review_count, '
+    'COALESCE(SUM(reviews.rating), 0) AS rating_sum, '
+    'CASE WHEN COUNT(reviews.review_id) > 0 '
+    'THEN ROUND(SUM(reviews.rating) * 1.0 / COUNT(reviews.review_id), 2) ELSE 0.0 END AS avg_rating, '
+    + ', '.join(
+        f'COALESCE(SUM(CASE WHEN reviews.rating = {rating} THEN 1 ELSE 0 END), 0) AS rating_{rating}_count'
+        for rating in RATING_VALUES
+    ) +
+    ' FROM movies LEFT JOIN reviews ON reviews.movie_id = movies.movie_id '
+    'GROUP BY movies.movie_id'
+    ') AS stats '
+    'WHERE movies.movie_id = stats.movie_id'
+)
+
+
+def upgrade():
+    for name in RATING_STAT_COLUMNS:
+        op.add_column('movies', sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+    op.execute(BACKFILL_RATING_STATS)
+
+
+def downgrade():
+    for name in RATING_STAT_COLUMNS:
+        op.drop_column('movies', name)
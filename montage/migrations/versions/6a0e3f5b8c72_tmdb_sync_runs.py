@@ -0,0 +1,43 @@
+"""TMDb 增量同步執行紀錄資料表
+
+Revision ID: 6a0e3f5b8c72
+Revises: 4d6c2b8e0f13
+Create Date: 2026-10-17 09:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a0e3f5b8c72'
+down_revision = '4d6c2b8e0f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'tmdb_sync_runs',
+        sa.Column('run_id', sa.Integer(), nullable=False),
+        sa.Column('window_start', sa.DateTime(), nullable=False),
+        sa.Column('window_end', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('last_page', sa.Integer(), nullable=False),
+        sa.Column('total_pages', sa.Integer(), nullable=True),
+        sa.Column('changed_count', sa.Integer(), nullable=False),
+        sa.Column('updated_count', sa.Integer(), nullable=False),
+        sa.Column('unchanged_count', sa.Integer(), nullable=False),
+        sa.Column('skipped_count', sa.Integer(), nullable=False),
+        sa.Column('failed_count', sa.Integer(), nullable=False),
+        sa.Column('duration_seconds', sa.Float(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('run_id')
+    )
+    op.create_index('ix_tmdb_sync_runs_status', 'tmdb_sync_runs', ['status'])
+
+
+def downgrade():
+    op.drop_table('tmdb_sync_runs')
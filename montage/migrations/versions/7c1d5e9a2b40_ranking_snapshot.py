@@ -0,0 +1,34 @@
+"""排行榜快照資料表
+
+Revision ID: 7c1d5e9a2b40
+Revises: 5b2e8c41d7a3
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1d5e9a2b40'
+down_revision = '5b2e8c41d7a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ranking_snapshot',
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('movie_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('review_count', sa.Integer(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['movie_id'], ['movies.movie_id']),
+        sa.PrimaryKeyConstraint('kind', 'position')
+    )
+
+
+def downgrade():
+    op.drop_table('ranking_snapshot')
@@ -0,0 +1,31 @@
+"""排程器租約資料表
+
+Revision ID: 8b3d6f2a5c07
+Revises: e2a85b0d4f19
+Create Date: 2026-10-17 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b3d6f2a5c07'
+down_revision = 'e2a85b0d4f19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'scheduler_locks',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('owner', sa.String(length=128), nullable=False),
+        sa.Column('acquired_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('scheduler_locks')
@@ -0,0 +1,35 @@
+"""評論分頁與電影排序索引
+
+Revision ID: 9e4b7a1c6d25
+Revises: 2f8a6d3c91e4
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4b7a1c6d25'
+down_revision = '2f8a6d3c91e4'
+branch_labels = None
+depends_on = None
+
+# 與 app.models 的索引定義一致；排序索引的運算式須與列表查詢的 ORDER BY 完全相同才會被使用
+INDEXES = {
+    'ix_reviews_movie_created': 'reviews (movie_id, created_at)',
+    'ix_reviews_user_created': 'reviews (user_id, created_at)',
+    'ix_movies_sort_popular': 'movies (review_count, coalesce(vote_average, -1), coalesce(release_year, 0), created_at)',
+    'ix_movies_sort_rating': 'movies (coalesce(nullif(avg_rating, 0.0), vote_average, 0.0), review_count, coalesce(release_year, 0))',
+    'ix_movies_sort_recent': 'movies (coalesce(release_year, 0), created_at)'
+}
+
+
+def upgrade():
+    for name, definition in INDEXES.items():
+        op.execute(f'CREATE INDEX {name} ON {definition}')
+
+
+def downgrade():
+    for name in INDEXES:
+        op.execute(f'DROP INDEX {name}')
@@ -0,0 +1,78 @@
+"""初始資料庫結構：使用者、電影與評論
+
+導入 Flask-Migrate 前由 db.create_all() 建立的結構；既有資料庫由 flask schema init 直接標記為此版本。
+
+Revision ID: a3f9c2e17b05
+Revises:
+Create Date: 2026-10-17 08:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f9c2e17b05'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('display_name', sa.String(length=80), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('email_confirmed', sa.Boolean(), nullable=False),
+        sa.Column('confirmation_token', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'movies',
+        sa.Column('movie_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('release_year', sa.Integer(), nullable=True),
+        sa.Column('avg_rating', sa.Float(), nullable=False),
+        sa.Column('poster_url', sa.String(length=500), nullable=True),
+        sa.Column('genre_ids', sa.Text(), nullable=True),
+        sa.Column('runtime', sa.Integer(), nullable=True),
+        sa.Column('tagline', sa.Text(), nullable=True),
+        sa.Column('overview', sa.Text(), nullable=True),
+        sa.Column('vote_average', sa.Float(), nullable=True),
+        sa.Column('tmdb_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('movie_id')
+    )
+    op.create_index('ix_movies_tmdb_id', 'movies', ['tmdb_id'], unique=True)
+    op.create_index('ix_movies_title', 'movies', ['title'])
+    op.create_index('ix_movies_release_year', 'movies', ['release_year'])
+
+    op.create_table(
+        'reviews',
+        sa.Column('review_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('movie_id', sa.Integer(), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('comment_text', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id']),
+        sa.ForeignKeyConstraint(['movie_id'], ['movies.movie_id']),
+        sa.PrimaryKeyConstraint('review_id'),
+        sa.UniqueConstraint('user_id', 'movie_id', name='unique_user_movie_review')
+    )
+    op.create_index('ix_reviews_created_at', 'reviews', ['created_at'])
+    op.create_index('ix_reviews_movie_id', 'reviews', ['movie_id'])
+    op.create_index('ix_reviews_user_id', 'reviews', ['user_id'])
+
+
+def downgrade():
+    op.drop_table('reviews')
+    op.drop_table('movies')
+    op.drop_table('users')
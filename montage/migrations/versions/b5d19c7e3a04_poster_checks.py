@@ -0,0 +1,31 @@
+"""海報網址檢查結果資料表
+
+Revision ID: b5d19c7e3a04
+Revises: 6a0e3f5b8c72
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d19c7e3a04'
+down_revision = '6a0e3f5b8c72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'poster_checks',
+        sa.Column('url', sa.String(length=500), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=False),
+        sa.Column('checked_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('url')
+    )
+    op.create_index('ix_poster_checks_checked_at', 'poster_checks', ['checked_at'])
+
+
+def downgrade():
+    op.drop_table('poster_checks')
@@ -0,0 +1,65 @@
+"""認證令牌資料表，轉移並移除 users.confirmation_token
+
+舊欄位中尚未確認信箱的令牌以雜湊值轉入 auth_tokens；舊欄位同時用於密碼重設，
+已確認信箱使用者的令牌直接捨棄，需重新申請重設。降版時轉入的令牌無法還原為明文。
+
+Revision ID: d9f1e7c3b258
+Revises: 8b3d6f2a5c07
+Create Date: 2026-10-17 10:40:00.000000
+
+"""
+import hashlib
+from datetime import datetime, timedelta
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9f1e7c3b258'
+down_revision = '8b3d6f2a5c07'
+branch_labels = None
+depends_on = None
+
+PURPOSE_CONFIRM_EMAIL = 'confirm_email'
+
+
+def upgrade():
+    auth_tokens = op.create_table(
+        'auth_tokens',
+        sa.Column('token_id', sa.Integer(), nullable=False),
+        sa.Column('token_hash', sa.String(length=64), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('purpose', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id']),
+        sa.PrimaryKeyConstraint('token_id'),
+        sa.UniqueConstraint('token_hash')
+    )
+    op.create_index('ix_auth_tokens_expires_at', 'auth_tokens', ['expires_at'])
+    op.create_index('ix_auth_tokens_user_purpose', 'auth_tokens', ['user_id', 'purpose'])
+
+    rows = op.get_bind().execute(sa.text(
+        'SELECT user_id, confirmation_token FROM users '
+        'WHERE confirmation_token IS NOT NULL AND NOT email_confirmed'
+    )).all()
+    now = datetime.utcnow()
+    expires_at = now + timedelta(minutes=current_app.config.get('EMAIL_CONFIRM_TOKEN_MINUTES', 48 * 60))
+    op.bulk_insert(auth_tokens, [
+        {
+            'token_hash': hashlib.sha256(token.encode('utf-8')).hexdigest(),
+            'user_id': user_id,
+            'purpose': PURPOSE_CONFIRM_EMAIL,
+            'created_at': now,
+            'expires_at': expires_at
+        }
+        for user_id, token in rows
+    ])
+
+    op.drop_column('users', 'confirmation_token')
+
+
+def downgrade():
+    op.add_column('users', sa.Column('confirmation_token', sa.String(length=255), nullable=True))
+    op.drop_table('auth_tokens')
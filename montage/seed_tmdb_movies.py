@@ -6,89 +6,17 @@ TMDb 電影資料庫種子腳本 - 符合PRD要求500部電影
 """
 
 import os
-import requests
-import time
-from datetime import datetime
-from app import create_app, db
+from app import create_app
 from app.models import Movie
+from app.schema import init_schema
+from app.movie_ingest import load_tmdb_ids, upsert_movies
+from app.tmdb import TMDbClient, ConsoleProgress, movie_fields
 
 # TMDb API 設定
 TMDB_API_KEY = os.getenv('TMDB_API_KEY', 'your-tmdb-api-key-here')
-TMDB_BASE_URL = 'https://api.themoviedb.org/3'
-TMDB_IMAGE_BASE_URL = 'https://image.tmdb.org/t/p/w500'
 
-def get_movies_from_tmdb(category='popular', total_needed=500):
-    """
-    從TMDb獲取電影列表
-    
-    Args:
-        category: 電影類別 ('popular', 'top_rated', 'now_playing', 'upcoming')
-        total_needed: 需要的總電影數量
-        
-    Returns:
-        電影列表
-    """
-    movies = []
-    page = 1
-    max_pages = 25  # TMDb API 限制最多500頁，每頁20部電影
-    
-    print(f"🎬 從TMDb獲取 {category} 電影...")
-    
-    while len(movies) < total_needed and page <= max_pages:
-        try:
-            url = f"{TMDB_BASE_URL}/movie/{category}"
-            params = {
-                'api_key': TMDB_API_KEY,
-                'language': 'zh-TW',
-                'page': page
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            if 'results' in data and data['results']:
-                movies.extend(data['results'])
-                print(f"✅ 已獲取第 {page} 頁，共 {len(data['results'])} 部電影 (累計: {len(movies)})")
-                page += 1
-                time.sleep(0.25)  # 避免API限制
-            else:
-                print(f"⚠️ 第 {page} 頁無資料，停止獲取")
-                break
-                
-        except requests.RequestException as e:
-            print(f"❌ 第 {page} 頁獲取失敗: {e}")
-            page += 1
-            continue
-        except KeyboardInterrupt:
-            print("\n⚠️ 用戶中斷操作")
-            break
-    
-    return movies[:total_needed]
-
-def get_movie_details(movie_id):
-    """
-    獲取電影詳細資訊
-    
-    Args:
-        movie_id: TMDb電影ID
-        
-    Returns:
-        電影詳細資訊
-    """
-    try:
-        url = f"{TMDB_BASE_URL}/movie/{movie_id}"
-        params = {
-            'api_key': TMDB_API_KEY,
-            'language': 'zh-TW'
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
-        
-    except requests.RequestException:
-        return None
+# 種子腳本不需要排程器與背景寄件程序
+SCRIPT_CONFIG = {'SCHEDULER_ENABLED': False, 'EMAIL_OUTBOX_WORKER': False}
 
 def seed_database():
     """填充資料庫"""
@@ -101,9 +29,12 @@ def seed_database():
         print("📋 獲取方式: https://www.themoviedb.org/settings/api")
         return False
     
-    app = create_app()
+    app = create_app(config_overrides=SCRIPT_CONFIG)
     
     with app.app_context():
+        # 首次安裝時建立資料庫結構
+        init_schema(app)
+        
         # 檢查目前電影數量
         current_count = Movie.query.count()
         print(f"📊 目前資料庫電影數量: {current_count}")
@@ -122,8 +53,10 @@ def seed_database():
             return False
         
         print("\n📡 開始從TMDb獲取電影資料...")
+        client = TMDbClient.from_config(app.config)
+        print(f"⚙️ 併發數: {client.workers}，速率上限: {client.limiter.rate:g} 請求/秒")
         
-        # 獲取不同類別的電影以確保多樣性
+        # 獲取不同類別的電影以確保多樣性（各類別的分頁併發抓取）
         all_movies = []
         categories = [
             ('popular', min(200, needed)),          # 熱門電影
@@ -134,80 +67,42 @@ def seed_database():
         for category, count in categories:
             if len(all_movies) >= needed:
                 break
-            movies = get_movies_from_tmdb(category, count)
+            movies = client.get_movie_list(category, count, progress=ConsoleProgress(f"🎬 {category} 分頁"))
+            print(f"✅ 已獲取 {category} 電影 {len(movies)} 部")
             all_movies.extend(movies)
         
-        # 去重（基於tmdb_id）
-        seen_ids = set()
-        unique_movies = []
+        # 去重（基於tmdb_id），並略過資料庫中已存在的電影（既有 tmdb_id 只載入一次）
+        known_tmdb_ids = load_tmdb_ids()
+        seen_ids = set(known_tmdb_ids)
+        unique_movies = {}
         for movie in all_movies:
             if movie['id'] not in seen_ids:
                 seen_ids.add(movie['id'])
-                unique_movies.append(movie)
+                unique_movies[movie['id']] = movie
+            if len(unique_movies) >= needed:
+                break
         
         print(f"\n🎬 準備新增 {len(unique_movies)} 部去重後的電影...")
         
-        added_count = 0
-        failed_count = 0
-        
-        for i, movie_data in enumerate(unique_movies[:needed]):
-            try:
-                # 檢查是否已存在
-                existing = Movie.query.filter_by(tmdb_id=movie_data['id']).first()
-                if existing:
-                    continue
-                
-                # 獲取詳細資訊
-                details = get_movie_details(movie_data['id'])
+        # 併發獲取詳細資訊，取得失敗時沿用列表資料
+        failed_ids = []
+        
+        def fetched_rows():
+            details_stream = client.get_movie_details(
+                list(unique_movies),
+                progress=ConsoleProgress("📡 電影詳細資訊")
+            )
+            for tmdb_id, details in details_stream:
+                movie_data = unique_movies[tmdb_id]
                 if details:
                     movie_data.update(details)
-                
-                # 處理海報URL
-                poster_path = movie_data.get('poster_path')
-                poster_url = f"{TMDB_IMAGE_BASE_URL}{poster_path}" if poster_path else ""
-                
-                # 處理發行年份
-                release_date = movie_data.get('release_date', '')
-                release_year = int(release_date[:4]) if release_date and len(release_date) >= 4 else None
-                
-                # 處理類型ID
-                genres = movie_data.get('genres', [])
-                genre_ids = ','.join([str(g['id']) for g in genres]) if genres else ''
-                
-                # 創建電影記錄
-                movie = Movie(
-                    title=movie_data.get('title', '未知電影'),
-                    release_year=release_year,
-                    poster_url=poster_url,
-                    genre_ids=genre_ids,
-                    runtime=movie_data.get('runtime'),
-                    tagline=movie_data.get('tagline', ''),
-                    overview=movie_data.get('overview', ''),
-                    vote_average=float(movie_data.get('vote_average', 0.0)),
-                    tmdb_id=movie_data['id'],
-                    avg_rating=0.0,
-                    created_at=datetime.utcnow()
-                )
-                
-                db.session.add(movie)
-                added_count += 1
-                
-                # 每50部提交一次
-                if added_count % 50 == 0:
-                    db.session.commit()
-                    print(f"💾 已新增 {added_count} 部電影...")
-                
-                # 避免API限制
-                if i % 10 == 0:
-                    time.sleep(0.5)
-                    
-            except Exception as e:
-                failed_count += 1
-                print(f"❌ 處理電影失敗: {e}")
-                continue
-        
-        # 最終提交
-        db.session.commit()
+                else:
+                    failed_ids.append(tmdb_id)
+                yield movie_fields(movie_data)
+        
+        # 以 upsert 批次寫入（INSERT ... ON CONFLICT(tmdb_id) DO UPDATE）
+        counts = upsert_movies(fetched_rows(), known_tmdb_ids=known_tmdb_ids)
+        client.close()
         
         # 統計結果
         final_count = Movie.query.count()
@@ -219,10 +114,12 @@ def seed_database():
         print(f"\n🎉 種子腳本執行完成！")
         print(f"📊 最終統計:")
         print(f"   • 總電影數: {final_count}")
-        print(f"   • 新增電影數: {added_count}")
+        print(f"   • 新增電影數: {counts['inserted']}")
+        print(f"   • 更新電影數: {counts['updated']}")
+        print(f"   • 未變動略過: {counts['skipped']}")
         print(f"   • 有海報的電影: {movies_with_posters}")
         print(f"   • 海報覆蓋率: {(movies_with_posters/final_count*100):.1f}%")
-        print(f"   • 失敗數: {failed_count}")
+        print(f"   • 詳細資訊取得失敗: {len(failed_ids)}")
         
         if final_count >= 500:
             print("✅ 已達到PRD要求的500部電影！")